@@ -9,17 +9,18 @@ from app.graph.nodes.lead_judge.lead_judge import lead_judge
 from app.graph.nodes.lead_reposnse.generate_response import generate_response
 from app.graph.nodes.process_rag.process_rag import process_rag
 from app.graph.nodes.reputation_response.reputation_response import reputation_response
+from utils.metrics import instrument_node
 
 flow = StateGraph(State)
 
 
-flow.add_node("techical_classifier", techical_classifier)
-flow.add_node("intent_classifier", intent_classifier)
-flow.add_node("domain_classifier", domain_classifier)
-flow.add_node("lead_judge", lead_judge)
-flow.add_node("generate_response", generate_response)
-flow.add_node("process_rag", process_rag)
-flow.add_node("reputation_response", reputation_response)
+flow.add_node("techical_classifier", instrument_node("techical_classifier", techical_classifier))
+flow.add_node("intent_classifier", instrument_node("intent_classifier", intent_classifier))
+flow.add_node("domain_classifier", instrument_node("domain_classifier", domain_classifier))
+flow.add_node("lead_judge", instrument_node("lead_judge", lead_judge))
+flow.add_node("generate_response", instrument_node("generate_response", generate_response))
+flow.add_node("process_rag", instrument_node("process_rag", process_rag))
+flow.add_node("reputation_response", instrument_node("reputation_response", reputation_response))
 
 
 flow.add_edge(START, "techical_classifier")
@@ -47,4 +48,30 @@ flow.add_edge("process_rag", "reputation_response")
 
 graph = flow.compile()
 
-graph.get_graph().draw_mermaid_png(output_file_path="graph.png")
+
+def warmup(rag: bool = True) -> None:
+    """
+    Utwórz z góry klientów LLM wszystkich node'ów i (opcjonalnie) retriever RAG.
+    Bez wywołania warmup() wszystko ładuje się leniwie przy pierwszym użyciu.
+    """
+    import app.graph.nodes.techical_classifier.techical_classifier as technical_node
+    import app.graph.nodes.intent_classifier.intent_classifier as intent_node
+    import app.graph.nodes.domain_classifier.domain_classifier as domain_node
+    import app.graph.nodes.lead_judge.lead_judge as lead_judge_node
+    import app.graph.nodes.lead_reposnse.generate_response as response_node
+    import app.graph.nodes.process_rag.process_rag as rag_node
+    import app.graph.nodes.reputation_response.reputation_response as reputation_node
+
+    for node in (technical_node, intent_node, domain_node, lead_judge_node,
+                 response_node, rag_node, reputation_node):
+        node.get_llm()
+    if rag:
+        rag_node.get_retriever()
+
+
+def draw_graph(output_file_path: str = "graph.png") -> None:
+    graph.get_graph().draw_mermaid_png(output_file_path=output_file_path)
+
+
+if __name__ == "__main__":
+    draw_graph()
@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 from langchain_core.prompts import ChatPromptTemplate
 
 from app.graph.nodes.intent_classifier.prompt import INTENT_CLASSIFIER_PROMPT
@@ -6,7 +8,9 @@ from app.graph.state import State
 from config import get_openai
 
 
-llm = get_openai().with_structured_output(DomainClassification)
+@lru_cache(maxsize=1)
+def get_llm():
+    return get_openai().with_structured_output(DomainClassification)
 
 
 async def domain_classifier(state: State) -> State:
@@ -14,7 +18,7 @@ async def domain_classifier(state: State) -> State:
     prompt = ChatPromptTemplate.from_messages(
         [("system", INTENT_CLASSIFIER_PROMPT), ("human", f"Post:\n{post}")], template_format="mustache"
     )
-    chain = prompt | llm
+    chain = prompt | get_llm()
 
     try:
         response: DomainClassification = await chain.ainvoke({})
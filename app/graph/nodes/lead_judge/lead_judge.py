@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 from langchain_core.prompts import ChatPromptTemplate
 
 from config import get_anthropic
@@ -5,7 +7,9 @@ from app.graph.state import State
 from app.graph.nodes.models import LeadJudgeModel
 from app.graph.nodes.lead_judge.prompt import LEAD_JUDGE_PROMPT
 
-llm = get_anthropic().with_structured_output(LeadJudgeModel)
+@lru_cache(maxsize=1)
+def get_llm():
+    return get_anthropic().with_structured_output(LeadJudgeModel)
 
 async def lead_judge(state: State) -> State:
     post= state["message"]['message']
@@ -20,7 +24,7 @@ async def lead_judge(state: State) -> State:
           domain: {domain}
           """)]
     )
-    chain = prompt | llm
+    chain = prompt | get_llm()
 
     try:
         response: LeadJudgeModel = await chain.ainvoke({})
@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 from langchain_core.prompts import ChatPromptTemplate
 
 from app.graph.state import State
@@ -6,7 +8,9 @@ from config import get_openai
 from app.graph.nodes.lead_reposnse.prompt import GENERATE_RESPONSE_POST
 
 
-llm = get_openai().with_structured_output(ReplyModel)
+@lru_cache(maxsize=1)
+def get_llm():
+    return get_openai().with_structured_output(ReplyModel)
 
 
 async def generate_response(state: State) -> State:
@@ -30,7 +34,7 @@ async def generate_response(state: State) -> State:
         template_format="mustache",
     )
 
-    chain = prompt | llm
+    chain = prompt | get_llm()
     try:
         response: ReplyModel = await chain.ainvoke({})
         return {"reply": ReplyModel(
@@ -39,7 +43,7 @@ async def generate_response(state: State) -> State:
             cta_type=response.cta_type,
         )}
     except:
-        {"reply": ReplyModel(
+        return {"reply": ReplyModel(
             reply="Response generation error",
             tone="Response generation error",
             cta_type="Response generation error",
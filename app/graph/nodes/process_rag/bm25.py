@@ -0,0 +1,198 @@
+"""
+Leksykalny indeks BM25 dla chunków Lovable docs + reciprocal rank fusion.
+
+devdocs_query to zwykle krótkie, słownikowe frazy ("RLS policy supabase",
+"stripe webhook") — dokładne dopasowanie słów kluczowych bywa lepsze niż
+sam dense retrieval. Indeks budowany jest przez skrypty indeksujące
+(obok Chroma / Pinecone) i zapisywany do JSON; Retriever ładuje go przez
+parametr bm25_path i łączy oba rankingi przez RRF w _candidates.
+
+Usage:
+    from app.graph.nodes.process_rag.bm25 import BM25Index, fuse_candidates, hybrid_candidates
+
+    BM25Index.build(chunks).save("./chroma_db/bm25.json")
+
+    bm25 = BM25Index.load("./chroma_db/bm25.json")
+    scored = fuse_candidates(dense_docs, bm25.search_docs(query, k=10), k=10)
+    scored = hybrid_candidates(bm25, query, dense_scored, k=10)   # bm25=None → dense_scored
+"""
+
+import json
+import math
+import re
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from langchain_core.documents import Document
+
+from utils.metrics import timed
+
+# ---------------------------------------------------------------------------
+# Defaults
+# ---------------------------------------------------------------------------
+
+BM25_K1 = 1.5
+BM25_B  = 0.75
+RRF_K   = 60        # stała z oryginalnej pracy o RRF (Cormack et al., 2009)
+
+BM25_FILE = "bm25.json"
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:[._-][a-z0-9]+)*")
+
+_STOPWORDS = frozenset("""
+a an and are as at be by can do does for from how i in is it my of on or
+the this to what when where which why with you your
+""".split())
+
+
+def tokenize(text: str) -> list[str]:
+    return [t for t in _TOKEN.findall(text.lower()) if t not in _STOPWORDS]
+
+
+# ---------------------------------------------------------------------------
+# BM25
+# ---------------------------------------------------------------------------
+
+class BM25Index:
+    """
+    Odwrócony indeks BM25 (Okapi) trzymany w pamięci.
+
+    Parameters
+    ----------
+    docs     : chunki w kolejności identyfikatorów (doc_id = pozycja na liście)
+    postings : term → [(doc_id, tf), ...]
+    lengths  : długość każdego chunka w tokenach
+    """
+
+    def __init__(
+        self,
+        docs:     list[Document],
+        postings: dict[str, list[tuple[int, int]]],
+        lengths:  list[int],
+        k1:       float = BM25_K1,
+        b:        float = BM25_B,
+    ):
+        self.docs     = docs
+        self.postings = postings
+        self.lengths  = lengths
+        self.k1       = k1
+        self.b        = b
+
+        n = len(docs)
+        self.avg_len = sum(lengths) / n if n else 0.0
+        self.idf = {
+            term: math.log(1 + (n - len(plist) + 0.5) / (len(plist) + 0.5))
+            for term, plist in postings.items()
+        }
+
+    # ------------------------------------------------------------------
+    # Budowa / zapis / odczyt
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def build(cls, chunks: list[Document]) -> "BM25Index":
+        postings: dict[str, list[tuple[int, int]]] = defaultdict(list)
+        lengths: list[int] = []
+
+        for doc_id, chunk in enumerate(chunks):
+            tokens = tokenize(chunk.page_content)
+            lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                postings[term].append((doc_id, tf))
+
+        return cls(list(chunks), dict(postings), lengths)
+
+    def save(self, path: str | Path) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "k1":       self.k1,
+                "b":        self.b,
+                "docs":     [{"page_content": d.page_content, "metadata": d.metadata} for d in self.docs],
+                "lengths":  self.lengths,
+                "postings": self.postings,
+            }, f, ensure_ascii=False)
+        tmp.replace(path)
+        return path
+
+    @classmethod
+    def load(cls, path: str | Path) -> "BM25Index":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        docs = [Document(page_content=d["page_content"], metadata=d["metadata"]) for d in data["docs"]]
+        postings = {term: [tuple(p) for p in plist] for term, plist in data["postings"].items()}
+        return cls(docs, postings, data["lengths"], k1=data["k1"], b=data["b"])
+
+    # ------------------------------------------------------------------
+    # Wyszukiwanie
+    # ------------------------------------------------------------------
+
+    def search(self, query: str, k: int) -> list[tuple[int, float]]:
+        """Zwróć top-k (doc_id, score) malejąco po BM25."""
+        scores: dict[int, float] = defaultdict(float)
+        k1, b, avg_len = self.k1, self.b, self.avg_len or 1.0
+
+        for term in set(tokenize(query)):
+            plist = self.postings.get(term)
+            if not plist:
+                continue
+            idf = self.idf[term]
+            for doc_id, tf in plist:
+                norm = k1 * (1 - b + b * self.lengths[doc_id] / avg_len)
+                scores[doc_id] += idf * tf * (k1 + 1) / (tf + norm)
+
+        return sorted(scores.items(), key=lambda x: x[1], reverse=True)[:k]
+
+    def search_docs(self, query: str, k: int) -> list[Document]:
+        return [self.docs[doc_id] for doc_id, _ in self.search(query, k)]
+
+
+# ---------------------------------------------------------------------------
+# Reciprocal rank fusion
+# ---------------------------------------------------------------------------
+
+def reciprocal_rank_fusion(rankings: list[list[str]], k: int = RRF_K) -> list[tuple[str, float]]:
+    """
+    Połącz kilka rankingów kluczy: score(d) = Σ 1 / (k + rank_i(d)), rank od 1.
+    """
+    fused: dict[str, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, 1):
+            fused[key] += 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda x: x[1], reverse=True)
+
+
+def fuse_candidates(
+    dense:   list[Document],
+    lexical: list[Document],
+    k:       int,
+) -> list[tuple[Document, float]]:
+    """
+    RRF na listach Documentów z dense i BM25; chunki utożsamiane po treści.
+    Zwraca (doc, rrf_score) malejąco; przy remisie wygrywa kolejność z dense.
+    """
+    by_key: dict[str, Document] = {}
+    for doc in dense + lexical:
+        by_key.setdefault(doc.page_content, doc)
+
+    fused = reciprocal_rank_fusion([
+        [d.page_content for d in dense],
+        [d.page_content for d in lexical],
+    ])
+    return [(by_key[key], score) for key, score in fused[:k]]
+
+
+def hybrid_candidates(
+    bm25:   BM25Index | None,
+    query:  str,
+    dense:  list[tuple[Document, float]],
+    k:      int,
+) -> list[tuple[Document, float]]:
+    """Dołącz BM25 do kandydatów (doc, score) z dense przez RRF; bez indeksu zwraca dense."""
+    if bm25 is None:
+        return dense
+    with timed("rag.bm25"):
+        lexical = bm25.search_docs(query, k=k)
+    return fuse_candidates([d for d, _ in dense], lexical, k=k)
@@ -0,0 +1,307 @@
+"""
+Ładowanie modeli bge (embeddingi) i bge-reranker (CrossEncoder) na CPU
+z wyborem backendu inferencji.
+
+Backendy:
+    "torch"     — domyślny, pełny PyTorch fp32 (zachowanie sprzed zmiany)
+    "onnx"      — ONNX Runtime, fp32
+    "onnx-int8" — ONNX Runtime z dynamiczną kwantyzacją INT8 (najszybszy na CPU,
+                  mniejszy RSS, szybszy load)
+
+Modele ONNX eksportowane są raz do ONNX_MODELS_DIR i potem tylko ładowane.
+Wymaga: pip install "optimum[onnxruntime]" (tylko dla backendów onnx*).
+
+Kontrola jakości INT8 względem fp32 (cosine embeddingów, różnica i korelacja
+score'ów rerankera, latencja, czas ładowania, RSS):
+    python -m app.graph.nodes.process_rag.model_loader --check
+"""
+
+import logging
+import os
+import platform
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Defaults
+# ---------------------------------------------------------------------------
+
+INFERENCE_BACKENDS = ("torch", "onnx", "onnx-int8")
+DEFAULT_BACKEND    = "torch"
+
+ONNX_MODELS_DIR = Path("./onnx_models")
+
+
+def _quantization_config() -> str:
+    """Dobierz zestaw instrukcji dla kwantyzacji INT8 do bieżącego CPU."""
+    if platform.machine().lower() in ("arm64", "aarch64"):
+        return "arm64"
+    try:
+        with open("/proc/cpuinfo", "r", encoding="utf-8") as f:
+            flags = f.read()
+    except OSError:
+        return "avx2"
+    if "avx512_vnni" in flags:
+        return "avx512_vnni"
+    if "avx512f" in flags:
+        return "avx512"
+    return "avx2"
+
+
+def _quantized_file(config: str) -> str:
+    # nazwa nadawana przez sentence_transformers.export_dynamic_quantized_onnx_model
+    return f"onnx/model_qint8_{config}.onnx"
+
+
+def _check_backend(backend: str) -> None:
+    if backend not in INFERENCE_BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}'. Available: {INFERENCE_BACKENDS}")
+    if backend != "torch":
+        try:
+            import onnxruntime  # noqa: F401
+            import optimum.onnxruntime  # noqa: F401
+        except ImportError as exc:
+            raise ImportError(
+                f"Backend '{backend}' requires ONNX Runtime + Optimum: "
+                'pip install "optimum[onnxruntime]"'
+            ) from exc
+
+
+# ---------------------------------------------------------------------------
+# Eksport ONNX / INT8
+# ---------------------------------------------------------------------------
+
+def prepare_onnx_model(model_name: str, kind: str, quantize: bool) -> tuple[Path, str]:
+    """
+    Wyeksportuj model do ONNX (i opcjonalnie INT8) w ONNX_MODELS_DIR.
+
+    Zwraca (lokalny folder modelu, plik .onnx względem folderu).
+    Kolejne wywołania tylko sprawdzają, czy pliki już istnieją.
+
+    Parameters
+    ----------
+    model_name : nazwa modelu z HuggingFace Hub
+    kind       : "embedding" (SentenceTransformer) albo "reranker" (CrossEncoder)
+    quantize   : True = dynamiczna kwantyzacja INT8
+    """
+    from sentence_transformers import CrossEncoder, SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    model_dir = ONNX_MODELS_DIR / model_name.replace("/", "__")
+    fp32_file = "onnx/model.onnx"
+
+    if not (model_dir / fp32_file).exists():
+        logger.info("Exporting %s to ONNX: %s", model_name, model_dir)
+        cls = SentenceTransformer if kind == "embedding" else CrossEncoder
+        model = cls(model_name, device="cpu", backend="onnx")
+        model.save_pretrained(str(model_dir))
+
+    if not quantize:
+        return model_dir, fp32_file
+
+    config = _quantization_config()
+    int8_file = _quantized_file(config)
+    if not (model_dir / int8_file).exists():
+        logger.info("Quantizing %s to INT8 (%s)", model_name, config)
+        cls = SentenceTransformer if kind == "embedding" else CrossEncoder
+        model = cls(str(model_dir), device="cpu", backend="onnx", model_kwargs={"file_name": fp32_file})
+        export_dynamic_quantized_onnx_model(model, config, str(model_dir))
+
+    return model_dir, int8_file
+
+
+# ---------------------------------------------------------------------------
+# Publiczne API
+# ---------------------------------------------------------------------------
+
+def load_embeddings(model_name: str, backend: str = DEFAULT_BACKEND, batch_size: int | None = None):
+    """HuggingFaceEmbeddings (normalize_embeddings=True) na wybranym backendzie."""
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    _check_backend(backend)
+    encode_kwargs = {"normalize_embeddings": True}
+    if batch_size:
+        encode_kwargs["batch_size"] = batch_size
+
+    if backend == "torch":
+        return HuggingFaceEmbeddings(
+            model_name=model_name,
+            model_kwargs={"device": "cpu"},
+            encode_kwargs=encode_kwargs,
+        )
+
+    model_dir, onnx_file = prepare_onnx_model(model_name, "embedding", quantize=backend == "onnx-int8")
+    return HuggingFaceEmbeddings(
+        model_name=str(model_dir),
+        model_kwargs={"device": "cpu", "backend": "onnx", "model_kwargs": {"file_name": onnx_file}},
+        encode_kwargs=encode_kwargs,
+    )
+
+
+def load_cross_encoder(model_name: str, backend: str = DEFAULT_BACKEND):
+    """CrossEncoder (reranker) na wybranym backendzie."""
+    from sentence_transformers import CrossEncoder
+
+    _check_backend(backend)
+    if backend == "torch":
+        return CrossEncoder(model_name)
+
+    model_dir, onnx_file = prepare_onnx_model(model_name, "reranker", quantize=backend == "onnx-int8")
+    return CrossEncoder(str(model_dir), device="cpu", backend="onnx", model_kwargs={"file_name": onnx_file})
+
+
+# ---------------------------------------------------------------------------
+# Kontrola dokładności INT8 vs fp32
+# ---------------------------------------------------------------------------
+
+_CHECK_QUERIES = [
+    "how to connect Supabase to Lovable",
+    "RLS policy supabase",
+    "stripe webhook",
+    "custom domain publish",
+    "transfer project to another account",
+    "google auth redirect error",
+]
+
+_CHECK_PASSAGES = [
+    "In the Lovable editor, go to Integrations, click Connect to Supabase and follow the authentication steps.",
+    "Row Level Security policies control which rows a user can read or write in a Supabase table.",
+    "Stripe sends webhook events to your Edge Function; verify the signature with the signing secret.",
+    "To publish on a custom domain, add the domain in project settings and update your DNS records.",
+    "Remix creates a copy of a project in your own workspace.",
+    "Enable Google as an auth provider and add the redirect URL to the allowed list.",
+]
+
+
+def _rss_mb() -> float:
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 / 1024 if platform.system() == "Darwin" else rss / 1024
+
+
+def _spearman(a: list[float], b: list[float]) -> float:
+    def _ranks(x):
+        order = sorted(range(len(x)), key=lambda i: x[i])
+        ranks = [0.0] * len(x)
+        for r, i in enumerate(order):
+            ranks[i] = float(r)
+        return ranks
+
+    ra, rb = _ranks(a), _ranks(b)
+    n = len(a)
+    d2 = sum((x - y) ** 2 for x, y in zip(ra, rb))
+    return 1 - 6 * d2 / (n * (n * n - 1)) if n > 1 else 1.0
+
+
+def check_accuracy(
+    embed_model:  str = "BAAI/bge-small-en-v1.5",
+    rerank_model: str = "BAAI/bge-reranker-base",
+    backend:      str = "onnx-int8",
+) -> dict:
+    """
+    Porównaj wybrany backend z referencją torch fp32 na przykładowych zapytaniach.
+
+    Każdy backend ładowany w osobnym procesie — inaczej RSS i czas ładowania
+    drugiego modelu byłyby zafałszowane przez pierwszy.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        reference = pool.submit(_measure, embed_model, rerank_model, "torch").result()
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        candidate = pool.submit(_measure, embed_model, rerank_model, backend).result()
+
+    cosines = [
+        sum(x * y for x, y in zip(u, v))
+        for u, v in zip(reference["embeddings"], candidate["embeddings"])
+    ]
+    ref_scores, cand_scores = reference["scores"], candidate["scores"]
+    top1_agree = sum(
+        max(range(len(r)), key=r.__getitem__) == max(range(len(c)), key=c.__getitem__)
+        for r, c in zip(ref_scores, cand_scores)
+    )
+    flat_ref  = [s for row in ref_scores for s in row]
+    flat_cand = [s for row in cand_scores for s in row]
+
+    return {
+        "backend": backend,
+        "embeddings": {
+            "min_cosine_vs_fp32":  round(min(cosines), 4),
+            "mean_cosine_vs_fp32": round(sum(cosines) / len(cosines), 4),
+        },
+        "reranker": {
+            "max_abs_score_diff": round(max(abs(a - b) for a, b in zip(flat_ref, flat_cand)), 4),
+            "spearman_vs_fp32":   round(_spearman(flat_ref, flat_cand), 4),
+            "top1_agreement":     f"{top1_agree}/{len(ref_scores)}",
+        },
+        "latency_ms": {
+            "encode_fp32":  reference["encode_ms"],
+            "encode":       candidate["encode_ms"],
+            "predict_fp32": reference["predict_ms"],
+            "predict":      candidate["predict_ms"],
+        },
+        "load_s": {"fp32": reference["load_s"], "backend": candidate["load_s"]},
+        "rss_mb": {"fp32": reference["rss_mb"], "backend": candidate["rss_mb"]},
+    }
+
+
+def _measure(embed_model: str, rerank_model: str, backend: str) -> dict:
+    import time
+
+    start = time.perf_counter()
+    embeddings = load_embeddings(embed_model, backend)
+    reranker   = load_cross_encoder(rerank_model, backend)
+    load_s = time.perf_counter() - start
+
+    # rozgrzewka — pierwsze wywołanie ONNX/torch alokuje bufory
+    embeddings.embed_query(_CHECK_QUERIES[0])
+    reranker.predict([(_CHECK_QUERIES[0], _CHECK_PASSAGES[0])])
+
+    start = time.perf_counter()
+    vectors = embeddings.embed_documents(_CHECK_QUERIES + _CHECK_PASSAGES)
+    encode_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    scores = [
+        [float(s) for s in reranker.predict([(q, p) for p in _CHECK_PASSAGES])]
+        for q in _CHECK_QUERIES
+    ]
+    predict_ms = (time.perf_counter() - start) * 1000
+
+    return {
+        "embeddings": vectors,
+        "scores":     scores,
+        "encode_ms":  round(encode_ms, 1),
+        "predict_ms": round(predict_ms, 1),
+        "load_s":     round(load_s, 2),
+        "rss_mb":     round(_rss_mb(), 1),
+    }
+
+
+# ---------------------------------------------------------------------------
+# CLI: python -m app.graph.nodes.process_rag.model_loader --prepare / --check
+# ---------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+    parser = argparse.ArgumentParser(description="Eksport ONNX/INT8 i kontrola dokładności modeli bge.")
+    parser.add_argument("--embed-model",  default="BAAI/bge-small-en-v1.5")
+    parser.add_argument("--rerank-model", default="BAAI/bge-reranker-base")
+    parser.add_argument("--backend",      default="onnx-int8", choices=[b for b in INFERENCE_BACKENDS if b != "torch"])
+    parser.add_argument("--prepare",      action="store_true", help="Tylko wyeksportuj modele do ONNX_MODELS_DIR")
+    parser.add_argument("--check",        action="store_true", help="Porównaj backend z torch fp32")
+    args = parser.parse_args()
+
+    if args.prepare or not args.check:
+        _check_backend(args.backend)
+        quantize = args.backend == "onnx-int8"
+        print(prepare_onnx_model(args.embed_model, "embedding", quantize))
+        print(prepare_onnx_model(args.rerank_model, "reranker", quantize))
+
+    if args.check:
+        os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+        print(json.dumps(check_accuracy(args.embed_model, args.rerank_model, args.backend), indent=2))
@@ -1,15 +1,55 @@
+import asyncio
+import os
+import threading
+from functools import lru_cache
+
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
 
 from app.graph.state import State
-from app.graph.nodes.process_rag.retriever_openai_embed import Retriever
-from config import get_openai
+from config import RAG_BACKEND, RAG_INFERENCE_BACKEND, get_openai
 from app.graph.nodes.process_rag.prompt import INSIGHT_PROMPT
+from app.graph.nodes.process_rag.rerank_policy import RerankPolicy
+from utils.metrics import timed
+
+# Progi z kalibracji: python -m app.graph.nodes.process_rag.rerank_policy ... --output rerank_policy.json
+RERANK_POLICY_FILE = "./rerank_policy.json"
+
+# Retriever (Pinecone/OpenAI + CrossEncoder) ładuje się kilka sekund — tworzony
+# dopiero przy pierwszym wywołaniu process_rag albo w warmup()
+_retriever = None
+_retriever_lock = threading.Lock()
+
+
+def get_retriever():
+    global _retriever
+    if _retriever is None:
+        with _retriever_lock:
+            if _retriever is None:
+                if RAG_BACKEND == "local":
+                    from app.graph.nodes.process_rag.retriever_local import DEFAULT_BM25_PATH, Retriever
+                else:
+                    from app.graph.nodes.process_rag.retriever_openai_embed import DEFAULT_BM25_PATH, Retriever
+
+                _retriever = Retriever(
+                    score_threshold=0.3,
+                    final_k=5,
+                    bm25_path=DEFAULT_BM25_PATH,
+                    rerank_policy=RerankPolicy.from_file(RERANK_POLICY_FILE) if os.path.exists(RERANK_POLICY_FILE) else None,
+                    inference_backend=RAG_INFERENCE_BACKEND,)
+    return _retriever
+
+
+@lru_cache(maxsize=1)
+def get_llm():
+    return get_openai()
+
 
-r = Retriever(
-    score_threshold=0.3,
-    final_k=5,)
-llm = get_openai()
+def rerank_stats() -> dict | None:
+    """Ile reranków pominięto / ile par CrossEncoder nie musiał liczyć w tym procesie."""
+    if _retriever is None or _retriever.rerank_policy is None:
+        return None
+    return _retriever.rerank_policy.stats()
 
 
 async def process_rag(state: State) -> State:
@@ -18,7 +58,10 @@ async def process_rag(state: State) -> State:
         return {
             "rag_insight": None
         }
-    context = r.search(query)
+    # pierwsze wywołanie ładuje modele — poza event loopem, żeby nie blokować innych grafów
+    r = await asyncio.to_thread(get_retriever)
+    with timed("rag.retrieve"):
+        context = r.search(query)
     prompt = ChatPromptTemplate.from_messages(
         [
             ('system', INSIGHT_PROMPT),
@@ -28,7 +71,7 @@ async def process_rag(state: State) -> State:
                 """)
         ]
     )
-    chain = prompt | llm | StrOutputParser()
+    chain = prompt | get_llm() | StrOutputParser()
     try:
         response = await chain.ainvoke({})
         return {
@@ -0,0 +1,350 @@
+"""
+Adaptacyjne pomijanie rerankingu na podstawie rozkładu score'ów z retrievera.
+
+CrossEncoder to dominujący koszt CPU jednego wywołania RAG. Gdy pierwszy
+kandydat z wyszukiwania wyraźnie odstaje od reszty, rerank i tak nie zmieni
+top-1 — wtedy go pomijamy. Gdy czołówka jest niejednoznaczna, rerankujemy
+tylko kandydatów mieszczących się w paśmie od najlepszego score'u
+(ale nigdy mniej niż final_k).
+
+Skala score'ów zależy od backendu (cosine z Pinecone, relevance z Chroma,
+RRF ~0.016–0.033 przy hybrydzie), dlatego margines i pasmo są względne —
+liczone jako ułamek score'u top-1 — a nie bezwzględne.
+
+Pominięcie rerankingu naprawdę omija CrossEncoder (0 par). score_threshold
+jest w skali CrossEncodera, więc przy pominięciu zastępuje go skip_floor —
+próg na surowym score z wyszukiwania, dobrany w calibrate() tak, żeby jak
+najlepiej odtwarzał decyzję „score_threshold przepuściłby / odrzucił”.
+Bez skalibrowanego skip_floor Retriever z score_threshold nigdy nie pomija
+rerankingu (co najwyżej zawęża go do niejednoznacznej czołówki).
+
+Progi warto skalibrować na oznaczonym zbiorze zapytań:
+
+    python -m app.graph.nodes.process_rag.rerank_policy labeled_queries.json --backend local
+
+labeled_queries.json:
+    [{"query": "stripe webhook", "expected_source": "https://docs.lovable.dev/integrations/stripe"}, ...]
+
+"expected_source" jest opcjonalne — bez niego punktem odniesienia jest top-1
+po pełnym reranku.
+"""
+
+import json
+import logging
+import threading
+
+from utils.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Defaults
+# ---------------------------------------------------------------------------
+
+DEFAULT_SKIP_MARGIN     = 0.08
+DEFAULT_AMBIGUOUS_BAND  = 0.05
+DEFAULT_TARGET_ACCURACY = 0.95
+
+_MARGIN_GRID = [0.01, 0.02, 0.03, 0.05, 0.08, 0.1, 0.15, 0.2, 0.3, 0.5]
+_BAND_GRID   = [0.01, 0.02, 0.05, 0.1, 0.2, 0.5]
+
+
+# ---------------------------------------------------------------------------
+# Polityka
+# ---------------------------------------------------------------------------
+
+class RerankPolicy:
+    """
+    Decyzja ile czołowych kandydatów przepuścić przez CrossEncoder.
+
+    Parameters
+    ----------
+    skip_margin    : minimalna względna przewaga top-1 nad top-2, (top1 - top2) / top1,
+                     przy której rerank jest pomijany
+    min_top_score  : top-1 musi mieć co najmniej taki (surowy) score, żeby pominąć rerank; None = bez warunku
+    ambiguous_band : rerankuj tylko kandydatów ze score >= top-1 * (1 - band) (min. final_k)
+    skip_floor     : przy pominiętym reranku odrzuć kandydatów z (surowym) score poniżej progu —
+                     odpowiednik score_threshold w skali wyszukiwania, z calibrate(); None = brak
+    """
+
+    def __init__(
+        self,
+        skip_margin:    float        = DEFAULT_SKIP_MARGIN,
+        min_top_score:  float | None = None,
+        ambiguous_band: float | None = DEFAULT_AMBIGUOUS_BAND,
+        skip_floor:     float | None = None,
+    ):
+        self.skip_margin    = skip_margin
+        self.min_top_score  = min_top_score
+        self.ambiguous_band = ambiguous_band
+        self.skip_floor     = skip_floor
+
+        self._lock          = threading.Lock()
+        self.calls          = 0
+        self.skipped        = 0
+        self.partial        = 0
+        self.pairs_scored   = 0
+        self.pairs_avoided  = 0
+
+    def decide(self, scores: list[float], final_k: int, thresholded: bool = False) -> int:
+        """
+        Zwróć liczbę czołowych kandydatów do rerankingu (0 = pomiń rerank).
+        scores muszą być posortowane malejąco, tak jak kandydaci.
+        thresholded: Retriever filtruje po score_threshold — pominięcie wymaga skip_floor.
+        """
+        n = self._decide(scores, final_k, thresholded)
+
+        with self._lock:
+            self.calls         += 1
+            self.pairs_scored  += n
+            self.pairs_avoided += len(scores) - n
+            if n == 0:
+                self.skipped += 1
+            elif n < len(scores):
+                self.partial += 1
+
+        return n
+
+    def _can_skip(self, top: float, thresholded: bool) -> bool:
+        if thresholded and self.skip_floor is None:
+            return False   # brak odpowiednika score_threshold — pominięcie przepuściłoby słabe chunki
+        if self.skip_floor is not None and top < self.skip_floor:
+            return False   # lider i tak odpadłby na progu — niech zdecyduje CrossEncoder
+        return self.min_top_score is None or top >= self.min_top_score
+
+    def _decide(self, scores: list[float], final_k: int, thresholded: bool = False) -> int:
+        if len(scores) < 2:
+            return len(scores)
+
+        # Względem top-1, żeby ten sam próg działał dla cosine i dla RRF;
+        # przy top <= 0 różnica względna nie ma sensu — rerankuj wszystko
+        top, second = scores[0], scores[1]
+        if top <= 0:
+            return len(scores)
+
+        if self._can_skip(top, thresholded) and (top - second) / top >= self.skip_margin:
+            return 0
+
+        if self.ambiguous_band is None:
+            return len(scores)
+        in_band = sum(1 for s in scores if s >= top * (1 - self.ambiguous_band))
+        return min(len(scores), max(in_band, final_k))
+
+    def stats(self) -> dict:
+        return {
+            "calls":         self.calls,
+            "skipped":       self.skipped,
+            "partial":       self.partial,
+            "pairs_scored":  self.pairs_scored,
+            "pairs_avoided": self.pairs_avoided,
+            "skip_rate":     round(self.skipped / self.calls, 3) if self.calls else 0.0,
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            "skip_margin":    self.skip_margin,
+            "min_top_score":  self.min_top_score,
+            "ambiguous_band": self.ambiguous_band,
+            "skip_floor":     self.skip_floor,
+        }
+
+    @classmethod
+    def from_file(cls, path: str) -> "RerankPolicy":
+        """Wczytaj progi zapisane przez calibrate() (--output)."""
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(**json.load(f)["policy"])
+
+
+# ---------------------------------------------------------------------------
+# Rerank (wspólny dla wszystkich Retrieverów)
+# ---------------------------------------------------------------------------
+
+def rerank_candidates(
+    reranker,
+    query:           str,
+    scored:          list[tuple],
+    final_k:         int,
+    score_threshold: float | None = None,
+    policy:          RerankPolicy | None = None,
+) -> list:
+    """
+    Z kandydatów (doc, score) malejąco zwróć final_k dokumentów po reranku.
+
+    reranker None → pierwsze final_k bez zmian. Z polityką rerank może objąć
+    tylko niejednoznaczną czołówkę albo zostać pominięty — wtedy CrossEncoder
+    nie jest wołany wcale, kolejność z wyszukiwania zostaje, a zamiast
+    score_threshold działa skip_floor polityki (próg w skali wyszukiwania).
+    """
+    candidates = [doc for doc, _ in scored]
+    if reranker is None or not candidates:
+        return candidates[:final_k]
+
+    if policy is not None:
+        n = policy.decide([score for _, score in scored], final_k, thresholded=score_threshold is not None)
+        if n == 0:
+            floor = policy.skip_floor
+            return [doc for doc, s in scored[:final_k] if floor is None or s >= floor]
+        candidates = candidates[:n]
+
+    # CrossEncoder nie używa prefixu — dostaje surowe zapytanie
+    pairs = [(query, doc.page_content) for doc in candidates]
+    with timed("rag.rerank"):
+        scores = reranker.predict(pairs)
+
+    ranked = sorted(zip(scores, candidates), key=lambda x: x[0], reverse=True)
+
+    # Opcjonalne filtrowanie po minimalnym score
+    if score_threshold is not None:
+        ranked = [(s, d) for s, d in ranked if s >= score_threshold]
+
+    return [doc for _, doc in ranked[:final_k]]
+
+
+# ---------------------------------------------------------------------------
+# Kalibracja
+# ---------------------------------------------------------------------------
+
+def calibrate(
+    retriever,
+    labeled: list[dict],
+    target_accuracy: float = DEFAULT_TARGET_ACCURACY,
+) -> dict:
+    """
+    Dobierz skip_floor, skip_margin i ambiguous_band na oznaczonym zbiorze zapytań.
+
+    Przy retriever.score_threshold najpierw skip_floor: próg na score z
+    wyszukiwania, który dla czołowych final_k kandydatów najczęściej zgadza się
+    z decyzją score_threshold na score z CrossEncodera. Potem dla każdego progu
+    liczymy, w ilu zapytaniach wynik polityki ma to samo źródło top-1 co
+    referencja (expected_source albo pełny rerank). Wybieramy najmniejszy
+    skip_margin (najwięcej pominięć) i najmniejsze pasmo, które utrzymują
+    accuracy >= target_accuracy.
+    """
+    if retriever.reranker is None:
+        raise ValueError("Calibration needs a retriever with a reranker.")
+
+    samples = []
+    for item in labeled:
+        query  = item["query"]
+        scored = retriever._candidates(query)
+        if not scored:
+            continue
+        docs        = [d for d, _ in scored]
+        pair_scores = retriever.reranker.predict([(query, d.page_content) for d in docs])
+        best        = max(zip(pair_scores, docs), key=lambda x: x[0])[1]
+        samples.append({
+            "docs":        docs,
+            "scores":      [s for _, s in scored],
+            "pair_scores": dict(zip((d.page_content for d in docs), pair_scores)),
+            "expected":    item.get("expected_source") or best.metadata.get("source"),
+        })
+
+    if not samples:
+        raise ValueError("No labeled query returned any candidates — nothing to calibrate.")
+
+    final_k     = retriever.final_k
+    threshold   = getattr(retriever, "score_threshold", None)
+    thresholded = threshold is not None
+    skip_floor, floor_agreement = (
+        _fit_skip_floor(samples, threshold, final_k) if thresholded else (None, None)
+    )
+
+    def _accuracy(policy: RerankPolicy) -> tuple[float, float]:
+        correct, skipped = 0, 0
+        for s in samples:
+            n = policy._decide(s["scores"], final_k, thresholded)
+            if n == 0:
+                skipped += 1
+                top = s["docs"][0]
+            else:
+                head = s["docs"][:n]
+                top  = max(head, key=lambda d: s["pair_scores"][d.page_content])
+            correct += top.metadata.get("source") == s["expected"]
+        return correct / len(samples), skipped / len(samples)
+
+    best_margin = None
+    for margin in _MARGIN_GRID:
+        acc, _ = _accuracy(RerankPolicy(skip_margin=margin, ambiguous_band=None, skip_floor=skip_floor))
+        if acc >= target_accuracy:
+            best_margin = margin
+            break
+    if best_margin is None:
+        best_margin = float("inf")  # żaden próg nie trzyma jakości — nigdy nie pomijaj
+
+    best_band = None
+    for band in _BAND_GRID:
+        acc, _ = _accuracy(RerankPolicy(skip_margin=best_margin, ambiguous_band=band, skip_floor=skip_floor))
+        if acc >= target_accuracy:
+            best_band = band
+            break
+
+    policy = RerankPolicy(skip_margin=best_margin, ambiguous_band=best_band, skip_floor=skip_floor)
+    accuracy, skip_rate = _accuracy(policy)
+    baseline, _ = _accuracy(RerankPolicy(skip_margin=float("inf"), ambiguous_band=None))
+
+    return {
+        "policy":             policy.to_dict(),
+        "queries":            len(samples),
+        "accuracy":           round(accuracy, 3),
+        "baseline_accuracy":  round(baseline, 3),
+        "expected_skip_rate": round(skip_rate, 3),
+        "skip_floor_agreement": floor_agreement,
+    }
+
+
+def _fit_skip_floor(samples: list[dict], threshold: float, final_k: int) -> tuple[float | None, float | None]:
+    """
+    Próg na score z wyszukiwania, który najlepiej odtwarza filtr score_threshold
+    (CrossEncoder) dla czołowych final_k; przy remisie niższy (mniej odrzuca).
+    Zwraca (próg, odsetek zgodnych decyzji).
+    """
+    points = [
+        (score, s["pair_scores"][doc.page_content] >= threshold)
+        for s in samples
+        for doc, score in zip(s["docs"][:final_k], s["scores"][:final_k])
+    ]
+    if not points:
+        return None, None
+
+    best_floor, best_hits = None, -1
+    for floor in sorted({score for score, _ in points}):
+        hits = sum((score >= floor) == keep for score, keep in points)
+        if hits > best_hits:
+            best_floor, best_hits = floor, hits
+    return best_floor, round(best_hits / len(points), 3)
+
+
+# ---------------------------------------------------------------------------
+# CLI: python -m app.graph.nodes.process_rag.rerank_policy labeled.json
+# ---------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+    parser = argparse.ArgumentParser(description="Kalibracja progów adaptacyjnego rerankingu.")
+    parser.add_argument("labeled", help="JSON z listą {query, expected_source?}")
+    parser.add_argument("--backend", choices=["pinecone", "local"], default="pinecone")
+    parser.add_argument("--target-accuracy", type=float, default=DEFAULT_TARGET_ACCURACY)
+    parser.add_argument("--output", default=None, help="Zapisz wynik (np. rerank_policy.json)")
+    args = parser.parse_args()
+
+    if args.backend == "local":
+        from app.graph.nodes.process_rag.retriever_local import DEFAULT_BM25_PATH, Retriever
+    else:
+        from app.graph.nodes.process_rag.retriever_openai_embed import DEFAULT_BM25_PATH, Retriever
+
+    with open(args.labeled, "r", encoding="utf-8") as f:
+        labeled = json.load(f)
+
+    result = calibrate(
+        Retriever(bm25_path=DEFAULT_BM25_PATH, cache_size=0),
+        labeled,
+        target_accuracy=args.target_accuracy,
+    )
+    print(json.dumps(result, indent=2))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
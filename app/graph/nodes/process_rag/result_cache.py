@@ -0,0 +1,156 @@
+"""
+Cache wyników retrievera (po reranku) dla Lovable docs.
+
+Lista chunków zwracana przez Retriever._retrieve jest deterministyczna dla
+danego zapytania, parametrów retrievera i snapshotu indeksu. Klucz cache:
+
+    (znormalizowane zapytanie, candidates_k, final_k, score_threshold, wersja indeksu)
+
+Wersja indeksu to stempel zapisywany przez skrypty indeksujące
+(bump_index_version) — każde ponowne indeksowanie zmienia klucz, więc
+stare wpisy przestają być trafiane bez ręcznego czyszczenia.
+
+Usage:
+    from app.graph.nodes.process_rag.result_cache import ResultCache, index_version
+
+    cache = ResultCache(maxsize=256)
+    key = cache.make_key(query, 10, 5, 0.3, index_version("lovable-docs"))
+    chunks = cache.get(key)
+"""
+
+import json
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+
+# ---------------------------------------------------------------------------
+# Defaults
+# ---------------------------------------------------------------------------
+
+DEFAULT_CACHE_SIZE = 256
+
+# Plik ze stemplami wersji indeksów — aktualizowany przez skrypty w loveable_dox/
+INDEX_VERSION_FILE = Path("./index_versions.json")
+
+_WHITESPACE  = re.compile(r"\s+")
+_TRAILING    = re.compile(r"[\s?!.,;:]+$")
+
+
+# ---------------------------------------------------------------------------
+# Wersja indeksu
+# ---------------------------------------------------------------------------
+
+# (ścieżka, mtime_ns) → sparsowany plik; stat() zamiast czytania JSON przy każdym zapytaniu
+_versions_memo: dict[Path, tuple[int, dict]] = {}
+
+
+def _read_versions(path: Path) -> dict:
+    try:
+        mtime = path.stat().st_mtime_ns
+    except OSError:
+        return {}
+
+    memo = _versions_memo.get(path)
+    if memo and memo[0] == mtime:
+        return memo[1]
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            versions = json.load(f)
+    except (json.JSONDecodeError, OSError):
+        return {}
+    _versions_memo[path] = (mtime, versions)
+    return versions
+
+
+def index_version(index_name: str, path: str | Path = INDEX_VERSION_FILE) -> str:
+    """
+    Zwróć stempel wersji indeksu; "0" gdy indeks nigdy nie był stemplowany.
+    """
+    return _read_versions(Path(path)).get(index_name, {}).get("version", "0")
+
+
+def bump_index_version(index_name: str, path: str | Path = INDEX_VERSION_FILE) -> str:
+    """
+    Nadaj indeksowi nowy stempel wersji. Wywoływane po każdym (re)indeksowaniu.
+    """
+    path = Path(path)
+    versions = dict(_read_versions(path))
+    version = f"{int(time.time())}-{uuid.uuid4().hex[:8]}"
+    versions[index_name] = {"version": version, "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(versions, f, indent=2)
+    tmp.replace(path)
+    return version
+
+
+# ---------------------------------------------------------------------------
+# Cache
+# ---------------------------------------------------------------------------
+
+def normalize_query(query: str) -> str:
+    """Małe litery, zwinięte białe znaki, bez końcowej interpunkcji."""
+    query = _WHITESPACE.sub(" ", query.strip().lower())
+    return _TRAILING.sub("", query)
+
+
+class ResultCache:
+    """
+    Thread-safe LRU cache wyników retrievera.
+
+    Parameters
+    ----------
+    maxsize : maksymalna liczba zapamiętanych zapytań (0 wyłącza cache)
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits    = 0
+        self.misses  = 0
+        self._data: OrderedDict[tuple, list] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(
+        query:           str,
+        candidates_k:    int,
+        final_k:         int,
+        score_threshold: float | None,
+        version:         str,
+    ) -> tuple:
+        return (normalize_query(query), candidates_k, final_k, score_threshold, version)
+
+    def get(self, key: tuple) -> list | None:
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return list(value)
+
+    def put(self, key: tuple, value: list) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = list(value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
@@ -9,12 +9,17 @@ Usage:
     # przekaż context do LLM jako kontekst
 """
 
+import os
 import logging
 from pathlib import Path
 
 from langchain_chroma import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
-from sentence_transformers import CrossEncoder
+
+from app.graph.nodes.process_rag.bm25 import BM25Index, hybrid_candidates
+from app.graph.nodes.process_rag.model_loader import DEFAULT_BACKEND, load_cross_encoder, load_embeddings
+from app.graph.nodes.process_rag.rerank_policy import RerankPolicy, rerank_candidates
+from app.graph.nodes.process_rag.result_cache import DEFAULT_CACHE_SIZE, ResultCache, index_version
+from utils.metrics import METRICS, timed
 
 logger = logging.getLogger(__name__)
 
@@ -48,6 +53,10 @@ class Retriever:
     candidates_k  : ile kandydatów pobrać z Chroma przed rerankiem
     final_k       : ile wyników zwrócić po reranku
     score_threshold : minimalny rerank score (0.0–1.0); None = brak filtrowania
+    cache_size      : ile zapytań trzymać w cache wyników (0 wyłącza cache)
+    bm25_path       : indeks BM25 (bm25.json) do hybrydowego wyszukiwania z RRF; None = tylko dense
+    rerank_policy   : RerankPolicy — adaptacyjne pomijanie rerankingu; None = zawsze pełny rerank
+    inference_backend : "torch" | "onnx" | "onnx-int8" — runtime modeli bge na CPU (patrz model_loader.py)
     """
 
     def __init__(
@@ -59,17 +68,21 @@ class Retriever:
         candidates_k:    int        = 10,
         final_k:         int        = 5,
         score_threshold: float | None = 0.3,
+        cache_size:      int        = DEFAULT_CACHE_SIZE,
+        bm25_path:       str | Path | None = None,
+        rerank_policy:   RerankPolicy | None = None,
+        inference_backend: str                 = DEFAULT_BACKEND,
     ):
         self.candidates_k    = candidates_k
         self.final_k         = final_k
         self.score_threshold = score_threshold
+        self.collection      = collection
+        self.cache           = ResultCache(maxsize=cache_size)
+        self.bm25            = None
+        self.rerank_policy   = rerank_policy
 
         logger.info("Loading embedding model: %s", embed_model)
-        embeddings = HuggingFaceEmbeddings(
-            model_name=embed_model,
-            model_kwargs={"device": "cpu"},
-            encode_kwargs={"normalize_embeddings": True},
-        )
+        embeddings = load_embeddings(embed_model, backend=inference_backend)
 
         logger.info("Connecting to Chroma: %s / %s", chroma_dir, collection)
         self.vectorstore = Chroma(
@@ -81,7 +94,13 @@ class Retriever:
         self.reranker = None
         if rerank_model:
             logger.info("Loading reranker: %s", rerank_model)
-            self.reranker = CrossEncoder(rerank_model)
+            self.reranker = load_cross_encoder(rerank_model, backend=inference_backend)
+
+        if bm25_path and os.path.exists(bm25_path):
+            logger.info("Loading BM25 index: %s", bm25_path)
+            self.bm25 = BM25Index.load(bm25_path)
+        elif bm25_path:
+            logger.warning("BM25 index not found: %s — dense retrieval only", bm25_path)
 
         logger.info("Retriever ready.")
 
@@ -144,43 +163,49 @@ class Retriever:
     # ------------------------------------------------------------------
 
     def _retrieve(self, query: str):
-        """Pobierz kandydatów z Chroma, opcjonalnie zreankuj."""
-
-        # bge-small wymaga prefixu przy zapytaniach
-        prefixed_query = BGE_QUERY_PREFIX + query
-
-        candidates = self.vectorstore.similarity_search(
-            prefixed_query,
-            k=self.candidates_k,
+        """Zwróć wynik z cache albo wykonaj pełne wyszukiwanie (+ rerank)."""
+        key = self.cache.make_key(
+            query,
+            self.candidates_k,
+            self.final_k,
+            self.score_threshold,
+            index_version(self.collection),
         )
+        chunks = self.cache.get(key)
+        if chunks is not None:
+            METRICS.incr("rag.cache_hit")
+            return chunks
 
-        if not candidates:
-            return []
-
-        if self.reranker is None:
-            return candidates[:self.final_k]
+        METRICS.incr("rag.cache_miss")
+        chunks = self._retrieve_uncached(query)
+        self.cache.put(key, chunks)
+        return chunks
 
-        return self._rerank(query, candidates)
-
-    def _rerank(self, query: str, candidates):
-        """Użyj CrossEncoder do rerankingu kandydatów."""
-
-        # CrossEncoder nie używa prefixu — dostaje surowe zapytanie
-        pairs = [(query, doc.page_content) for doc in candidates]
-        scores = self.reranker.predict(pairs)
-
-
-        ranked = sorted(
-            zip(scores, candidates),
-            key=lambda x: x[0],
-            reverse=True,
+    def _retrieve_uncached(self, query: str):
+        """Pobierz kandydatów z Chroma, opcjonalnie zreankuj."""
+        return rerank_candidates(
+            self.reranker,
+            query,
+            self._candidates(query),
+            self.final_k,
+            score_threshold=self.score_threshold,
+            policy=self.rerank_policy,
         )
 
-        # Opcjonalne filtrowanie po minimalnym score
-        if self.score_threshold is not None:
-            ranked = [(s, d) for s, d in ranked if s >= self.score_threshold]
+    def _candidates(self, query: str) -> list[tuple]:
+        """Kandydaci (doc, score) malejąco — score z dense albo RRF przy hybrydzie."""
+        # bge-small wymaga prefixu przy zapytaniach
+        prefixed_query = BGE_QUERY_PREFIX + query
+
+        # relevance score (0–1, wyżej = lepiej) niezależnie od metryki kolekcji
+        with timed("rag.dense_search"):
+            scored = self.vectorstore.similarity_search_with_relevance_scores(
+                prefixed_query,
+                k=self.candidates_k,
+            )
 
-        return [doc for _, doc in ranked[:self.final_k]]
+        # Hybryda: BM25 + dense połączone przez reciprocal rank fusion
+        return hybrid_candidates(self.bm25, query, scored, k=self.candidates_k)
 
     @staticmethod
     def _build_section(metadata: dict) -> str:
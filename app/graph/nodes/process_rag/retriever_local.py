@@ -0,0 +1,302 @@
+"""
+Retriever for Lovable docs — lokalny indeks NumPy (bez sieci, bez Chroma).
+
+Indeks budowany przez app/loveable_dox/index_docs_local.py:
+    <index_dir>/embeddings.npy   — macierz float32 [n_chunks, dim], L2-znormalizowana
+    <index_dir>/chunks.jsonl     — page_content + metadata, wiersz i ↔ wektor i
+    <index_dir>/manifest.json    — model, wymiar, liczba chunków, nazwa indeksu
+
+Macierz jest memory-mapped (np.load(mmap_mode="r")), a top-k liczone dokładnie
+jednym iloczynem macierz·wektor + argpartition. Przy ~kilku tysiącach chunków
+to ułamek milisekundy — IVF/HNSW nie dałby tu zysku.
+
+Usage:
+    from app.graph.nodes.process_rag.retriever_local import Retriever
+
+    r = Retriever(index_dir="./local_index")
+    context = r.search("how to connect Supabase")
+"""
+
+import json
+import logging
+import os
+from pathlib import Path
+
+import numpy as np
+from langchain_core.documents import Document
+
+from app.graph.nodes.process_rag.bm25 import BM25Index, hybrid_candidates
+from app.graph.nodes.process_rag.model_loader import DEFAULT_BACKEND, load_cross_encoder, load_embeddings
+from app.graph.nodes.process_rag.rerank_policy import RerankPolicy, rerank_candidates
+from app.graph.nodes.process_rag.result_cache import DEFAULT_CACHE_SIZE, ResultCache, index_version
+from utils.metrics import METRICS, timed
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Defaults
+# ---------------------------------------------------------------------------
+
+DEFAULT_INDEX_DIR    = "./local_index"
+DEFAULT_RERANK_MODEL = "BAAI/bge-reranker-base"
+
+EMBEDDINGS_FILE = "embeddings.npy"
+CHUNKS_FILE     = "chunks.jsonl"
+MANIFEST_FILE   = "manifest.json"
+
+DEFAULT_BM25_PATH = f"{DEFAULT_INDEX_DIR}/bm25.json"
+
+# Prefix wymagany przez bge-small przy wyszukiwaniu (NIE przy indeksowaniu)
+BGE_QUERY_PREFIX = "Represent this sentence for searching relevant passages: "
+
+
+# ---------------------------------------------------------------------------
+# Retriever
+# ---------------------------------------------------------------------------
+
+class Retriever:
+    """
+    Wyszukiwarka semantyczna po lokalnej macierzy embeddingów z opcjonalnym rerankerem.
+
+    Parameters
+    ----------
+    index_dir       : folder z embeddings.npy / chunks.jsonl / manifest.json
+    rerank_model    : CrossEncoder do rerankingu — None wyłącza reranking
+    candidates_k    : ile kandydatów pobrać z macierzy przed rerankiem
+    final_k         : ile wyników zwrócić po reranku
+    score_threshold : minimalny rerank score (0.0–1.0); None = brak filtrowania
+    cache_size      : ile zapytań trzymać w cache wyników (0 wyłącza cache)
+    bm25_path       : indeks BM25 (bm25.json) do hybrydowego wyszukiwania z RRF; None = tylko dense
+    rerank_policy   : RerankPolicy — adaptacyjne pomijanie rerankingu; None = zawsze pełny rerank
+    inference_backend : "torch" | "onnx" | "onnx-int8" — runtime modeli bge na CPU (patrz model_loader.py)
+    """
+
+    def __init__(
+        self,
+        index_dir:       str | Path = DEFAULT_INDEX_DIR,
+        rerank_model:    str | None = DEFAULT_RERANK_MODEL,
+        candidates_k:    int        = 10,
+        final_k:         int        = 5,
+        score_threshold: float | None = 0.3,
+        cache_size:      int        = DEFAULT_CACHE_SIZE,
+        bm25_path:       str | Path | None = None,
+        rerank_policy:   RerankPolicy | None = None,
+        inference_backend: str                 = DEFAULT_BACKEND,
+    ):
+        self.candidates_k    = candidates_k
+        self.final_k         = final_k
+        self.score_threshold = score_threshold
+        self.cache           = ResultCache(maxsize=cache_size)
+        self.bm25            = None
+        self.rerank_policy   = rerank_policy
+
+        index_dir = Path(index_dir)
+        manifest_path = index_dir / MANIFEST_FILE
+        if not manifest_path.exists():
+            raise FileNotFoundError(
+                f"Local index not found in '{index_dir}'. "
+                "Build it with: python -m app.loveable_dox.index_docs_local"
+            )
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        self.index_name = manifest["index_name"]
+
+        logger.info("Memory-mapping embeddings: %s", index_dir / EMBEDDINGS_FILE)
+        self.matrix: np.ndarray = np.load(index_dir / EMBEDDINGS_FILE, mmap_mode="r")
+
+        with open(index_dir / CHUNKS_FILE, "r", encoding="utf-8") as f:
+            self.chunks = [
+                Document(page_content=row["page_content"], metadata=row["metadata"])
+                for row in map(json.loads, f)
+            ]
+
+        if self.matrix.shape != (len(self.chunks), manifest["dim"]):
+            raise ValueError(
+                f"Corrupted local index: matrix {self.matrix.shape}, "
+                f"{len(self.chunks)} chunks, dim={manifest['dim']}"
+            )
+
+        logger.info("Loading embedding model: %s", manifest["model"])
+        self.embeddings = load_embeddings(manifest["model"], backend=inference_backend)
+
+        self.reranker = None
+        if rerank_model:
+            logger.info("Loading reranker: %s", rerank_model)
+            self.reranker = load_cross_encoder(rerank_model, backend=inference_backend)
+
+        if bm25_path and os.path.exists(bm25_path):
+            logger.info("Loading BM25 index: %s", bm25_path)
+            self.bm25 = BM25Index.load(bm25_path)
+        elif bm25_path:
+            logger.warning("BM25 index not found: %s — dense retrieval only", bm25_path)
+
+        logger.info("Retriever ready (%d chunks, dim=%d).", *self.matrix.shape)
+
+    # ------------------------------------------------------------------
+    # Publiczne API
+    # ------------------------------------------------------------------
+
+    def search(self, query: str) -> str:
+        """
+        Wyszukaj najbardziej trafne fragmenty dokumentacji dla podanego zapytania.
+
+        Zwraca gotowy string do wklejenia jako kontekst dla LLM.
+        Format:
+            [1] URL: https://...
+            section: h1 > h2
+            ---
+            <treść chunka>
+
+            [2] ...
+        """
+        chunks = self._retrieve(query)
+        if not chunks:
+            return "Nie znaleziono pasujących fragmentów dokumentacji."
+        return self._format_for_llm(chunks)
+
+    def search_raw(self, query: str) -> list[dict]:
+        """
+        Jak search(), ale zwraca listę słowników zamiast stringa.
+
+        Każdy element:
+            {
+                "url":     str,
+                "section": str,
+                "h1":      str,
+                "h2":      str,
+                "h3":      str,
+                "content": str,
+            }
+        """
+        chunks = self._retrieve(query)
+        return [
+            {
+                "url":     c.metadata.get("source", ""),
+                "section": self._build_section(c.metadata),
+                "h1":      c.metadata.get("h1", ""),
+                "h2":      c.metadata.get("h2", ""),
+                "h3":      c.metadata.get("h3", ""),
+                "content": c.page_content,
+            }
+            for c in chunks
+        ]
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _retrieve(self, query: str):
+        """Zwróć wynik z cache albo wykonaj pełne wyszukiwanie (+ rerank)."""
+        key = self.cache.make_key(
+            query,
+            self.candidates_k,
+            self.final_k,
+            self.score_threshold,
+            index_version(self.index_name),
+        )
+        chunks = self.cache.get(key)
+        if chunks is not None:
+            METRICS.incr("rag.cache_hit")
+            return chunks
+
+        METRICS.incr("rag.cache_miss")
+        chunks = self._retrieve_uncached(query)
+        self.cache.put(key, chunks)
+        return chunks
+
+    def _retrieve_uncached(self, query: str):
+        """Pobierz kandydatów z lokalnej macierzy, opcjonalnie zreankuj."""
+        return rerank_candidates(
+            self.reranker,
+            query,
+            self._candidates(query),
+            self.final_k,
+            score_threshold=self.score_threshold,
+            policy=self.rerank_policy,
+        )
+
+    def _candidates(self, query: str) -> list[tuple]:
+        """Kandydaci (doc, score) malejąco — score z dense albo RRF przy hybrydzie."""
+        with timed("rag.embed"):
+            query_vec = np.asarray(
+                self.embeddings.embed_query(BGE_QUERY_PREFIX + query),
+                dtype=np.float32,
+            )
+        with timed("rag.vector_query"):
+            top = self._top_k(query_vec, self.candidates_k)
+        scored = [(self.chunks[i], s) for i, s in top]
+
+        # Hybryda: BM25 + dense połączone przez reciprocal rank fusion
+        return hybrid_candidates(self.bm25, query, scored, k=self.candidates_k)
+
+    def _top_k(self, query_vec: np.ndarray, k: int) -> list[tuple[int, float]]:
+        """Dokładne top-k po cosine (wektory znormalizowane → iloczyn skalarny)."""
+        n = self.matrix.shape[0]
+        if n == 0:
+            return []
+        k = min(k, n)
+
+        scores = self.matrix @ query_vec
+        if k < n:
+            top = np.argpartition(scores, n - k)[n - k:]
+        else:
+            top = np.arange(n)
+        top = top[np.argsort(scores[top])[::-1]]
+        return [(int(i), float(scores[i])) for i in top]
+
+    @staticmethod
+    def _build_section(metadata: dict) -> str:
+        """Zbuduj czytelną ścieżkę sekcji z nagłówków h1/h2/h3."""
+        parts = [metadata.get(h, "") for h in ("h1", "h2", "h3")]
+        parts = [p for p in parts if p]
+        return " > ".join(parts) if parts else "—"
+
+    @staticmethod
+    def _format_for_llm(chunks) -> str:
+        """Formatuj chunki jako czytelny kontekst dla LLM."""
+        parts = []
+        for i, chunk in enumerate(chunks, 1):
+            url     = chunk.metadata.get("source", "")
+            section = Retriever._build_section(chunk.metadata)
+
+            parts.append(
+                f"[{i}] URL: {url}\n"
+                f"    section: {section}\n"
+                f"---\n"
+                f"{chunk.page_content}"
+            )
+
+        return "\n\n".join(parts)
+
+
+# ---------------------------------------------------------------------------
+# Szybki test z CLI: python -m app.graph.nodes.process_rag.retriever_local "zapytanie"
+# ---------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("query", nargs="*", default=["how to connect Supabase to Lovable"])
+    parser.add_argument("--index-dir", default=DEFAULT_INDEX_DIR)
+    parser.add_argument("--no-rerank", action="store_true", help="Wyłącz CrossEncoder")
+    args = parser.parse_args()
+
+    r = Retriever(
+        index_dir=args.index_dir,
+        rerank_model=None if args.no_rerank else DEFAULT_RERANK_MODEL,
+    )
+    query = " ".join(args.query)
+
+    query_vec = np.asarray(r.embeddings.embed_query(BGE_QUERY_PREFIX + query), dtype=np.float32)
+    start = time.perf_counter()
+    r._top_k(query_vec, r.candidates_k)
+    logger.info("Vector top-%d: %.3f ms", r.candidates_k, (time.perf_counter() - start) * 1000)
+
+    print("\n" + "=" * 60)
+    print(f"Query: {query}")
+    print("=" * 60 + "\n")
+    print(r.search(query))
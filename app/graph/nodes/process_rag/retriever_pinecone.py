@@ -9,13 +9,18 @@ Usage:
     # przekaż context do LLM jako kontekst
 """
 
+import os
 import logging
 
 from langchain_pinecone import PineconeVectorStore
-from langchain_huggingface import HuggingFaceEmbeddings
-from sentence_transformers import CrossEncoder
 from pinecone import Pinecone
 
+from app.graph.nodes.process_rag.bm25 import BM25Index, hybrid_candidates
+from app.graph.nodes.process_rag.model_loader import DEFAULT_BACKEND, load_cross_encoder, load_embeddings
+from app.graph.nodes.process_rag.rerank_policy import RerankPolicy, rerank_candidates
+from app.graph.nodes.process_rag.result_cache import DEFAULT_CACHE_SIZE, ResultCache, index_version
+from utils.metrics import METRICS, timed
+
 logger = logging.getLogger(__name__)
 
 # ---------------------------------------------------------------------------
@@ -25,6 +30,7 @@ logger = logging.getLogger(__name__)
 DEFAULT_INDEX_NAME   = "lovable-docs"
 DEFAULT_EMBED_MODEL  = "BAAI/bge-small-en-v1.5"
 DEFAULT_RERANK_MODEL = "BAAI/bge-reranker-base"
+DEFAULT_BM25_PATH    = "./bm25/lovable-docs.json"
 
 # Prefix wymagany przez bge-small przy wyszukiwaniu (NIE przy indeksowaniu)
 BGE_QUERY_PREFIX = "Represent this sentence for searching relevant passages: "
@@ -47,6 +53,10 @@ class Retriever:
     candidates_k    : ile kandydatów pobrać z Pinecone przed rerankiem
     final_k         : ile wyników zwrócić po reranku
     score_threshold : minimalny rerank score (0.0–1.0); None = brak filtrowania
+    cache_size      : ile zapytań trzymać w cache wyników (0 wyłącza cache)
+    bm25_path       : indeks BM25 (bm25.json) do hybrydowego wyszukiwania z RRF; None = tylko dense
+    rerank_policy   : RerankPolicy — adaptacyjne pomijanie rerankingu; None = zawsze pełny rerank
+    inference_backend : "torch" | "onnx" | "onnx-int8" — runtime modeli bge na CPU (patrz model_loader.py)
     """
 
     def __init__(
@@ -58,10 +68,18 @@ class Retriever:
         candidates_k:    int        = 10,
         final_k:         int        = 5,
         score_threshold: float | None = 0.3,
+        cache_size:      int        = DEFAULT_CACHE_SIZE,
+        bm25_path:       str | None = None,
+        rerank_policy:   RerankPolicy | None = None,
+        inference_backend: str                 = DEFAULT_BACKEND,
     ):
         self.candidates_k    = candidates_k
         self.final_k         = final_k
         self.score_threshold = score_threshold
+        self.index_name      = index_name
+        self.cache           = ResultCache(maxsize=cache_size)
+        self.bm25            = None
+        self.rerank_policy   = rerank_policy
 
         # Sprawdź czy indeks istnieje
         pc = Pinecone(api_key=api_key, score_threshold=-10.0)
@@ -72,11 +90,7 @@ class Retriever:
             )
 
         logger.info("Loading embedding model: %s", embed_model)
-        embeddings = HuggingFaceEmbeddings(
-            model_name=embed_model,
-            model_kwargs={"device": "cpu"},
-            encode_kwargs={"normalize_embeddings": True},
-        )
+        embeddings = load_embeddings(embed_model, backend=inference_backend)
 
         logger.info("Connecting to Pinecone index: %s", index_name)
         self.vectorstore = PineconeVectorStore(
@@ -88,7 +102,13 @@ class Retriever:
         self.reranker = None
         if rerank_model:
             logger.info("Loading reranker: %s", rerank_model)
-            self.reranker = CrossEncoder(rerank_model)
+            self.reranker = load_cross_encoder(rerank_model, backend=inference_backend)
+
+        if bm25_path and os.path.exists(bm25_path):
+            logger.info("Loading BM25 index: %s", bm25_path)
+            self.bm25 = BM25Index.load(bm25_path)
+        elif bm25_path:
+            logger.warning("BM25 index not found: %s — dense retrieval only", bm25_path)
 
         logger.info("Retriever ready.")
 
@@ -138,29 +158,43 @@ class Retriever:
     # ------------------------------------------------------------------
 
     def _retrieve(self, query: str):
-        """Pobierz kandydatów z Pinecone, opcjonalnie zreankuj."""
-        prefixed_query = BGE_QUERY_PREFIX + query
-        candidates = self.vectorstore.similarity_search(prefixed_query, k=self.candidates_k)
-
-        if not candidates:
-            return []
-
-        if self.reranker is None:
-            return candidates[:self.final_k]
-
-        return self._rerank(query, candidates)
+        """Zwróć wynik z cache albo wykonaj pełne wyszukiwanie (+ rerank)."""
+        key = self.cache.make_key(
+            query,
+            self.candidates_k,
+            self.final_k,
+            self.score_threshold,
+            index_version(self.index_name),
+        )
+        chunks = self.cache.get(key)
+        if chunks is not None:
+            METRICS.incr("rag.cache_hit")
+            return chunks
 
-    def _rerank(self, query: str, candidates):
-        """Użyj CrossEncoder do rerankingu kandydatów."""
-        pairs  = [(query, doc.page_content) for doc in candidates]
-        scores = self.reranker.predict(pairs)
+        METRICS.incr("rag.cache_miss")
+        chunks = self._retrieve_uncached(query)
+        self.cache.put(key, chunks)
+        return chunks
 
-        ranked = sorted(zip(scores, candidates), key=lambda x: x[0], reverse=True)
+    def _retrieve_uncached(self, query: str):
+        """Pobierz kandydatów z Pinecone, opcjonalnie zreankuj."""
+        return rerank_candidates(
+            self.reranker,
+            query,
+            self._candidates(query),
+            self.final_k,
+            score_threshold=self.score_threshold,
+            policy=self.rerank_policy,
+        )
 
-        if self.score_threshold is not None:
-            ranked = [(s, d) for s, d in ranked if s >= self.score_threshold]
+    def _candidates(self, query: str) -> list[tuple]:
+        """Kandydaci (doc, score) malejąco — score z dense albo RRF przy hybrydzie."""
+        prefixed_query = BGE_QUERY_PREFIX + query
+        with timed("rag.dense_search"):
+            scored = self.vectorstore.similarity_search_with_score(prefixed_query, k=self.candidates_k)
 
-        return [doc for _, doc in ranked[:self.final_k]]
+        # Hybryda: BM25 + dense połączone przez reciprocal rank fusion
+        return hybrid_candidates(self.bm25, query, scored, k=self.candidates_k)
 
     @staticmethod
     def _format_for_llm(chunks) -> str:
@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 from langchain_core.prompts import ChatPromptTemplate
 
 from app.graph.state import State
@@ -5,7 +7,9 @@ from app.graph.nodes.models import ReplyModel
 from config import get_openai
 from app.graph.nodes.reputation_response.prompt import GENERATE_REPUTATION_REPLY
 
-llm = get_openai().with_structured_output(ReplyModel)
+@lru_cache(maxsize=1)
+def get_llm():
+    return get_openai().with_structured_output(ReplyModel)
 
 async def reputation_response(state: State) -> State:
     original_message = state["message"]["message"]
@@ -25,7 +29,7 @@ async def reputation_response(state: State) -> State:
           Insight: {insight}.
           ''')])
     
-    chain = prompt | llm
+    chain = prompt | get_llm()
 
     try:
         response: ReplyModel = await chain.ainvoke({})
@@ -35,7 +39,7 @@ async def reputation_response(state: State) -> State:
             cta_type=response.cta_type,
         )}
     except:
-        {"reply": ReplyModel(
+        return {"reply": ReplyModel(
             reply="Response generation error",
             tone="Response generation error",
             cta_type="Response generation error",
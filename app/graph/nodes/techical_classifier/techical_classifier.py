@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 from langchain_core.prompts import ChatPromptTemplate
 
 from app.graph.nodes.techical_classifier.prompt import TECHNICAL_CLASSIFIER_PROMPT
@@ -5,7 +7,9 @@ from app.graph.nodes.models import TechnicalClassification
 from app.graph.state import State
 from config import get_openai
 
-llm = get_openai().with_structured_output(TechnicalClassification)
+@lru_cache(maxsize=1)
+def get_llm():
+    return get_openai().with_structured_output(TechnicalClassification)
 
 
 async def techical_classifier(state: State) -> State:
@@ -13,7 +17,7 @@ async def techical_classifier(state: State) -> State:
     prompt = ChatPromptTemplate.from_messages(
         [("system", TECHNICAL_CLASSIFIER_PROMPT), ("human", f"Post:\n{post}")], template_format="mustache"
     )
-    chain = prompt | llm
+    chain = prompt | get_llm()
 
     try:
         response: TechnicalClassification = await chain.ainvoke({})
@@ -0,0 +1,141 @@
+"""
+Regression check + benchmark for clean_docs._clean_body (fast engine)
+against clean_docs._clean_body_sequential (one pass per pattern).
+
+Corpus:
+  - every document in cleaned_docs (doc store files or legacy pickles), as is
+  - the same documents with Tavily-style noise injected at random lines
+    (images, linked badges, links, HTML, comments, URLs, rules, lone bullets,
+    invisible anchors, nav lines, blank-line runs) — seeded, so reproducible
+
+Any output that is not byte-identical is reported with the first differing
+position and the script exits with status 1.
+
+Usage:
+    python -m app.loveable_dox.bench_clean_body
+    python -m app.loveable_dox.bench_clean_body ./cleaned_docs --variants 5 --repeat 3
+"""
+
+import sys
+import time
+import random
+import argparse
+from pathlib import Path
+
+from app.loveable_dox.clean_docs import _clean_body, _clean_body_sequential
+from app.loveable_dox.doc_store import iter_docs
+
+NOISE = [
+    "![screenshot](https://docs.lovable.dev/images/editor.png)",
+    "[![badge](https://img.shields.io/badge/x-y-green)](https://github.com/lovable)",
+    "See [the guide](https://docs.lovable.dev/introduction) for details.",
+    "[https://lovable.dev](https://lovable.dev)",
+    "[**Bold** <b>link</b>](https://x.dev/a)",
+    "[ ](https://x.dev/empty-space)",
+    "[](#overview)",
+    "[​](#getting-started)",
+    "## Getting started[​](#getting-started)",
+    '<div class="callout">',
+    "</div>",
+    "<!-- short comment -->",
+    "<!-- " + "long comment without a closing bracket " * 4 + "-->",
+    "<!--\nmulti\n- line\n-->",
+    "Visit https://lovable.dev/pricing or https://x.dev/a_(b) now",
+    "---",
+    "***",
+    "=====",
+    "*",
+    "  -  ",
+    "* ![icon](https://x.dev/i.svg)",
+    "- [](#anchor)",
+    "* <!-- bullet comment -->",
+    "- <span>",
+    "Home > Docs > Features",
+    "On this page",
+    "Skip to main content",
+    "Was it useful?",
+    "​﻿invisible‍ chars",
+    "tabs\t\tand   spaces",
+    "",
+    "",
+    "   ",
+    "\n\n\n",
+]
+
+
+def load_corpus(cleaned_dir: str | Path) -> list[str]:
+    return [doc.page_content for doc in iter_docs(cleaned_dir)]
+
+
+def add_noise(text: str, rng: random.Random, density: float = 0.3) -> str:
+    lines = text.split("\n")
+    out = []
+    for line in lines:
+        if rng.random() < density:
+            out.append(rng.choice(NOISE))
+        if rng.random() < density / 2:
+            line = line + " " + rng.choice(NOISE)
+        out.append(line)
+    return "\n".join(out)
+
+
+def build_corpus(texts: list[str], variants: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    corpus = list(texts)
+    for _ in range(variants):
+        corpus.extend(add_noise(t, rng) for t in texts)
+    corpus.append("\n".join(NOISE))
+    return corpus
+
+
+def check(corpus: list[str]) -> int:
+    mismatches = 0
+    for i, text in enumerate(corpus):
+        expected = _clean_body_sequential(text)
+        actual   = _clean_body(text)
+        if actual != expected:
+            mismatches += 1
+            pos = next((j for j, (a, b) in enumerate(zip(actual, expected)) if a != b), min(len(actual), len(expected)))
+            print(f"MISMATCH #{i} at {pos}: fast={actual[pos - 40:pos + 40]!r} reference={expected[pos - 40:pos + 40]!r}")
+    return mismatches
+
+
+def bench(fn, corpus: list[str], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in corpus:
+            fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Regression + benchmark for the fast _clean_body.")
+    parser.add_argument("cleaned_dir", nargs="?", default="./cleaned_docs", help="Folder with cleaned docs")
+    parser.add_argument("--variants", type=int, default=3, help="Noisy copies of every document (default: 3)")
+    parser.add_argument("--seed",     type=int, default=1234, help="Noise RNG seed")
+    parser.add_argument("--repeat",   type=int, default=3, help="Benchmark repetitions, best is reported")
+    args = parser.parse_args()
+
+    texts = load_corpus(args.cleaned_dir)
+    if not texts:
+        print(f"No documents in {args.cleaned_dir}")
+        return 1
+    corpus = build_corpus(texts, args.variants, args.seed)
+    size_mb = sum(len(t) for t in corpus) / 1e6
+    print(f"Corpus: {len(corpus)} texts ({len(texts)} clean + {len(corpus) - len(texts)} noisy), {size_mb:.1f} MB")
+
+    mismatches = check(corpus)
+    print(f"Regression: {len(corpus) - mismatches}/{len(corpus)} byte-identical")
+
+    for name, subset in (("cleaned_docs", texts), ("full corpus", corpus)):
+        t_ref   = bench(_clean_body_sequential, subset, args.repeat)
+        t_fast  = bench(_clean_body, subset, args.repeat)
+        print(f"{name:<13} sequential {t_ref:7.3f}s | fast {t_fast:7.3f}s | speedup x{t_ref / t_fast:.2f}")
+
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,461 @@
+"""
+Crawl orchestrator for docs.lovable.dev: concurrent section crawls with
+change detection, handing only changed pages to cleaning and indexing.
+
+  - every docs section is one crawl (TavilyCrawl, max_depth=2 — as the
+    *_crawl_result files were produced by hand); sections run concurrently,
+    at most `concurrency` at a time and `rpm` crawl starts per minute, with
+    retries + backoff per section
+  - crawl state (./crawl_state.json) keeps the sha1 of the raw content per
+    URL; a page whose fetched content hashes the same stops here. The ETag
+    is stored too when the crawler reports one (the stub does; Tavily does
+    not), for a crawler that can skip the fetch with a conditional request —
+    once the content is downloaded, its hash is what decides.
+  - sections overlap (a depth-2 crawl of features/ai also returns pages
+    from integrations/…), so a URL is compared once per run, whichever
+    section returned it first
+  - new / changed pages are written to the raw crawl folder and patched into
+    the cleaned doc store (clean_docs.update_cleaned_docs); pages missing
+    from a section that crawled successfully are removed from both — an
+    empty result for a section that had pages counts as a failed crawl
+  - the indexers are already incremental by content hash, so re-running one
+    over the updated store only embeds and upserts the changed chunks
+
+Crawlers are plain async callables (url, params) → [{"url", "raw_content", "etag"?}],
+so the orchestrator runs offline against StubCrawler (pages from existing crawl files).
+
+Usage:
+    python -m app.loveable_dox.crawl                                   # all sections, Tavily
+    python -m app.loveable_dox.crawl --sections features/ai integrations/stripe --index chroma
+    python -m app.loveable_dox.crawl --stub ./cleaned_docs --concurrency 8 --dry-run
+
+    report = await update(SECTIONS, TavilyCrawler(), index="chroma")
+"""
+
+import json
+import random
+import asyncio
+import hashlib
+import logging
+import argparse
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Awaitable, Callable
+
+from langchain_core.documents import Document
+
+from app.loveable_dox.doc_store import convert_pickles, iter_docs, store_files, write_docs
+from app.loveable_dox.openai_embedder import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+BASE_URL            = "https://docs.lovable.dev"
+DEFAULT_STATE_PATH  = "./crawl_state.json"
+DEFAULT_CRAWL_DIR   = "./crawl_results"
+DEFAULT_CLEANED_DIR = "./cleaned_docs"
+CRAWL_PARAMS        = {"max_depth": 2}
+FILE_SUFFIX         = "_crawl_result"
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_RPM         = 20        # crawl starts per minute
+CRAWL_TIMEOUT       = 600.0     # seconds per section crawl
+MAX_ATTEMPTS        = 3
+BACKOFF_BASE        = 5.0       # seconds, doubled per attempt (+ jitter)
+
+# Section name (file stem without FILE_SUFFIX) → docs path
+SECTIONS: dict[str, str] = {
+    "dox":                                  "",
+    "features_agent-mode":                  "features/agent-mode",
+    "features_ai":                          "features/ai",
+    "features_browser-testing":             "features/browser-testing",
+    "features_business-scim":               "features/business/scim",
+    "features_cloud":                       "features/cloud",
+    "features_code-mode":                   "features/code-mode",
+    "features_collaboration":               "features/collaboration",
+    "features_custom-domain":               "features/custom-domain",
+    "features_design-systems":              "features/design-systems",
+    "features_design-templates":            "features/design-templates",
+    "features_design":                      "features/design",
+    "features_google-auth":                 "features/google-auth",
+    "features_integrations-introduction":   "features/integrations-introduction",
+    "features_knowledge":                   "features/knowledge",
+    "features_plan-mode":                   "features/plan-mode",
+    "features_publish":                     "features/publish",
+    "features_security-center":             "features/security-center",
+    "features_security-view":               "features/security-view",
+    "features_security":                    "features/security",
+    "features_testing":                     "features/testing",
+    "integrations_ai":                      "integrations/ai",
+    "integrations_build-with-url":          "integrations/build-with-url",
+    "integrations_cloud":                   "integrations/cloud",
+    "integrations_eleven-labs":             "integrations/eleven-labs",
+    "integrations_firecrawl":               "integrations/firecrawl",
+    "integrations_github":                  "integrations/github",
+    "integrations_introduction":            "integrations/introduction",
+    "integrations_mcp-servers":             "integrations/mcp-servers",
+    "integrations_perplexity":              "integrations/perplexity",
+    "integrations_shopify":                 "integrations/shopify",
+    "integrations_stripe":                  "integrations/stripe",
+    "integrations_supabase":                "integrations/supabase",
+    "tips-tricks-best-practice":            "tips-tricks/best-practice",
+}
+
+Crawler = Callable[[str, dict], Awaitable[list[dict]]]
+
+
+def section_url(path: str) -> str:
+    return f"{BASE_URL}/{path}" if path else BASE_URL
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+# ---------------------------------------------------------------------------
+# Crawlers
+# ---------------------------------------------------------------------------
+
+class TavilyCrawler:
+    """TavilyCrawl tool as a Crawler (TAVILY_API_KEY from the environment)."""
+
+    def __init__(self, **tool_kwargs):
+        from langchain_tavily import TavilyCrawl
+
+        self.tool = TavilyCrawl(**tool_kwargs)
+
+    async def __call__(self, url: str, params: dict) -> list[dict]:
+        response = await self.tool.ainvoke({"url": url, **params})
+        if isinstance(response, dict) and "error" in response:
+            raise RuntimeError(f"Tavily crawl of {url} failed: {response['error']}")
+        return [
+            {"url": r["url"], "raw_content": r.get("raw_content") or ""}
+            for r in response.get("results", [])
+        ]
+
+
+class StubCrawler:
+    """
+    Offline crawler for tests and dry runs: serves fixed pages per section URL,
+    with a simulated latency, an ETag per page (sha1 of the content) and
+    optional failures ({url: number of calls that raise before succeeding}).
+    """
+
+    def __init__(self, pages: dict[str, list[dict]], delay: float = 0.05, failures: dict[str, int] | None = None):
+        self.pages    = pages
+        self.delay    = delay
+        self.failures = dict(failures or {})
+        self.calls: list[str] = []
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    @classmethod
+    def from_folder(cls, folder: str | Path, sections: dict[str, str] = SECTIONS, **kwargs) -> "StubCrawler":
+        """Pages from existing crawl files (<section>_crawl_result.jsonl[.zst] / .pkl)."""
+        folder = Path(folder)
+        by_stem = {p.name.split(".", 1)[0]: p for p in sorted(folder.glob("*.pkl")) + store_files(folder)}
+        pages = {}
+        for name, path in sections.items():
+            source = by_stem.get(name + FILE_SUFFIX)
+            if source is not None:
+                pages[section_url(path)] = [
+                    {"url": d.metadata.get("source", ""), "raw_content": d.page_content}
+                    for d in iter_docs(source)
+                ]
+        return cls(pages, **kwargs)
+
+    async def __call__(self, url: str, params: dict) -> list[dict]:
+        self.calls.append(url)
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            if self.failures.get(url, 0) > 0:
+                self.failures[url] -= 1
+                raise RuntimeError(f"stub failure for {url}")
+            return [{**page, "etag": f'"{content_hash(page["raw_content"])}"'} for page in self.pages.get(url, [])]
+        finally:
+            self.in_flight -= 1
+
+
+# ---------------------------------------------------------------------------
+# State
+# ---------------------------------------------------------------------------
+
+class CrawlState:
+    """{url: {"hash", "etag", "section", "first_seen", "last_changed", "last_seen"}} persisted as JSON."""
+
+    def __init__(self, path: str | Path = DEFAULT_STATE_PATH):
+        self.path = Path(path)
+        self.pages: dict[str, dict] = {}
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.pages = json.load(f)
+
+    def is_unchanged(self, url: str, digest: str) -> bool:
+        # The content is already fetched — its hash wins over a (possibly stale) ETag
+        known = self.pages.get(url)
+        return known is not None and known.get("hash") == digest
+
+    def record(self, url: str, section: str, digest: str, etag: str | None, changed: bool) -> None:
+        now = _now()
+        entry = self.pages.setdefault(url, {"first_seen": now})
+        entry.update({"hash": digest, "etag": etag, "section": section, "last_seen": now})
+        if changed:
+            entry["last_changed"] = now
+
+    def urls_of(self, section: str) -> set[str]:
+        return {url for url, entry in self.pages.items() if entry.get("section") == section}
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.pages, f, ensure_ascii=False, indent=2, sort_keys=True)
+        tmp.replace(self.path)
+
+
+# ---------------------------------------------------------------------------
+# Orchestration
+# ---------------------------------------------------------------------------
+
+@dataclass
+class CrawlReport:
+    changed:   dict[str, list[Document]] = field(default_factory=dict)   # section → new/changed pages
+    pages:     dict[str, list[Document]] = field(default_factory=dict)   # section → every crawled page
+    removed:   dict[str, set[str]]       = field(default_factory=dict)   # section → vanished URLs
+    unchanged: int       = 0
+    failed:    list[str] = field(default_factory=list)                   # sections
+
+    @property
+    def n_changed(self) -> int:
+        return sum(len(v) for v in self.changed.values())
+
+    @property
+    def removed_urls(self) -> set[str]:
+        return {url for urls in self.removed.values() for url in urls}
+
+    @property
+    def touched(self) -> set[str]:
+        """Sections whose raw crawl file has to be rewritten."""
+        return set(self.changed) | set(self.removed)
+
+
+async def _crawl_one(
+    name: str,
+    url: str,
+    crawler: Crawler,
+    params: dict,
+    semaphore: asyncio.Semaphore,
+    limiter: RateLimiter,
+) -> list[dict] | None:
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        try:
+            async with semaphore:
+                await limiter.acquire(0)
+                start = asyncio.get_running_loop().time()
+                pages = await asyncio.wait_for(crawler(url, params), timeout=CRAWL_TIMEOUT)
+            logger.info("Crawled %-40s %3d pages in %.1fs", name, len(pages), asyncio.get_running_loop().time() - start)
+            return pages
+        except Exception as e:
+            if attempt == MAX_ATTEMPTS:
+                logger.error("Crawl of %s failed after %d attempts: %s", name, attempt, e)
+                return None
+            delay = BACKOFF_BASE * 2 ** (attempt - 1) * (1 + random.random())
+            logger.warning("Crawl of %s failed (%s) — retry %d in %.1fs", name, e, attempt, delay)
+            await asyncio.sleep(delay)
+
+
+async def crawl_sections(
+    sections: dict[str, str],
+    crawler: Crawler,
+    state: CrawlState,
+    params: dict | None = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    rpm: int = DEFAULT_RPM,
+) -> CrawlReport:
+    """
+    Crawl every section concurrently and diff the pages against state.
+    state is updated in memory; the caller saves it once the delta is applied.
+    """
+    params    = params if params is not None else CRAWL_PARAMS
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter   = RateLimiter(rpm=rpm, tpm=1)   # requests only — every acquire() costs 0 tokens
+
+    names   = list(sections)
+    results = await asyncio.gather(*(
+        _crawl_one(name, section_url(sections[name]), crawler, params, semaphore, limiter)
+        for name in names
+    ))
+
+    # Diff serially in section order, so overlapping sections resolve deterministically
+    report = CrawlReport()
+    seen: set[str] = set()
+    for name, pages in zip(names, results):
+        if pages is None:
+            report.failed.append(name)
+            continue
+
+        crawled: dict[str, tuple[Document, str | None]] = {}
+        for page in pages:
+            url  = page["url"]
+            text = page.get("raw_content") or ""
+            if not text or url in crawled:
+                continue
+            crawled[url] = (Document(page_content=text, metadata={"source": url}), page.get("etag"))
+        if not crawled and state.urls_of(name):
+            # Tavily can answer {"results": []} on a transient problem — never
+            # read that as "the whole section is gone"
+            logger.error("Crawl of %s returned no pages (had %d) — treating it as failed", name, len(state.urls_of(name)))
+            report.failed.append(name)
+            continue
+        report.pages[name] = [doc for doc, _ in crawled.values()]
+
+        for url, (doc, etag) in crawled.items():
+            if url in seen:
+                continue
+            seen.add(url)
+            digest = content_hash(doc.page_content)
+            if state.is_unchanged(url, digest):
+                report.unchanged += 1
+                state.record(url, state.pages[url].get("section", name), digest, etag, changed=False)
+            else:
+                report.changed.setdefault(name, []).append(doc)
+                state.record(url, name, digest, etag, changed=True)
+
+    # A page is gone once no successful crawl returned it — pages owned by a
+    # failed (or empty) section are kept until that section crawls again
+    for name in report.pages:
+        gone = state.urls_of(name) - seen
+        if gone:
+            report.removed[name] = gone
+            for url in gone:
+                del state.pages[url]
+
+    logger.info(
+        "Crawl diff: %d sections (%d failed) | %d pages | %d new/changed | %d unchanged | %d removed",
+        len(names), len(report.failed), len(seen), report.n_changed, report.unchanged, len(report.removed_urls),
+    )
+    return report
+
+
+def write_crawl_files(report: CrawlReport, crawl_dir: str | Path, output_format: str = "jsonl") -> list[Path]:
+    """
+    Full raw page set of every touched section → <crawl_dir>/<section>_crawl_result.<format>,
+    so a full clean_docs_folder run over crawl_dir still sees the whole corpus.
+    """
+    crawl_dir = Path(crawl_dir)
+    if not store_files(crawl_dir) and any(crawl_dir.glob("*.pkl")):
+        # Readers prefer doc store files over .pkl — convert so no section gets shadowed
+        convert_pickles(crawl_dir, compress=output_format == "jsonl.zst")
+    return [
+        write_docs(crawl_dir / f"{name}{FILE_SUFFIX}.{output_format}", report.pages[name])
+        for name in sorted(report.touched)
+    ]
+
+
+async def update(
+    sections: dict[str, str],
+    crawler: Crawler,
+    state_path: str | Path = DEFAULT_STATE_PATH,
+    crawl_dir: str | Path = DEFAULT_CRAWL_DIR,
+    cleaned_dir: str | Path = DEFAULT_CLEANED_DIR,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    rpm: int = DEFAULT_RPM,
+    index: str | None = None,
+    dry_run: bool = False,
+) -> CrawlReport:
+    """
+    Crawl → diff → (raw files + cleaned store patch + state) → incremental index.
+    dry_run only reports the diff; nothing is written.
+    """
+    from app.loveable_dox.clean_docs import update_cleaned_docs
+
+    state  = CrawlState(state_path)
+    report = await crawl_sections(sections, crawler, state, concurrency=concurrency, rpm=rpm)
+
+    if dry_run:
+        for name, docs in sorted(report.changed.items()):
+            logger.info("  %-40s %d new/changed", name, len(docs))
+        return report
+
+    if report.touched:
+        await asyncio.to_thread(write_crawl_files, report, crawl_dir)
+        # Same stems as write_crawl_files / clean_docs_folder, so new pages land in <section>_crawl_result
+        changed = {name + FILE_SUFFIX: docs for name, docs in report.changed.items()}
+        await asyncio.to_thread(update_cleaned_docs, cleaned_dir, changed, report.removed_urls)
+    # State last: a crash before this point re-detects the same changes next run
+    state.save()
+
+    if index and report.touched:
+        # The indexers run their own event loop (pipeline.py) — keep them off this one
+        await asyncio.to_thread(run_indexer, index, cleaned_dir)
+    elif index:
+        logger.info("No changes — skipping %s indexing", index)
+    return report
+
+
+def run(sections: dict[str, str], crawler: Crawler, **kwargs) -> CrawlReport:
+    """Synchronous entry point for the CLI (same arguments as update)."""
+    return asyncio.run(update(sections, crawler, **kwargs))
+
+
+def run_indexer(index: str, cleaned_dir: str | Path) -> None:
+    """Incremental re-index of the cleaned store (only changed chunks are embedded / written)."""
+    if index == "chroma":
+        from app.loveable_dox.index_docs_chroma import run as run_chroma
+        run_chroma(cleaned_dir, skip_sanity=True)
+    elif index == "pinecone":
+        from app.loveable_dox.index_docs_openai_embed import run as run_pinecone
+        run_pinecone(str(cleaned_dir), index_name="lovable-docs", is_dry_run=False, sample=0)
+    elif index == "local":
+        from app.loveable_dox.index_docs_local import run as run_local
+        run_local(cleaned_dir)
+    else:
+        raise ValueError(f"Unknown index backend: {index!r}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+    parser = argparse.ArgumentParser(description="Crawl docs.lovable.dev sections and update the cleaned docs incrementally.")
+    parser.add_argument("--sections",    nargs="*", default=None,
+                        help="Docs paths to crawl, e.g. features/ai (default: all known sections)")
+    parser.add_argument("--stub",        default=None,
+                        help="Use StubCrawler over existing crawl files in this folder instead of Tavily")
+    parser.add_argument("--state",       default=DEFAULT_STATE_PATH, help=f"Crawl state file (default: {DEFAULT_STATE_PATH})")
+    parser.add_argument("--crawl-dir",   default=DEFAULT_CRAWL_DIR, help=f"Raw crawl output (default: {DEFAULT_CRAWL_DIR})")
+    parser.add_argument("--cleaned-dir", default=DEFAULT_CLEANED_DIR, help=f"Cleaned doc store (default: {DEFAULT_CLEANED_DIR})")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"Section crawls at once (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument("--rpm",         type=int, default=DEFAULT_RPM,
+                        help=f"Crawl starts per minute (default: {DEFAULT_RPM})")
+    parser.add_argument("--index",       choices=("chroma", "pinecone", "local"), default=None,
+                        help="Re-index incrementally after a change (default: no indexing)")
+    parser.add_argument("--dry-run",     action="store_true", help="Only report what changed")
+    args = parser.parse_args()
+
+    if args.sections:
+        by_path  = {path: name for name, path in SECTIONS.items()}
+        selected = {by_path.get(p.strip("/"), p.strip("/").replace("/", "_")): p.strip("/") for p in args.sections}
+    else:
+        selected = SECTIONS
+
+    crawler = StubCrawler.from_folder(args.stub) if args.stub else TavilyCrawler()
+    report = run(
+        selected,
+        crawler,
+        state_path=args.state,
+        crawl_dir=args.crawl_dir,
+        cleaned_dir=args.cleaned_dir,
+        concurrency=args.concurrency,
+        rpm=args.rpm,
+        index=args.index,
+        dry_run=args.dry_run,
+    )
+    print(f"{report.n_changed} new/changed, {report.unchanged} unchanged, {len(report.removed_urls)} removed, "
+          f"{len(report.failed)} failed sections")
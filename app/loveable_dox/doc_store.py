@@ -0,0 +1,253 @@
+"""
+On-disk document store for crawled / cleaned docs — replaces the .pkl files.
+
+One file per crawl section, one JSON object per document:
+
+    <name>.jsonl            {"page_content": ..., "metadata": {...}} per line
+    <name>.jsonl.zst        same, every document compressed as its own zstd frame
+    <file>.idx.json         [[source url, byte offset, byte length], ...] in file order,
+                            one per data file (<name>.jsonl.idx.json, <name>.jsonl.zst.idx.json)
+
+A section lives in one format at a time: writing one removes the other
+(and its index), so a format switch between runs never leaves a stale file
+that store_files() would pick instead.
+
+The index gives O(1) random access by source URL (seek + read one record,
+no need to parse the rest of the file) and frame boundaries for the zstd
+variant. Readers stream documents one at a time, so chunkers never hold a
+whole section in memory, and loading is plain JSON — no unpickling.
+
+Usage:
+    write_docs("cleaned_docs/features_ai.jsonl", docs)
+    for doc in iter_docs("cleaned_docs"):           # lazy, all files in a folder
+        ...
+    DocReader("cleaned_docs/features_ai.jsonl").get("https://docs.lovable.dev/features/ai")
+
+    python -m app.loveable_dox.doc_store ./cleaned_docs            # convert .pkl → .jsonl
+    python -m app.loveable_dox.doc_store ./cleaned_docs --zstd --remove-pkl
+"""
+
+import json
+import pickle
+import logging
+import argparse
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+PLAIN_SUFFIX = ".jsonl"
+ZSTD_SUFFIX  = ".jsonl.zst"
+INDEX_SUFFIX = ".idx.json"
+ZSTD_LEVEL   = 10
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError("zstd-compressed doc stores need the 'zstandard' package (pip install zstandard)") from e
+    return zstandard
+
+
+def _stem(path: Path) -> str:
+    name = path.name
+    for suffix in (ZSTD_SUFFIX, PLAIN_SUFFIX, ".pkl"):
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return path.stem
+
+
+def index_path(path: str | Path) -> Path:
+    path = Path(path)
+    return path.with_name(path.name + INDEX_SUFFIX)
+
+
+def store_files(folder: str | Path) -> list[Path]:
+    """Doc store files in a folder, sorted by name (a .jsonl.zst wins over a .jsonl of the same name)."""
+    folder = Path(folder)
+    files: dict[str, Path] = {}
+    for path in sorted(folder.glob("*" + PLAIN_SUFFIX)) + sorted(folder.glob("*" + ZSTD_SUFFIX)):
+        files[_stem(path)] = path
+    return [files[k] for k in sorted(files)]
+
+
+# ---------------------------------------------------------------------------
+# Write
+# ---------------------------------------------------------------------------
+
+def write_docs(path: str | Path, docs: Iterable[Document], compress: bool | None = None) -> Path:
+    """
+    Write docs + URL index atomically (tmp files swapped in at the end).
+    compress=None picks zstd from the file name (.jsonl.zst). The same section
+    in the other format is removed afterwards.
+    """
+    path = Path(path)
+    if compress is None:
+        compress = path.name.endswith(ZSTD_SUFFIX)
+    elif compress and not path.name.endswith(ZSTD_SUFFIX):
+        path = path.with_name(_stem(path) + ZSTD_SUFFIX)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    compressor = _zstd().ZstdCompressor(level=ZSTD_LEVEL) if compress else None
+    index: list[tuple[str, int, int]] = []
+    tmp = path.with_name(path.name + ".tmp")
+
+    with open(tmp, "wb") as f:
+        offset = 0
+        for doc in docs:
+            record = json.dumps(
+                {"page_content": doc.page_content, "metadata": doc.metadata},
+                ensure_ascii=False,
+            ).encode("utf-8") + b"\n"
+            if compressor is not None:
+                record = compressor.compress(record)
+            f.write(record)
+            index.append((doc.metadata.get("source", ""), offset, len(record)))
+            offset += len(record)
+
+    idx = index_path(path)
+    idx_tmp = idx.with_name(idx.name + ".tmp")
+    with open(idx_tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False)
+
+    tmp.replace(path)
+    idx_tmp.replace(idx)
+
+    sibling = path.with_name(_stem(path) + (PLAIN_SUFFIX if compress else ZSTD_SUFFIX))
+    for stale in (sibling, index_path(sibling)):
+        if stale.exists():
+            logger.info("Removing %s (section rewritten as %s)", stale.name, path.name)
+            stale.unlink()
+    return path
+
+
+# ---------------------------------------------------------------------------
+# Read
+# ---------------------------------------------------------------------------
+
+class DocReader:
+    """Lazy reader for one store file; the URL index is loaded on first use."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.compressed = self.path.name.endswith(ZSTD_SUFFIX)
+        self._index: list[tuple[str, int, int]] | None = None
+        self._by_url: dict[str, int] | None = None
+
+    @property
+    def index(self) -> list[tuple[str, int, int]]:
+        if self._index is None:
+            with open(index_path(self.path), "r", encoding="utf-8") as f:
+                self._index = [tuple(row) for row in json.load(f)]
+        return self._index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def urls(self) -> list[str]:
+        return [url for url, _, _ in self.index]
+
+    def _decode(self, record: bytes, decompressor=None) -> Document:
+        if decompressor is not None:
+            record = decompressor.decompress(record)
+        data = json.loads(record)
+        return Document(page_content=data["page_content"], metadata=data["metadata"])
+
+    def __iter__(self) -> Iterator[Document]:
+        if not self.compressed:
+            with open(self.path, "rb") as f:
+                for line in f:
+                    if line.strip():
+                        yield self._decode(line)
+            return
+
+        decompressor = _zstd().ZstdDecompressor()
+        with open(self.path, "rb") as f:
+            for _, offset, length in self.index:
+                f.seek(offset)
+                yield self._decode(f.read(length), decompressor)
+
+    def get(self, url: str) -> Document | None:
+        """First document with this source URL (seek + one record)."""
+        if self._by_url is None:
+            self._by_url = {}
+            for i, (u, _, _) in enumerate(self.index):
+                self._by_url.setdefault(u, i)
+        i = self._by_url.get(url)
+        if i is None:
+            return None
+        _, offset, length = self.index[i]
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            record = f.read(length)
+        return self._decode(record, _zstd().ZstdDecompressor() if self.compressed else None)
+
+
+def _iter_pickle(path: Path) -> Iterator[Document]:
+    with open(path, "rb") as f:
+        yield from pickle.load(f)
+
+
+def iter_docs(source: str | Path) -> Iterator[Document]:
+    """
+    Stream documents from a store file or a folder of them. A folder without
+    store files falls back to its legacy .pkl files (one file in memory at a time).
+    """
+    source = Path(source)
+    if source.is_file():
+        yield from (_iter_pickle(source) if source.suffix == ".pkl" else DocReader(source))
+        return
+
+    files = store_files(source)
+    if files:
+        for path in files:
+            logger.info("Reading %s", path.name)
+            yield from DocReader(path)
+        return
+
+    for path in sorted(source.glob("*.pkl")):
+        logger.info("Reading %s (legacy pickle)", path.name)
+        yield from _iter_pickle(path)
+
+
+# ---------------------------------------------------------------------------
+# One-time conversion
+# ---------------------------------------------------------------------------
+
+def convert_pickles(
+    src_dir: str | Path,
+    dst_dir: str | Path | None = None,
+    compress: bool = False,
+    remove_pkl: bool = False,
+) -> list[Path]:
+    """Convert every .pkl in src_dir into a store file (same name) in dst_dir (default: src_dir)."""
+    src_dir = Path(src_dir)
+    dst_dir = Path(dst_dir) if dst_dir else src_dir
+    suffix  = ZSTD_SUFFIX if compress else PLAIN_SUFFIX
+
+    written = []
+    for pkl in sorted(src_dir.glob("*.pkl")):
+        out = write_docs(dst_dir / (pkl.stem + suffix), _iter_pickle(pkl), compress=compress)
+        n = len(DocReader(out))
+        logger.info("%s → %s (%d docs, %.0f KB → %.0f KB)", pkl.name, out.name, n, pkl.stat().st_size / 1e3, out.stat().st_size / 1e3)
+        if remove_pkl:
+            pkl.unlink()
+        written.append(out)
+    return written
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+    parser = argparse.ArgumentParser(description="Convert .pkl document files to the JSONL doc store.")
+    parser.add_argument("source", help="Folder with .pkl files")
+    parser.add_argument("--output", default=None, help="Output folder (default: same as source)")
+    parser.add_argument("--zstd", action="store_true", help="Compress every document as a zstd frame (.jsonl.zst)")
+    parser.add_argument("--remove-pkl", action="store_true", help="Delete the .pkl files after conversion")
+    args = parser.parse_args()
+
+    files = convert_pickles(args.source, args.output, compress=args.zstd, remove_pkl=args.remove_pkl)
+    print(f"Converted {len(files)} files")
@@ -0,0 +1,206 @@
+"""
+Content-addressed, persistent embedding store shared by the indexers.
+
+Vectors are keyed by (model, sha1(text)) and survive across runs, days and
+index names — re-indexing only pays for text that was never embedded by the
+given model. One directory per model:
+
+    <store_dir>/<model slug>/vectors.f32   — raw float32 rows, append-only (memory-mapped for reads)
+    <store_dir>/<model slug>/keys.txt      — one sha1 per line, line i ↔ row i
+    <store_dir>/<model slug>/meta.json     — model name + dimension
+
+The key index is loaded into a dict on open, so lookups and appends are O(1).
+Rows are appended before their keys, so a crash mid-write leaves at most a
+few orphaned rows that are trimmed on the next open.
+
+Usage:
+    store = EmbeddingStore("text-embedding-3-small")
+    missing = store.missing(hashes)
+    store.put_many(missing, vectors)
+    matrix = store.get_many(hashes)          # float32 [n, dim]
+
+    embeddings = StoreBackedEmbeddings(HuggingFaceEmbeddings(...), model_name)
+"""
+
+import json
+import hashlib
+import logging
+import re
+import threading
+from pathlib import Path
+from typing import Iterable, Sequence
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_DIR = "./embedding_store"
+VECTORS_FILE      = "vectors.f32"
+KEYS_FILE         = "keys.txt"
+META_FILE         = "meta.json"
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _model_slug(model: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "__", model)
+
+
+class EmbeddingStore:
+    """Append-only float32 vectors for one embedding model, addressed by text sha1."""
+
+    def __init__(self, model: str, store_dir: str | Path = DEFAULT_STORE_DIR):
+        self.model = model
+        self.path  = Path(store_dir) / _model_slug(model)
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._rows: dict[str, int] = {}
+        self._mmap: np.ndarray | None = None
+        self.dim: int | None = None
+
+        meta_path = self.path / META_FILE
+        if meta_path.exists():
+            self.dim = json.loads(meta_path.read_text(encoding="utf-8"))["dim"]
+        self._load_keys()
+
+    # ------------------------------------------------------------------
+    # Open / recovery
+    # ------------------------------------------------------------------
+
+    def _load_keys(self) -> None:
+        keys_path    = self.path / KEYS_FILE
+        vectors_path = self.path / VECTORS_FILE
+
+        keys = []
+        if keys_path.exists():
+            with open(keys_path, "r", encoding="ascii") as f:
+                keys = [line.rstrip("\n") for line in f]
+            if keys and len(keys[-1]) != 40:   # torn last line
+                keys.pop()
+
+        rows = vectors_path.stat().st_size // (4 * self.dim) if self.dim and vectors_path.exists() else 0
+        if rows != len(keys):
+            n = min(rows, len(keys))
+            logger.warning("Embedding store %s: %d keys / %d rows — trimming to %d", self.path, len(keys), rows, n)
+            keys = keys[:n]
+            if self.dim:
+                with open(vectors_path, "ab") as f:
+                    f.truncate(n * 4 * self.dim)
+            with open(keys_path, "w", encoding="ascii") as f:
+                f.writelines(k + "\n" for k in keys)
+
+        self._rows = {k: i for i, k in enumerate(keys)}
+
+    def _matrix(self) -> np.ndarray:
+        """Read-only memmap over all rows; re-mapped lazily after appends."""
+        if self._mmap is None or len(self._mmap) != len(self._rows):
+            if not self._rows:
+                return np.empty((0, self.dim or 0), dtype=np.float32)
+            self._mmap = np.memmap(
+                self.path / VECTORS_FILE, dtype=np.float32, mode="r",
+                shape=(len(self._rows), self.dim),
+            )
+        return self._mmap
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._rows
+
+    def missing(self, keys: Iterable[str]) -> list[str]:
+        """Keys not in the store, in order, without duplicates."""
+        seen: set[str] = set()
+        out = []
+        for k in keys:
+            if k not in self._rows and k not in seen:
+                seen.add(k)
+                out.append(k)
+        return out
+
+    def get(self, key: str) -> np.ndarray | None:
+        row = self._rows.get(key)
+        if row is None:
+            return None
+        with self._lock:
+            return np.array(self._matrix()[row])
+
+    def get_many(self, keys: Sequence[str]) -> np.ndarray:
+        """float32 [len(keys), dim]; raises KeyError for a key that is not stored."""
+        rows = [self._rows[k] for k in keys]
+        with self._lock:
+            return np.asarray(self._matrix()[rows], dtype=np.float32)
+
+    # ------------------------------------------------------------------
+    # Append
+    # ------------------------------------------------------------------
+
+    def put_many(self, keys: Sequence[str], vectors) -> int:
+        """Append vectors for new keys (already stored keys are skipped). Returns rows added."""
+        matrix = np.ascontiguousarray(vectors, dtype=np.float32)
+        if len(keys) == 0:
+            return 0
+        if matrix.ndim != 2 or len(matrix) != len(keys):
+            raise ValueError(f"Expected {len(keys)} vectors, got array of shape {matrix.shape}")
+
+        with self._lock:
+            if self.dim is None:
+                self.dim = int(matrix.shape[1])
+                (self.path / META_FILE).write_text(
+                    json.dumps({"model": self.model, "dim": self.dim}, indent=2), encoding="utf-8",
+                )
+            elif matrix.shape[1] != self.dim:
+                raise ValueError(f"Store for {self.model} has dim={self.dim}, got {matrix.shape[1]}")
+
+            fresh, rows, seen = [], [], set()
+            for i, k in enumerate(keys):
+                if k not in self._rows and k not in seen:
+                    seen.add(k)
+                    fresh.append(k)
+                    rows.append(i)
+            if not fresh:
+                return 0
+
+            with open(self.path / VECTORS_FILE, "ab") as f:
+                f.write(matrix[rows].tobytes())
+            with open(self.path / KEYS_FILE, "a", encoding="ascii") as f:
+                f.writelines(k + "\n" for k in fresh)
+
+            start = len(self._rows)
+            for offset, k in enumerate(fresh):
+                self._rows[k] = start + offset
+            return len(fresh)
+
+    def put(self, key: str, vector) -> bool:
+        return self.put_many([key], [vector]) == 1
+
+
+class StoreBackedEmbeddings(Embeddings):
+    """
+    LangChain Embeddings wrapper: embed_documents only calls the wrapped model
+    for texts the store has not seen. Queries are never cached.
+    """
+
+    def __init__(self, embeddings: Embeddings, model: str, store_dir: str | Path = DEFAULT_STORE_DIR):
+        self.embeddings = embeddings
+        self.store      = EmbeddingStore(model, store_dir)
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        keys    = [text_hash(t) for t in texts]
+        missing = set(self.store.missing(keys))
+        if missing:
+            todo = {k: t for k, t in zip(keys, texts) if k in missing}
+            logger.info("Embedding %d new texts (%d cached)", len(todo), len(texts) - len(todo))
+            self.store.put_many(list(todo), self.embeddings.embed_documents(list(todo.values())))
+        return self.store.get_many(keys).tolist()
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embeddings.embed_query(text)
@@ -1,43 +1,64 @@
 """
 Chunking → Embedding → Chroma indexing pipeline for Lovable docs.
 
+Load, chunk and embed/write overlap: chunks stream through a bounded queue
+(app/loveable_dox/pipeline.py) instead of being materialized per step.
+
+Re-indexing is incremental: every chunk gets a content-addressed id
+(sha1 of source + text, also stored as metadata["hash"]). Only ids missing
+from the collection are embedded and added; ids that no longer exist in the
+docs are deleted. Use --full to drop the collection and rebuild from scratch.
+
+Deletes are guarded: a run that produces no chunks (empty or wrong folder)
+aborts before touching the collection, and a diff that would delete more than
+MAX_DELETE_FRACTION of it aborts unless --allow-mass-delete is given.
+
 Usage:
     python index_docs.py C:/data/.../cleaned
     python index_docs.py C:/data/.../cleaned --chroma-dir ./chroma_db
     python index_docs.py C:/data/.../cleaned --chunk-size 400 --chunk-overlap 40
+    python index_docs.py C:/data/.../cleaned --full
+    python index_docs.py C:/data/.../cleaned --allow-mass-delete   # docs really shrank by > half
 """
 
-import pickle
+import asyncio
+import hashlib
+import itertools
 import logging
 import argparse
 from pathlib import Path
+from typing import Iterable, Iterator
 
 from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter, MarkdownHeaderTextSplitter
 from langchain_chroma import Chroma
 from langchain_huggingface import HuggingFaceEmbeddings
 
+from app.graph.nodes.process_rag.bm25 import BM25_FILE, BM25Index
+from app.graph.nodes.process_rag.result_cache import bump_index_version
+from app.loveable_dox.doc_store import iter_docs
+from app.loveable_dox.embedding_store import DEFAULT_STORE_DIR, StoreBackedEmbeddings
+from app.loveable_dox.near_dedup import DEFAULT_THRESHOLD, iter_without_near_duplicates
+from app.loveable_dox.pipeline import Stage, run_pipeline
+
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s [%(levelname)s] %(message)s"
 )
 logger = logging.getLogger(__name__)
 
+COLLECTION_NAME     = "lovable_docs"
+WRITE_BATCH         = 1000   # well below Chroma's max batch size
+MAX_DELETE_FRACTION = 0.5    # larger deletes need allow_mass_delete
+
 
 # ---------------------------------------------------------------------------
 # Step 1 — Load cleaned docs
 # ---------------------------------------------------------------------------
 
-def load_cleaned_docs(folder: str | Path) -> list[Document]:
-    folder = Path(folder)
-    docs = []
-    for filepath in sorted(folder.glob("*.pkl")):
-        with open(filepath, "rb") as f:
-            batch = pickle.load(f)
-        docs.extend(batch)
-        logger.info("Loaded %d docs from %s", len(batch), filepath.name)
-    logger.info("Total docs loaded: %d", len(docs))
-    return docs
+def load_cleaned_docs(folder: str | Path) -> Iterator[Document]:
+    """Stream docs from the JSONL doc store in folder (legacy .pkl files as a fallback)."""
+    return iter_docs(folder)
 
 
 # ---------------------------------------------------------------------------
@@ -53,16 +74,47 @@ def load_cleaned_docs(folder: str | Path) -> list[Document]:
 # ---------------------------------------------------------------------------
 
 def chunk_docs(
-    docs: list[Document],
+    docs: Iterable[Document],
     chunk_size: int = 512,
     chunk_overlap: int = 64,
+    near_dup_threshold: float = DEFAULT_THRESHOLD,
+    near_dup_report: str | Path | None = None,
 ) -> list[Document]:
     """
     Split documents into chunks suitable for bge-small-en-v1.5 (512 token window).
 
     chunk_size=512 chars ≈ 100-130 tokens for English technical text.
     If you switch to nomic-embed-text-v1.5, use chunk_size=1024.
+
+    Near-duplicate chunks (MinHash/LSH, Jaccard >= near_dup_threshold) are
+    dropped; 0 disables the filter, near_dup_report writes the removed
+    clusters to JSON. See iter_chunks for the lazy version.
     """
+    return list(iter_chunks(
+        docs,
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        near_dup_threshold=near_dup_threshold,
+        near_dup_report=near_dup_report,
+    ))
+
+
+def iter_chunks(
+    docs: Iterable[Document],
+    chunk_size: int = 512,
+    chunk_overlap: int = 64,
+    near_dup_threshold: float = DEFAULT_THRESHOLD,
+    near_dup_report: str | Path | None = None,
+) -> Iterator[Document]:
+    """Same chunks as chunk_docs, yielded one document at a time."""
+    return iter_without_near_duplicates(
+        _iter_raw_chunks(docs, chunk_size, chunk_overlap),
+        threshold=near_dup_threshold,
+        report_path=near_dup_report,
+    )
+
+
+def _iter_raw_chunks(docs: Iterable[Document], chunk_size: int, chunk_overlap: int) -> Iterator[Document]:
 
     # Stage A: split by Markdown headers to preserve section context
     header_splitter = MarkdownHeaderTextSplitter(
@@ -81,9 +133,12 @@ def chunk_docs(
         separators=["\n\n", "\n", ". ", " ", ""],
     )
 
-    all_chunks: list[Document] = []
+    n_docs   = 0
+    n_chunks = 0
+    n_chars  = 0
 
     for doc in docs:
+        n_docs += 1
         source = doc.metadata.get("source", "")
 
         # Stage A
@@ -100,7 +155,9 @@ def chunk_docs(
 
             if len(text) <= chunk_size:
                 # Small enough — keep as-is with enriched metadata
-                all_chunks.append(Document(
+                n_chunks += 1
+                n_chars  += len(text)
+                yield Document(
                     page_content=text,
                     metadata={
                         "source": source,
@@ -108,13 +165,15 @@ def chunk_docs(
                         "h2": hchunk.metadata.get("h2", ""),
                         "h3": hchunk.metadata.get("h3", ""),
                     }
-                ))
+                )
             else:
                 # Too large — split by characters
                 sub_chunks = char_splitter.split_text(text)
                 for sub in sub_chunks:
                     if sub.strip():
-                        all_chunks.append(Document(
+                        n_chunks += 1
+                        n_chars  += len(sub.strip())
+                        yield Document(
                             page_content=sub.strip(),
                             metadata={
                                 "source": source,
@@ -122,15 +181,37 @@ def chunk_docs(
                                 "h2": hchunk.metadata.get("h2", ""),
                                 "h3": hchunk.metadata.get("h3", ""),
                             }
-                        ))
+                        )
 
     logger.info(
         "Chunking complete: %d docs → %d chunks (avg %.0f chars/chunk)",
-        len(docs),
-        len(all_chunks),
-        sum(len(c.page_content) for c in all_chunks) / max(len(all_chunks), 1),
+        n_docs,
+        n_chunks,
+        n_chars / max(n_chunks, 1),
     )
-    return all_chunks
+
+
+def chunk_id(chunk: Document) -> str:
+    """Content-addressed chunk id: same source + same text → same id."""
+    key = chunk.metadata.get("source", "") + "\n" + chunk.page_content
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def iter_with_ids(chunks: Iterable[Document]) -> Iterator[Document]:
+    """Set metadata["hash"] on every chunk and drop exact duplicates (same id), lazily."""
+    seen: set[str] = set()
+    dropped = 0
+    for chunk in chunks:
+        h = chunk_id(chunk)
+        if h in seen:
+            dropped += 1
+            continue
+        seen.add(h)
+        chunk.metadata["hash"] = h
+        yield chunk
+
+    if dropped:
+        logger.info("Dropped %d duplicate chunks", dropped)
 
 
 # ---------------------------------------------------------------------------
@@ -144,51 +225,121 @@ def chunk_docs(
 # ---------------------------------------------------------------------------
 
 def build_chroma_index(
-    chunks: list[Document],
+    chunks: Iterable[Document],
     chroma_dir: str | Path,
     model_name: str = "BAAI/bge-small-en-v1.5",
     batch_size: int = 256,
+    full: bool = False,
+    store_dir: str | Path = DEFAULT_STORE_DIR,
+    allow_mass_delete: bool = False,
 ) -> Chroma:
     """
-    Embed chunks and save to a persistent Chroma vector store.
+    Embed new chunks and sync a persistent Chroma vector store with them.
+
+    chunks may be a lazy iterator (iter_chunks): it is consumed in a worker
+    thread while the previous batch is being embedded and written, so
+    chunking overlaps with embedding and only a bounded number of chunks
+    is in flight (see pipeline.py). Deletes and the BM25 rebuild (only when
+    something changed) run at the end.
 
     Parameters
     ----------
-    chunks      : list of Document chunks from chunk_docs()
+    chunks      : Document chunks from chunk_docs() / iter_chunks()
     chroma_dir  : directory where Chroma will persist the index
     model_name  : HuggingFace embedding model
-    batch_size  : number of chunks to embed at once
+    batch_size  : number of chunks to embed and write at once
                   256 works well for bge-small on CPU
                   reduce to 64-128 for nomic-embed-text-v1.5
+    full        : drop the collection first and re-add everything
+                  (vectors still come from the embedding store when cached)
+    store_dir   : persistent embedding store shared with the other indexers
+    allow_mass_delete : allow deleting more than MAX_DELETE_FRACTION of the collection
+
+    Raises ValueError when chunks is empty — checked before --full drops
+    the collection — and RuntimeError when the delete guard trips (the new
+    chunks are already added by then; nothing is deleted).
     """
+    # Peek before touching the collection: an empty or mistyped folder must
+    # not reset / delete the whole index
+    chunks = iter(chunks)
+    first  = next(chunks, None)
+    if first is None:
+        raise ValueError("No chunks to index — is the cleaned docs folder empty or everything filtered out?")
+    chunks = itertools.chain([first], chunks)
+
     chroma_dir = Path(chroma_dir)
     chroma_dir.mkdir(parents=True, exist_ok=True)
 
     logger.info("Loading embedding model: %s", model_name)
-    embeddings = HuggingFaceEmbeddings(
-        model_name=model_name,
-        model_kwargs={"device": "cpu"},   # change to "cuda" if GPU available
-        encode_kwargs={
-            "normalize_embeddings": True,  # required for cosine similarity
-            "batch_size": batch_size,
-        },
-    )
-
-    logger.info(
-        "Embedding %d chunks into Chroma at: %s",
-        len(chunks), chroma_dir
+    embeddings = StoreBackedEmbeddings(
+        HuggingFaceEmbeddings(
+            model_name=model_name,
+            model_kwargs={"device": "cpu"},   # change to "cuda" if GPU available
+            encode_kwargs={
+                "normalize_embeddings": True,  # required for cosine similarity
+                "batch_size": batch_size,
+            },
+        ),
+        model=model_name,
+        store_dir=store_dir,
     )
 
-    # Chroma handles batching internally when given a list of Documents
-    # Collection name identifies this index — useful if you have multiple
-    vectorstore = Chroma.from_documents(
-        documents=chunks,
-        embedding=embeddings,
-        collection_name="lovable_docs",
+    vectorstore = Chroma(
+        collection_name=COLLECTION_NAME,
+        embedding_function=embeddings,
         persist_directory=str(chroma_dir),
     )
+    if full:
+        vectorstore.reset_collection()
+
+    # Diff by id: unchanged chunks are neither re-embedded nor rewritten
+    existing = set(vectorstore.get(include=[])["ids"])
+    kept: list[Document] = []    # BM25 needs every chunk text
+    added = 0
+
+    async def _add(batch: list[Document]) -> list[Document] | None:
+        nonlocal added
+        kept.extend(batch)
+        new = [c for c in batch if c.metadata["hash"] not in existing]
+        if not new:
+            return None
+        # Embedding (CPU) and the Chroma write run off the event loop, next to the chunker thread
+        await asyncio.to_thread(vectorstore.add_documents, new, ids=[c.metadata["hash"] for c in new])
+        added += len(new)
+        return new
+
+    asyncio.run(run_pipeline(
+        iter_with_ids(chunks),
+        [Stage("add", _add, workers=1, batch_size=batch_size)],
+    ))
+
+    current   = {c.metadata["hash"] for c in kept}
+    to_delete = sorted(existing - current)
+    if not allow_mass_delete and len(to_delete) > MAX_DELETE_FRACTION * len(existing):
+        raise RuntimeError(
+            f"Refusing to delete {len(to_delete)} of {len(existing)} chunks from '{COLLECTION_NAME}' "
+            f"(> {MAX_DELETE_FRACTION:.0%}) — check the cleaned docs folder, or pass --allow-mass-delete"
+        )
+    for i in range(0, len(to_delete), WRITE_BATCH):
+        vectorstore.delete(ids=to_delete[i:i + WRITE_BATCH])
 
-    logger.info("Index saved. Collection: lovable_docs | Vectors: %d", len(chunks))
+    logger.info(
+        "Chroma at %s: %d in collection before | %d added | %d deleted | %d unchanged",
+        chroma_dir, len(existing), added, len(to_delete), len(kept) - added,
+    )
+    logger.info("Index saved. Collection: %s | Vectors: %d", COLLECTION_NAME, len(kept))
+
+    # Lexical BM25 index next to the Chroma files (hybrid retrieval, see bm25.py);
+    # rebuilt only when the collection changed or the file is missing
+    bm25_path = chroma_dir / BM25_FILE
+    if added or to_delete or not bm25_path.exists():
+        BM25Index.build(kept).save(bm25_path)
+        logger.info("BM25 index saved: %s", bm25_path)
+    else:
+        logger.info("BM25 index unchanged: %s", bm25_path)
+
+    if added or to_delete:
+        bump_index_version(COLLECTION_NAME)
     return vectorstore
 
 
@@ -234,6 +385,10 @@ def run(
     model_name: str = "BAAI/bge-small-en-v1.5",
     batch_size: int = 256,
     skip_sanity: bool = False,
+    full: bool = False,
+    near_dup_threshold: float = DEFAULT_THRESHOLD,
+    near_dup_report: str | Path | None = None,
+    allow_mass_delete: bool = False,
 ) -> Chroma:
 
     cleaned_folder = Path(cleaned_folder)
@@ -244,8 +399,14 @@ def run(
     # 1. Load
     docs = load_cleaned_docs(cleaned_folder)
 
-    # 2. Chunk
-    chunks = chunk_docs(docs, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    # 2. Chunk (lazy — consumed by the indexing pipeline)
+    chunks = iter_chunks(
+        docs,
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        near_dup_threshold=near_dup_threshold,
+        near_dup_report=near_dup_report,
+    )
 
     # 3. Embed + index
     vectorstore = build_chroma_index(
@@ -253,6 +414,8 @@ def run(
         chroma_dir=chroma_dir,
         model_name=model_name,
         batch_size=batch_size,
+        full=full,
+        allow_mass_delete=allow_mass_delete,
     )
 
     # 4. Verify
@@ -272,7 +435,7 @@ if __name__ == "__main__":
     )
     parser.add_argument(
         "cleaned_folder",
-        help="Folder with cleaned .pkl files (output of clean_docs.py)"
+        help="Folder with cleaned docs — .jsonl[.zst] doc store or legacy .pkl (output of clean_docs.py)"
     )
     parser.add_argument(
         "--chroma-dir",
@@ -307,6 +470,27 @@ if __name__ == "__main__":
         action="store_true",
         help="Skip sanity check queries after indexing"
     )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Drop the collection and re-embed all chunks (default: incremental)"
+    )
+    parser.add_argument(
+        "--near-dup-threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help=f"Jaccard threshold for near-duplicate chunks, 0 disables (default: {DEFAULT_THRESHOLD})"
+    )
+    parser.add_argument(
+        "--near-dup-report",
+        default=None,
+        help="Write the removed near-duplicate clusters to this JSON file"
+    )
+    parser.add_argument(
+        "--allow-mass-delete",
+        action="store_true",
+        help=f"Allow deleting more than {MAX_DELETE_FRACTION:.0%} of the collection in one run"
+    )
     args = parser.parse_args()
 
     run(
@@ -317,4 +501,8 @@ if __name__ == "__main__":
         model_name=args.model,
         batch_size=args.batch_size,
         skip_sanity=args.skip_sanity,
+        full=args.full,
+        near_dup_threshold=args.near_dup_threshold,
+        near_dup_report=args.near_dup_report,
+        allow_mass_delete=args.allow_mass_delete,
     )
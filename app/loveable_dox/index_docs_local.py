@@ -0,0 +1,162 @@
+"""
+Chunking → Embedding → local NumPy index for Lovable docs (fully offline).
+
+Produces the files read by app/graph/nodes/process_rag/retriever_local.py:
+    <index_dir>/embeddings.npy   — contiguous float32 matrix [n_chunks, dim]
+    <index_dir>/chunks.jsonl     — page_content + metadata, row i ↔ vector i
+    <index_dir>/manifest.json    — model, dim, count, index name
+
+Usage:
+    python -m app.loveable_dox.index_docs_local ./cleaned_docs
+    python -m app.loveable_dox.index_docs_local ./cleaned_docs --index-dir ./local_index
+"""
+
+import json
+import logging
+import argparse
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_huggingface import HuggingFaceEmbeddings
+
+from app.graph.nodes.process_rag.bm25 import BM25_FILE, BM25Index
+from app.graph.nodes.process_rag.result_cache import bump_index_version
+from app.graph.nodes.process_rag.retriever_local import (
+    CHUNKS_FILE,
+    DEFAULT_INDEX_DIR,
+    EMBEDDINGS_FILE,
+    MANIFEST_FILE,
+)
+from app.loveable_dox.embedding_store import StoreBackedEmbeddings
+from app.loveable_dox.index_docs_chroma import chunk_docs, load_cleaned_docs
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX_NAME = "lovable_docs_local"
+
+
+# ---------------------------------------------------------------------------
+# Embed + save
+# ---------------------------------------------------------------------------
+
+def build_local_index(
+    chunks: list[Document],
+    index_dir: str | Path = DEFAULT_INDEX_DIR,
+    model_name: str = "BAAI/bge-small-en-v1.5",
+    batch_size: int = 256,
+    index_name: str = DEFAULT_INDEX_NAME,
+) -> Path:
+    """
+    Embed chunks and write them as a memory-mappable float32 matrix.
+
+    Files are written next to the final ones and swapped in at the end,
+    so a running Retriever never sees a half-written index.
+    """
+    if not chunks:
+        # Never swap an empty matrix in over a working index
+        raise ValueError("No chunks to index — is the cleaned docs folder empty or everything filtered out?")
+
+    index_dir = Path(index_dir)
+    index_dir.mkdir(parents=True, exist_ok=True)
+
+    logger.info("Loading embedding model: %s", model_name)
+    embeddings = StoreBackedEmbeddings(
+        HuggingFaceEmbeddings(
+            model_name=model_name,
+            model_kwargs={"device": "cpu"},
+            encode_kwargs={
+                "normalize_embeddings": True,  # retriever_local scores with a plain dot product
+                "batch_size": batch_size,
+            },
+        ),
+        model=model_name,
+    )
+
+    logger.info("Embedding %d chunks ...", len(chunks))
+    vectors = embeddings.embed_documents([c.page_content for c in chunks])
+    matrix = np.ascontiguousarray(vectors, dtype=np.float32)
+    if matrix.ndim != 2:
+        matrix = matrix.reshape(len(chunks), -1)
+
+    tmp_embeddings = index_dir / (EMBEDDINGS_FILE + ".tmp")
+    tmp_chunks     = index_dir / (CHUNKS_FILE + ".tmp")
+    tmp_manifest   = index_dir / (MANIFEST_FILE + ".tmp")
+
+    with open(tmp_embeddings, "wb") as f:
+        np.save(f, matrix)
+
+    with open(tmp_chunks, "w", encoding="utf-8") as f:
+        for chunk in chunks:
+            f.write(json.dumps(
+                {"page_content": chunk.page_content, "metadata": chunk.metadata},
+                ensure_ascii=False,
+            ) + "\n")
+
+    with open(tmp_manifest, "w", encoding="utf-8") as f:
+        json.dump({
+            "index_name": index_name,
+            "model":      model_name,
+            "dim":        int(matrix.shape[1]),
+            "count":      len(chunks),
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+        }, f, indent=2)
+
+    tmp_embeddings.replace(index_dir / EMBEDDINGS_FILE)
+    tmp_chunks.replace(index_dir / CHUNKS_FILE)
+    tmp_manifest.replace(index_dir / MANIFEST_FILE)
+    BM25Index.build(chunks).save(index_dir / BM25_FILE)
+    bump_index_version(index_name)
+
+    logger.info(
+        "Local index saved: %s | Vectors: %d | Matrix: %.1f MB",
+        index_dir, len(chunks), matrix.nbytes / 1e6,
+    )
+    return index_dir
+
+
+# ---------------------------------------------------------------------------
+# Main
+# ---------------------------------------------------------------------------
+
+def run(
+    cleaned_folder: str | Path,
+    index_dir: str | Path = DEFAULT_INDEX_DIR,
+    chunk_size: int = 512,
+    chunk_overlap: int = 64,
+    model_name: str = "BAAI/bge-small-en-v1.5",
+    batch_size: int = 256,
+) -> Path:
+    docs   = load_cleaned_docs(cleaned_folder)
+    chunks = chunk_docs(docs, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    return build_local_index(
+        chunks,
+        index_dir=index_dir,
+        model_name=model_name,
+        batch_size=batch_size,
+    )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+    parser = argparse.ArgumentParser(
+        description="Chunk, embed and save cleaned Lovable docs as a local NumPy index."
+    )
+    parser.add_argument("cleaned_folder", help="Folder with cleaned docs — .jsonl[.zst] doc store or legacy .pkl")
+    parser.add_argument("--index-dir",     default=DEFAULT_INDEX_DIR, help="Output folder (default: ./local_index)")
+    parser.add_argument("--chunk-size",    type=int, default=512, help="Max chars per chunk (default: 512)")
+    parser.add_argument("--chunk-overlap", type=int, default=64,  help="Overlap between chunks (default: 64)")
+    parser.add_argument("--model",         default="BAAI/bge-small-en-v1.5", help="HuggingFace embedding model name")
+    parser.add_argument("--batch-size",    type=int, default=256, help="Embedding batch size (default: 256)")
+    args = parser.parse_args()
+
+    run(
+        cleaned_folder=args.cleaned_folder,
+        index_dir=args.index_dir,
+        chunk_size=args.chunk_size,
+        chunk_overlap=args.chunk_overlap,
+        model_name=args.model,
+        batch_size=args.batch_size,
+    )
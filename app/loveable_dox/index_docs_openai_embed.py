@@ -1,18 +1,33 @@
 """
-Load cleaned .pkl files → chunk → embed (OpenAI) → cache → upsert to Pinecone.
-
-Embeddingi generowane są dokładnie raz:
-  - zapisywane do ./openai_embeddings/<index>_<date>.pkl (cache)
-  - wgrywane do Pinecone przez natywne SDK (index.upsert)
+Load cleaned docs (doc store) → chunk → embed (OpenAI) → cache → upsert to Pinecone.
+
+Etapy działają strumieniowo (app/loveable_dox/pipeline.py): chunki płyną
+przez ograniczone kolejki do embeddingu i upsertu, więc pierwsze wektory są
+w indeksie, zanim chunker skończy, a pamięć nie rośnie z rozmiarem korpusu.
+
+Indeksowanie jest przyrostowe — identyfikator chunka to sha1 jego treści
+(page_content, czyli dokładnie tego, co jest embedowane):
+  - embedowane są tylko chunki, których nie ma w EmbeddingStore
+    (./embedding_store/<model>/, klucz = (model, sha1), wspólny dla indeksów i dni)
+  - do Pinecone trafiają tylko id, których nie ma w indeksie (index.list)
+  - wektory chunków, które zniknęły z dokumentacji, są usuwane
+  - upsert/delete idą równolegle (UPSERT_WORKERS wątków) z retry i backoffem;
+    id z paczek, które mimo to nie przeszły, trafiają do ./upsert_failed/<index>.json
+  - przebieg bez żadnego chunka (pusty / błędny katalog) przerywa się przed
+    usuwaniem; diff usuwający więcej niż MAX_DELETE_FRACTION indeksu też,
+    chyba że podano --allow-mass-delete
 
 Usage:
     python index_docs.py
     python index_docs.py --cleaned-dir ./cleaned --index-name lovable-docs
     python index_docs.py --dry-run --sample 5
+    python index_docs.py --full          # upsert wszystkiego, bez diffu z indeksem
+    python index_docs.py --replay-failed # dośle tylko paczki zapisane w ./upsert_failed/<index>.json
+    python index_docs.py --allow-mass-delete   # dokumentacja naprawdę skurczyła się o ponad połowę
 
 Required env vars:
     PINECONE_API_KEY
-    OPENAI_API_KEY
+    OPENAI_API_KEY    (tylko gdy są chunki spoza EmbeddingStore)
 
 Index must exist in Pinecone console (https://app.pinecone.io):
     Dimensions : 1536  (text-embedding-3-small)
@@ -21,21 +36,38 @@ Index must exist in Pinecone console (https://app.pinecone.io):
 
 import os
 import re
+import asyncio
+import json
+import time
+import random
 import pickle
 import hashlib
 import logging
 import argparse
-from datetime import date
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from typing import Iterable, Iterator
 from dotenv import load_dotenv
 
 load_dotenv()
 
 from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings
 from pinecone import Pinecone
 
+from app.graph.nodes.process_rag.bm25 import BM25Index
+from app.graph.nodes.process_rag.result_cache import bump_index_version
+from app.loveable_dox.doc_store import iter_docs
+from app.loveable_dox.embedding_store import DEFAULT_STORE_DIR, EmbeddingStore
+from app.loveable_dox.near_dedup import DEFAULT_THRESHOLD, iter_without_near_duplicates
+from app.loveable_dox.openai_embedder import (
+    DEFAULT_CONCURRENCY,
+    DEFAULT_RPM,
+    DEFAULT_TPM,
+    EmbeddingSession,
+)
+from app.loveable_dox.pipeline import Stage, run_pipeline
+
 logging.basicConfig(level=logging.WARNING, format="%(asctime)s [%(levelname)s] %(message)s")
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -44,7 +76,20 @@ MODEL_NAME    = "text-embedding-3-small"
 CHUNK_SIZE    = 800
 CHUNK_OVERLAP = 160
 BATCH_SIZE    = 100
+DELETE_BATCH  = 1000
 CACHE_DIR     = "./openai_embeddings"
+BM25_DIR      = "./bm25"
+FAILED_DIR    = "./upsert_failed"
+
+MAX_DELETE_FRACTION = 0.5   # większe usuwanie tylko z allow_mass_delete
+
+UPSERT_WORKERS  = 8
+UPSERT_ATTEMPTS = 5
+BACKOFF_BASE    = 1.0   # s, podwajane przy każdej próbie (+ jitter)
+
+EMBED_GROUP   = 256     # chunków na jedno wywołanie embed (dzielone dalej wg budżetu tokenów)
+EMBED_WORKERS = 4       # grup embedowanych naraz (requesty i tak ogranicza --concurrency)
+QUEUE_SIZE    = 1024    # maks. elementów w kolejce między etapami
 
 
 # ---------------------------------------------------------------------------
@@ -85,41 +130,68 @@ def _sha1(text: str) -> str:
     return hashlib.sha1(text.encode("utf-8")).hexdigest()
 
 
-def _cache_path(index_name: str) -> Path:
-    today = date.today().isoformat()
-    return Path(CACHE_DIR) / f"{index_name}_{today}.pkl"
+def _chunk_id(page_content: str) -> str:
+    """Id wektora = sha1 embedowanego tekstu (z prefiksem [doc]/[section])."""
+    return _sha1(page_content)
+
+
+def _legacy_caches(index_name: str) -> list[Path]:
+    """Stare pickle: <index>_<date>.pkl (lista rekordów) i <index>.pkl ({id: embedding})."""
+    cache_dir = Path(CACHE_DIR)
+    return sorted(cache_dir.glob(f"{index_name}_*.pkl")) + sorted(cache_dir.glob(f"{index_name}.pkl"))
 
 
 # ---------------------------------------------------------------------------
 # Load
 # ---------------------------------------------------------------------------
 
-def load_docs(cleaned_dir: str) -> list[Document]:
-    docs = []
-    for path in sorted(Path(cleaned_dir).glob("*.pkl")):
-        with open(path, "rb") as f:
-            batch = pickle.load(f)
-        docs.extend(batch)
-    logger.info("Docs loaded: %d (from %s)", len(docs), cleaned_dir)
-    return docs
+def load_docs(cleaned_dir: str) -> Iterator[Document]:
+    """Strumień dokumentów z doc store (.jsonl[.zst]); stare .pkl jako fallback."""
+    return iter_docs(cleaned_dir)
 
 
 # ---------------------------------------------------------------------------
 # Chunk
 # ---------------------------------------------------------------------------
 
-def chunk_docs(docs: list[Document]) -> list[Document]:
+def _chunk_body(chunk: Document) -> str:
+    """Tekst chunka bez prefiksu [doc: ...] / [section: ...]."""
+    n_prefix = 2 if chunk.metadata.get("section") else 1
+    return chunk.page_content.split("\n", n_prefix)[-1]
+
+
+def iter_chunks(
+    docs: Iterable[Document],
+    near_dup_threshold: float = DEFAULT_THRESHOLD,
+    near_dup_report: str | None = None,
+) -> Iterator[Document]:
+    """
+    Sekcje → chunki z prefiksem kontekstu, leniwie (dokument po dokumencie).
+    Duplikaty dokładne (sha1 tekstu) odpadają od razu, prawie-duplikaty
+    (MinHash/LSH na tekście bez prefiksu, Jaccard >= near_dup_threshold;
+    0 = wyłączone) względem chunków już przepuszczonych.
+    """
+    return iter_without_near_duplicates(
+        _iter_raw_chunks(docs),
+        threshold=near_dup_threshold,
+        text_fn=_chunk_body,
+        report_path=near_dup_report,
+    )
+
+
+def _iter_raw_chunks(docs: Iterable[Document]) -> Iterator[Document]:
     splitter = RecursiveCharacterTextSplitter(
         chunk_size=CHUNK_SIZE,
         chunk_overlap=CHUNK_OVERLAP,
         separators=["\n\n", "\n", ". ", " ", ""],
     )
 
-    chunks: list[Document] = []
     seen_hashes: set[str] = set()
     duplicates = 0
+    n_docs = 0
 
     for doc in docs:
+        n_docs += 1
         source = doc.metadata.get("source", "")
         title  = _url_to_title(source)
 
@@ -143,7 +215,7 @@ def chunk_docs(docs: list[Document]) -> list[Document]:
                     context_parts.append(f"[section: {section_heading}]")
                 page_content = "\n".join(context_parts) + "\n" + text
 
-                chunks.append(Document(
+                yield Document(
                     page_content=page_content,
                     metadata={
                         "source":  source,
@@ -151,73 +223,148 @@ def chunk_docs(docs: list[Document]) -> list[Document]:
                         "section": section_heading,
                         "hash":    h,
                     },
-                ))
+                )
 
     logger.info(
         "Chunking complete: %d docs → %d chunks (%d duplicates skipped)",
-        len(docs), len(chunks), duplicates,
+        n_docs, len(seen_hashes), duplicates,
     )
-    return chunks
+
+
+def chunk_docs(
+    docs: Iterable[Document],
+    near_dup_threshold: float = DEFAULT_THRESHOLD,
+    near_dup_report: str | None = None,
+) -> list[Document]:
+    """Wszystkie chunki jako lista (dry-run); indeksowanie korzysta z iter_chunks."""
+    return list(iter_chunks(docs, near_dup_threshold=near_dup_threshold, near_dup_report=near_dup_report))
 
 
 # ---------------------------------------------------------------------------
 # Embed & cache
 # ---------------------------------------------------------------------------
 
-def embed_and_cache(chunks: list[Document], index_name: str) -> list[dict]:
+def import_legacy_cache(store: EmbeddingStore, index_name: str) -> int:
     """
-    Generuje embeddingi dokładnie raz, zapisuje cache do .pkl.
-    Zwraca listę rekordów: page_content + metadata + embedding.
+    Jednorazowo przenosi stare pickle z CACHE_DIR do EmbeddingStore,
+    po czym zmienia im rozszerzenie na .imported.
     """
-    api_key = os.environ.get("OPENAI_API_KEY")
-    if not api_key:
-        raise EnvironmentError("OPENAI_API_KEY env var not set.")
+    added = 0
+    for path in _legacy_caches(index_name):
+        with open(path, "rb") as f:
+            data = pickle.load(f)
+        if isinstance(data, list):
+            data = {_chunk_id(r["page_content"]): r["embedding"] for r in data}
+        if data:
+            added += store.put_many(list(data), list(data.values()))
+        path.rename(path.with_suffix(".imported"))
+        logger.info("Imported legacy embedding cache: %s", path)
+    return added
+
+
+# ---------------------------------------------------------------------------
+# Upsert
+# ---------------------------------------------------------------------------
+
+def _existing_ids(index) -> set[str] | None:
+    """Wszystkie id w indeksie (index.list — tylko indeksy serverless); None gdy niedostępne."""
+    try:
+        ids: set[str] = set()
+        for page in index.list():
+            ids.update(page)
+        return ids
+    except Exception as e:
+        logger.warning("Cannot list index ids (%s) — falling back to full upsert without deletes.", e)
+        return None
+
+
+def _failed_path(index_name: str) -> Path:
+    return Path(FAILED_DIR) / f"{index_name}.json"
+
+
+def load_failed(index_name: str) -> dict[str, list[str]]:
+    path = _failed_path(index_name)
+    if not path.exists():
+        return {"upsert": [], "delete": []}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
 
-    embeddings_model = OpenAIEmbeddings(
-        model=MODEL_NAME,
-        openai_api_key=api_key,
+def save_failed(index_name: str, failed: dict[str, list[str]]) -> None:
+    """Zapisuje id z nieudanych paczek; pusty wynik usuwa plik."""
+    path = _failed_path(index_name)
+    if not failed["upsert"] and not failed["delete"]:
+        path.unlink(missing_ok=True)
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(failed, f, indent=2)
+    tmp.replace(path)
+    logger.error(
+        "%d upserts / %d deletes failed — saved to %s, resend with --replay-failed",
+        len(failed["upsert"]), len(failed["delete"]), path,
     )
 
-    import tiktoken
-    enc        = tiktoken.encoding_for_model("text-embedding-3-small")
-    MAX_TOKENS = 8192
 
-    def _truncate(text: str) -> str:
-        tokens = enc.encode(text)
-        if len(tokens) > MAX_TOKENS:
-            return enc.decode(tokens[:MAX_TOKENS])
-        return text
+def _with_backoff(fn, what: str) -> bool:
+    for attempt in range(1, UPSERT_ATTEMPTS + 1):
+        try:
+            fn()
+            return True
+        except Exception as e:
+            if attempt == UPSERT_ATTEMPTS:
+                logger.error("%s failed after %d attempts: %s", what, attempt, e)
+                return False
+            delay = BACKOFF_BASE * 2 ** (attempt - 1) * (1 + random.random())
+            logger.warning("%s failed (%s) — retry %d in %.1fs", what, e, attempt, delay)
+            time.sleep(delay)
 
-    logger.info("Generating embeddings for %d chunks via OpenAI API...", len(chunks))
-    texts     = [_truncate(c.page_content) for c in chunks]
-    truncated = sum(1 for c in chunks if len(enc.encode(c.page_content)) > MAX_TOKENS)
-    if truncated:
-        logger.warning("Truncated %d chunks exceeding %d tokens", truncated, MAX_TOKENS)
-    vectors = embeddings_model.embed_documents(texts)
 
-    records = [
+def _upsert_batch(index, batch: list[dict]) -> None:
+    index.upsert(vectors=[
         {
-            "page_content": chunk.page_content,
-            "metadata":     chunk.metadata,
-            "embedding":    vector,
+            "id":       r["id"],
+            "values":   r["embedding"].tolist(),
+            "metadata": {**r["metadata"], "text": r["page_content"]},
         }
-        for chunk, vector in zip(chunks, vectors)
-    ]
-
-    Path(CACHE_DIR).mkdir(parents=True, exist_ok=True)
-    cache_file = _cache_path(index_name)
-    with open(cache_file, "wb") as f:
-        pickle.dump(records, f)
-    logger.info("Embeddings cached: %s (%d records)", cache_file, len(records))
+        for r in batch
+    ])
+
+
+def _write_batches(
+    index,
+    to_upsert: list[dict],
+    to_delete: list[str],
+    workers: int,
+) -> tuple[int, int, dict[str, list[str]]]:
+    """Równoległe upserty i delete; zwraca (upserted, deleted, {"upsert": [...], "delete": [...]})."""
+    jobs = []
+    for i in range(0, len(to_upsert), BATCH_SIZE):
+        batch = to_upsert[i:i + BATCH_SIZE]
+        jobs.append(("upsert", [r["id"] for r in batch], lambda b=batch: _upsert_batch(index, b)))
+    for i in range(0, len(to_delete), DELETE_BATCH):
+        batch = to_delete[i:i + DELETE_BATCH]
+        jobs.append(("delete", batch, lambda b=batch: index.delete(ids=b)))
+
+    done   = {"upsert": 0, "delete": 0}
+    failed = {"upsert": [], "delete": []}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(_with_backoff, fn, f"{kind} batch {n}"): (kind, ids)
+            for n, (kind, ids, fn) in enumerate(jobs)
+        }
+        for future in as_completed(futures):
+            kind, ids = futures[future]
+            if future.result():
+                done[kind] += len(ids)
+            else:
+                failed[kind].extend(ids)
 
-    return records
+    return done["upsert"], done["delete"], failed
 
 
-# ---------------------------------------------------------------------------
-# Upsert
-# ---------------------------------------------------------------------------
-
-def upsert_to_pinecone(records: list[dict], index_name: str) -> None:
+def _open_index(index_name: str, workers: int):
     api_key = os.environ.get("PINECONE_API_KEY")
     if not api_key:
         raise EnvironmentError("PINECONE_API_KEY env var not set.")
@@ -229,27 +376,149 @@ def upsert_to_pinecone(records: list[dict], index_name: str) -> None:
             f"Index '{index_name}' not found. Available: {existing}\n"
             "Create it at https://app.pinecone.io (dim=1536, metric=cosine)."
         )
+    return pc.Index(index_name, pool_threads=workers)
 
-    index = pc.Index(index_name)
 
-    batches = [records[i:i + BATCH_SIZE] for i in range(0, len(records), BATCH_SIZE)]
-    total = 0
-    for i, batch in enumerate(batches):
-        try:
-            vectors = [
+# ---------------------------------------------------------------------------
+# Streaming: chunk → embed → upsert (app/loveable_dox/pipeline.py)
+# ---------------------------------------------------------------------------
+
+async def index_streaming(
+    docs: Iterable[Document],
+    index_name: str,
+    incremental: bool = True,
+    embed_options: dict | None = None,
+    workers: int = UPSERT_WORKERS,
+    replay_failed: bool = False,
+    near_dup_threshold: float = DEFAULT_THRESHOLD,
+    near_dup_report: str | None = None,
+    store_dir: str = DEFAULT_STORE_DIR,
+    allow_mass_delete: bool = False,
+) -> None:
+    """
+    Etapy nakładają się w czasie: chunker (wątek) → embed (EMBED_WORKERS grup
+    po EMBED_GROUP chunków, wspólne limity RPM/TPM) → upsert (workers paczek
+    po BATCH_SIZE). Kolejki między etapami są ograniczone, więc w pamięci jest
+    tylko to, co aktualnie „w locie” — nie cały korpus w każdej postaci.
+
+    Chunki, których id już jest w indeksie, nie są embedowane ani wysyłane.
+    Usuwanie znikniętych id i BM25 (potrzebuje wszystkich tekstów) — po
+    zakończeniu strumienia. OPENAI_API_KEY jest wymagany dopiero, gdy
+    jakiegoś chunka brakuje w EmbeddingStore (EmbeddingSession tworzy klienta leniwie).
+
+    Zero chunków → ValueError, nic nie jest usuwane ani nadpisywane (BM25, wersja).
+    Diff usuwający > MAX_DELETE_FRACTION indeksu → RuntimeError przed usuwaniem,
+    chyba że allow_mass_delete.
+    """
+    index = _open_index(index_name, workers)
+    store = EmbeddingStore(MODEL_NAME, store_dir)
+    import_legacy_cache(store, index_name)
+
+    if replay_failed:
+        previous     = load_failed(index_name)
+        wanted       = set(previous["upsert"])
+        existing_ids = None
+        logger.info("Replaying failed batches: %d upserts | %d deletes", len(wanted), len(previous["delete"]))
+    else:
+        wanted       = None
+        existing_ids = _existing_ids(index) if incremental else None
+        if existing_ids is not None:
+            logger.info("Index '%s' holds %d ids", index_name, len(existing_ids))
+
+    def _skip(chunk_id: str) -> bool:
+        if wanted is not None:
+            return chunk_id not in wanted
+        return existing_ids is not None and chunk_id in existing_ids
+
+    seen:      set[str] = set()
+    all_chunks: list[tuple[str, Document]] = []   # BM25
+    counts = {"unchanged": 0, "upserted": 0}
+    failed = {"upsert": [], "delete": []}
+
+    async with EmbeddingSession(store, MODEL_NAME, **(embed_options or {})) as session:
+
+        async def _embed(chunks: list[Document]) -> list[dict] | None:
+            ids = [_chunk_id(c.page_content) for c in chunks]
+            seen.update(ids)
+            all_chunks.extend(zip(ids, chunks))
+
+            todo = [(i, c) for i, c in zip(ids, chunks) if not _skip(i)]
+            counts["unchanged"] += len(chunks) - len(todo)
+            if not todo:
+                return None
+
+            bad = set(await session.embed({i: c.page_content for i, c in todo}))
+            if bad:
+                # Pominięte teraz, zostaną dosłane przy następnym uruchomieniu (nadal "missing")
+                todo = [(i, c) for i, c in todo if i not in bad]
+            matrix = await asyncio.to_thread(store.get_many, [i for i, _ in todo])
+            return [
                 {
-                    "id":       r["metadata"]["hash"],
-                    "values":   r["embedding"],
-                    "metadata": {**r["metadata"], "text": r["page_content"]},
+                    "id":           chunk_id,
+                    "page_content": chunk.page_content,
+                    "metadata":     chunk.metadata,
+                    "embedding":    vector,
                 }
-                for r in batch
+                for (chunk_id, chunk), vector in zip(todo, matrix)
             ]
-            index.upsert(vectors=vectors)
-            total += len(batch)
-        except Exception as e:
-            logger.error("Batch %d upsert failed: %s", i, e)
 
-    logger.info("Upsert complete: %d chunks → Pinecone index '%s'", total, index_name)
+        async def _upsert(records: list[dict]) -> list[str] | None:
+            ids = [r["id"] for r in records]
+            ok = await asyncio.to_thread(_with_backoff, lambda: _upsert_batch(index, records), f"upsert batch of {len(ids)}")
+            if not ok:
+                failed["upsert"].extend(ids)
+                return None
+            counts["upserted"] += len(ids)
+            return ids
+
+        await run_pipeline(
+            iter_chunks(docs, near_dup_threshold=near_dup_threshold, near_dup_report=near_dup_report),
+            [
+                Stage("embed",  _embed,  workers=EMBED_WORKERS, batch_size=EMBED_GROUP, maxsize=QUEUE_SIZE),
+                Stage("upsert", _upsert, workers=workers,       batch_size=BATCH_SIZE,  maxsize=QUEUE_SIZE),
+            ],
+        )
+        embed_failed = set(session.failed)
+
+    # Pusty / błędny katalog nie może wyczyścić indeksu ani BM25
+    if not seen:
+        raise ValueError("No chunks to index — is the cleaned docs folder empty or everything filtered out?")
+
+    if wanted is not None:
+        to_delete = previous["delete"]
+    elif existing_ids is not None:
+        to_delete = sorted(existing_ids - seen)
+        if not allow_mass_delete and len(to_delete) > MAX_DELETE_FRACTION * len(existing_ids):
+            raise RuntimeError(
+                f"Refusing to delete {len(to_delete)} of {len(existing_ids)} vectors from '{index_name}' "
+                f"(> {MAX_DELETE_FRACTION:.0%}) — check --cleaned-dir, or pass --allow-mass-delete"
+            )
+    else:
+        to_delete = []
+    _, deleted, delete_failed = _write_batches(index, [], to_delete, workers)
+    failed["delete"] = delete_failed["delete"]
+
+    logger.info(
+        "Upsert complete: %d chunks | %d unchanged | %d upserted | %d deleted | %d embed failures → Pinecone index '%s'",
+        len(seen), counts["unchanged"], counts["upserted"], deleted, len(embed_failed), index_name,
+    )
+    logger.info("Embedding store: %s (%d vectors)", store.path, len(store))
+
+    save_failed(index_name, failed)
+    if not replay_failed:
+        build_bm25([c for i, c in all_chunks if i not in embed_failed], index_name)
+    if counts["upserted"] or deleted:
+        bump_index_version(index_name)
+
+
+# ---------------------------------------------------------------------------
+# BM25 (hybrid retrieval — see app/graph/nodes/process_rag/bm25.py)
+# ---------------------------------------------------------------------------
+
+def build_bm25(chunks: list[Document], index_name: str) -> Path:
+    path = BM25Index.build(chunks).save(Path(BM25_DIR) / f"{index_name}.json")
+    logger.info("BM25 index saved: %s (%d chunks)", path, len(chunks))
+    return path
 
 
 # ---------------------------------------------------------------------------
@@ -291,34 +560,36 @@ def dry_run(chunks: list[Document], sample: int) -> None:
 # Main
 # ---------------------------------------------------------------------------
 
-def load_cache(cache_path: Path) -> list[dict]:
-    with open(cache_path, "rb") as f:
-        records = pickle.load(f)
-    logger.info("Loaded %d records from cache: %s", len(records), cache_path)
-    return records
-
-
-def run(cleaned_dir: str, index_name: str, is_dry_run: bool, sample: int) -> None:
-    docs   = load_docs(cleaned_dir)
-    chunks = chunk_docs(docs)
+def run(
+    cleaned_dir: str,
+    index_name: str,
+    is_dry_run: bool,
+    sample: int,
+    full: bool = False,
+    embed_options: dict | None = None,
+    workers: int = UPSERT_WORKERS,
+    replay_failed: bool = False,
+    near_dup_threshold: float = DEFAULT_THRESHOLD,
+    near_dup_report: str | None = None,
+    allow_mass_delete: bool = False,
+) -> None:
+    docs = load_docs(cleaned_dir)
 
     if is_dry_run:
-        dry_run(chunks, sample)
+        dry_run(chunk_docs(docs, near_dup_threshold=near_dup_threshold, near_dup_report=near_dup_report), sample)
         return
 
-    cache_file = _cache_path(index_name)
-    if cache_file.exists():
-        answer = input(
-            f"\nCache już istnieje: {cache_file}\n"
-            "Użyć istniejącego cache? [T/n]: "
-        ).strip().lower()
-        if answer in ("", "t", "y", "tak", "yes"):
-            records = load_cache(cache_file)
-            upsert_to_pinecone(records, index_name)
-            return
-
-    records = embed_and_cache(chunks, index_name)
-    upsert_to_pinecone(records, index_name)
+    asyncio.run(index_streaming(
+        docs,
+        index_name,
+        incremental=not full,
+        embed_options=embed_options,
+        workers=workers,
+        replay_failed=replay_failed,
+        near_dup_threshold=near_dup_threshold,
+        near_dup_report=near_dup_report,
+        allow_mass_delete=allow_mass_delete,
+    ))
 
 
 if __name__ == "__main__":
@@ -326,13 +597,31 @@ if __name__ == "__main__":
         description="Chunk, embed (OpenAI) and upsert docs to Pinecone."
     )
     parser.add_argument("--cleaned-dir", default="./cleaned_docs",
-                        help="Katalog z plikami .pkl (domyślnie: ./cleaned_docs)")
+                        help="Katalog z doc store .jsonl[.zst] albo starymi .pkl (domyślnie: ./cleaned_docs)")
     parser.add_argument("--index-name",  default="lovable-docs",
                         help="Nazwa indeksu Pinecone (domyślnie: lovable-docs)")
     parser.add_argument("--dry-run",     action="store_true",
                         help="Pokaż przykładowe chunki bez embeddingu i upsert")
     parser.add_argument("--sample",      type=int, default=5,
                         help="Liczba chunków w dry-run (domyślnie: 5)")
+    parser.add_argument("--full",        action="store_true",
+                        help="Upsert wszystkich chunków bez diffu z indeksem (bez usuwania)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"Równoległe requesty embeddingu (domyślnie: {DEFAULT_CONCURRENCY})")
+    parser.add_argument("--rpm",         type=int, default=DEFAULT_RPM,
+                        help=f"Limit requestów/min do API embeddingów (domyślnie: {DEFAULT_RPM})")
+    parser.add_argument("--tpm",         type=int, default=DEFAULT_TPM,
+                        help=f"Limit tokenów/min do API embeddingów (domyślnie: {DEFAULT_TPM})")
+    parser.add_argument("--workers",     type=int, default=UPSERT_WORKERS,
+                        help=f"Równoległe upserty do Pinecone (domyślnie: {UPSERT_WORKERS})")
+    parser.add_argument("--replay-failed", action="store_true",
+                        help="Dośle tylko paczki zapisane po nieudanym upsercie (./upsert_failed/<index>.json)")
+    parser.add_argument("--near-dup-threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"Próg Jaccarda dla prawie-duplikatów chunków, 0 = wyłączone (domyślnie: {DEFAULT_THRESHOLD})")
+    parser.add_argument("--near-dup-report", default=None,
+                        help="Zapisz raport usuniętych klastrów do pliku JSON")
+    parser.add_argument("--allow-mass-delete", action="store_true",
+                        help=f"Pozwól usunąć więcej niż {MAX_DELETE_FRACTION:.0%} indeksu w jednym przebiegu")
     args = parser.parse_args()
 
     run(
@@ -340,4 +629,11 @@ if __name__ == "__main__":
         index_name=args.index_name,
         is_dry_run=args.dry_run,
         sample=args.sample,
+        full=args.full,
+        embed_options={"concurrency": args.concurrency, "rpm": args.rpm, "tpm": args.tpm},
+        workers=args.workers,
+        replay_failed=args.replay_failed,
+        near_dup_threshold=args.near_dup_threshold,
+        near_dup_report=args.near_dup_report,
+        allow_mass_delete=args.allow_mass_delete,
     )
\ No newline at end of file
@@ -1,5 +1,5 @@
 """
-Load cleaned .pkl files → chunk → embed → upsert to Pinecone (concurrently).
+Load cleaned docs (doc store / .pkl) → chunk → embed → upsert to Pinecone (concurrently).
 
 Usage:
     python index_docs.py
@@ -14,7 +14,6 @@ Index must exist in Pinecone console (https://app.pinecone.io):
 """
 
 import os
-import pickle
 import logging
 import argparse
 from pathlib import Path
@@ -29,6 +28,10 @@ from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_pinecone import PineconeVectorStore
 from pinecone import Pinecone
 
+from app.graph.nodes.process_rag.bm25 import BM25Index
+from app.graph.nodes.process_rag.result_cache import bump_index_version
+from app.loveable_dox.doc_store import iter_docs
+
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 logger = logging.getLogger(__name__)
 
@@ -37,15 +40,11 @@ CHUNK_SIZE  = 512   # znaki; ~100-130 tokenów dla angielskiego tekstu techniczn
 CHUNK_OVERLAP = 64
 BATCH_SIZE  = 256
 MAX_WORKERS = 4
+BM25_DIR    = "./bm25"
 
 
 def load_docs(cleaned_dir: str) -> list[Document]:
-    docs = []
-    for path in sorted(Path(cleaned_dir).glob("*.pkl")):
-        with open(path, "rb") as f:
-            batch = pickle.load(f)
-        docs.extend(batch)
-        logger.info("Loaded %d docs from %s", len(batch), path.name)
+    docs = list(iter_docs(cleaned_dir))
     logger.info("Total docs loaded: %d", len(docs))
     return docs
 
@@ -116,6 +115,10 @@ def run(cleaned_dir: str, index_name: str) -> None:
 
     logger.info("Done. Total upserted: %d chunks", total)
 
+    bm25_path = BM25Index.build(chunks).save(Path(BM25_DIR) / f"{index_name}.json")
+    logger.info("BM25 index saved: %s", bm25_path)
+    bump_index_version(index_name)
+
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
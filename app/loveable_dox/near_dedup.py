@@ -0,0 +1,244 @@
+"""
+Near-duplicate chunk filter (MinHash + LSH) for the indexers.
+
+Exact sha1 dedup misses the boilerplate paragraphs and overlapping sections
+that docs pages repeat with small edits. Every chunk is turned into a set of
+word shingles, summarised by a MinHash signature, and bucketed with LSH
+(bands x rows chosen for the threshold). Candidate pairs are confirmed with
+the exact Jaccard similarity of their shingle sets.
+
+Chunks are scanned in input order: a chunk is dropped when it is a near
+duplicate (Jaccard >= threshold) of a chunk that was already kept, so the
+result is deterministic and the first occurrence always survives.
+
+Usage:
+    for chunk in iter_without_near_duplicates(chunk_stream, threshold=0.85, report_path="near_dup_report.json"):
+        ...
+
+    result = find_near_duplicates(texts, threshold=0.85)
+    result.kept, result.clusters      # {kept index: [(removed index, jaccard), ...]}
+"""
+
+import re
+import json
+import zlib
+import logging
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Mapping
+
+import numpy as np
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THRESHOLD = 0.85
+NUM_PERM          = 128
+SHINGLE_SIZE      = 5       # words
+SEED              = 1
+
+_WORD = re.compile(r"\w+")
+
+
+@dataclass
+class NearDupResult:
+    kept:     list[int]
+    clusters: dict[int, list[tuple[int, float]]] = field(default_factory=dict)
+
+    @property
+    def removed(self) -> int:
+        return sum(len(v) for v in self.clusters.values())
+
+
+# ---------------------------------------------------------------------------
+# MinHash
+# ---------------------------------------------------------------------------
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> set[int]:
+    """crc32 of lowercased word n-grams; short texts give a single shingle."""
+    words = _WORD.findall(text.lower())
+    if not words:
+        return set()
+    if len(words) <= size:
+        return {zlib.crc32(" ".join(words).encode("utf-8"))}
+    return {
+        zlib.crc32(" ".join(words[i:i + size]).encode("utf-8"))
+        for i in range(len(words) - size + 1)
+    }
+
+
+def _permutations(num_perm: int, seed: int) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 2**63, size=num_perm, dtype=np.uint64) | np.uint64(1)   # odd multiplier
+    b = rng.integers(0, 2**63, size=num_perm, dtype=np.uint64)
+    return a, b
+
+
+def minhash(shingle_set: set[int], a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Multiply-shift hashing: h_i(x) = ((a_i * x + b_i) mod 2^64) >> 32, min over the set."""
+    x = np.fromiter(shingle_set, dtype=np.uint64, count=len(shingle_set))
+    with np.errstate(over="ignore"):
+        hashed = (a[:, None] * x[None, :] + b[:, None]) >> np.uint64(32)
+    return hashed.min(axis=1)
+
+
+def lsh_params(threshold: float, num_perm: int = NUM_PERM) -> tuple[int, int]:
+    """
+    (bands, rows) with bands * rows == num_perm whose S-curve midpoint is the
+    highest one not above threshold — errs on recall, since every candidate
+    pair is confirmed with the exact Jaccard anyway.
+    """
+    options = [(b, num_perm // b) for b in range(1, num_perm + 1) if num_perm % b == 0]
+    below = [br for br in options if (1 / br[0]) ** (1 / br[1]) <= threshold]
+    return max(below, key=lambda br: (1 / br[0]) ** (1 / br[1])) if below else options[-1]
+
+
+# ---------------------------------------------------------------------------
+# Dedup
+# ---------------------------------------------------------------------------
+
+class NearDupFilter:
+    """
+    Incremental form of the filter: texts are fed one at a time (in the order
+    they should be kept), so a streaming chunker can drop near duplicates
+    without materializing the corpus. Memory holds the shingle sets and LSH
+    buckets of the kept texts only.
+    """
+
+    def __init__(
+        self,
+        threshold: float = DEFAULT_THRESHOLD,
+        num_perm: int = NUM_PERM,
+        shingle_size: int = SHINGLE_SIZE,
+        seed: int = SEED,
+    ):
+        self.threshold    = threshold
+        self.shingle_size = shingle_size
+        self.a, self.b    = _permutations(num_perm, seed)
+        self.bands, self.rows = lsh_params(threshold, num_perm)
+
+        self._buckets: list[dict[bytes, list[int]]] = [defaultdict(list) for _ in range(self.bands)]
+        self._sets: dict[int, set[int]] = {}
+        self.result = NearDupResult(kept=[])
+        self.seen   = 0
+
+    def add(self, text: str) -> bool:
+        """True when text is kept, False when it is a near duplicate of an already kept text."""
+        i = self.seen
+        self.seen += 1
+
+        shingle_set = shingles(text, self.shingle_size)
+        if not shingle_set:
+            self.result.kept.append(i)
+            return True
+
+        signature = minhash(shingle_set, self.a, self.b)
+        rows = self.rows
+        keys = [signature[band * rows:(band + 1) * rows].tobytes() for band in range(self.bands)]
+
+        candidates = {j for band, key in enumerate(keys) for j in self._buckets[band].get(key, ())}
+        best, best_sim = None, 0.0
+        for j in sorted(candidates):
+            other = self._sets[j]
+            sim = len(shingle_set & other) / len(shingle_set | other)
+            if sim >= self.threshold and sim > best_sim:
+                best, best_sim = j, sim
+
+        if best is not None:
+            self.result.clusters.setdefault(best, []).append((i, round(best_sim, 3)))
+            return False
+
+        # Only kept chunks go into the buckets — later chunks are compared with survivors
+        self.result.kept.append(i)
+        self._sets[i] = shingle_set
+        for band, key in enumerate(keys):
+            self._buckets[band][key].append(i)
+        return True
+
+    def log_summary(self) -> None:
+        result = self.result
+        logger.info(
+            "Near-dup filter: %d → %d chunks (-%d in %d clusters, threshold=%.2f, bands=%d x rows=%d)",
+            self.seen, len(result.kept), result.removed, len(result.clusters), self.threshold, self.bands, self.rows,
+        )
+
+
+def find_near_duplicates(
+    texts: list[str],
+    threshold: float = DEFAULT_THRESHOLD,
+    num_perm: int = NUM_PERM,
+    shingle_size: int = SHINGLE_SIZE,
+    seed: int = SEED,
+) -> NearDupResult:
+    dedup = NearDupFilter(threshold, num_perm, shingle_size, seed)
+    for text in texts:
+        dedup.add(text)
+    dedup.log_summary()
+    return dedup.result
+
+
+def describe_chunk(chunk: Document, text_fn: Callable[[Document], str]) -> dict:
+    return {
+        "source":  chunk.metadata.get("source", ""),
+        "preview": text_fn(chunk)[:200],
+    }
+
+
+def write_report(result: NearDupResult, described: Mapping[int, dict], chunks_in: int, path: str | Path) -> Path:
+    """
+    Clusters sorted by size: the kept chunk and every removed near duplicate
+    with its Jaccard. described maps chunk index → describe_chunk(...).
+    """
+    clusters = [
+        {
+            "kept":    described[kept],
+            "removed": [{**described[i], "jaccard": sim} for i, sim in removed],
+        }
+        for kept, removed in sorted(result.clusters.items(), key=lambda kv: -len(kv[1]))
+    ]
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "chunks_in":  chunks_in,
+            "chunks_out": len(result.kept),
+            "removed":    result.removed,
+            "clusters":   clusters,
+        }, f, ensure_ascii=False, indent=2)
+    logger.info("Near-dup report saved: %s (%d clusters)", path, len(clusters))
+    return path
+
+
+def iter_without_near_duplicates(
+    chunks: Iterable[Document],
+    threshold: float = DEFAULT_THRESHOLD,
+    text_fn: Callable[[Document], str] | None = None,
+    report_path: str | Path | None = None,
+) -> Iterator[Document]:
+    """
+    Drop near-duplicate chunks lazily: every kept chunk is yielded as soon as
+    it is seen. text_fn picks the text compared (default: page_content) — e.g.
+    without a per-document context prefix; threshold <= 0 disables the filter.
+    The report (if any) is written once the input is exhausted; until then it
+    only holds a short description (source + preview) per chunk.
+    """
+    if threshold <= 0:
+        yield from chunks
+        return
+    text_fn = text_fn or (lambda c: c.page_content)
+
+    dedup = NearDupFilter(threshold)
+    described: dict[int, dict] = {}
+    for chunk in chunks:
+        i = dedup.seen
+        if report_path:
+            described[i] = describe_chunk(chunk, text_fn)
+        if dedup.add(text_fn(chunk)):
+            yield chunk
+
+    dedup.log_summary()
+    if report_path:
+        in_clusters = set(dedup.result.clusters)
+        in_clusters.update(i for removed in dedup.result.clusters.values() for i, _ in removed)
+        write_report(dedup.result, {i: described[i] for i in in_clusters}, dedup.seen, report_path)
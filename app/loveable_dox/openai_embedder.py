@@ -0,0 +1,238 @@
+"""
+Async, batched OpenAI embedding with RPM/TPM limits, streamed into EmbeddingStore.
+
+  - every text is tokenized exactly once (tiktoken, batch encode) and truncated
+    to MAX_INPUT_TOKENS; the API receives token arrays, so nothing is re-encoded
+  - requests are packed by token budget (MAX_REQUEST_TOKENS) instead of a fixed
+    item count, capped at MAX_REQUEST_ITEMS inputs
+  - up to `concurrency` requests run at once under a sliding-window limiter
+    (requests and tokens per minute)
+  - a failed batch is retried with backoff; if it keeps failing it is split
+    and every text is retried on its own, so one bad input does not sink 2000
+  - each finished batch goes straight to the store (nothing is held until the end)
+  - the OpenAI client (and OPENAI_API_KEY) is only needed once some text is
+    missing from the store, so a cache-only re-index runs without a key
+
+Usage:
+    store = EmbeddingStore("text-embedding-3-small")
+    async with EmbeddingSession(store, concurrency=8) as session:   # many calls, shared limits
+        failed = await session.embed({chunk_id: text, ...})
+"""
+
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import deque
+from dataclasses import dataclass
+
+from app.loveable_dox.embedding_store import EmbeddingStore
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL       = "text-embedding-3-small"
+MAX_INPUT_TOKENS    = 8191      # per input
+MAX_REQUEST_TOKENS  = 250_000   # per request (API limit is 300k)
+MAX_REQUEST_ITEMS   = 2048      # per request (API limit)
+DEFAULT_RPM         = 3_000
+DEFAULT_TPM         = 1_000_000
+DEFAULT_CONCURRENCY = 8
+MAX_ATTEMPTS        = 5
+BACKOFF_BASE        = 1.0       # seconds, doubled per attempt (+ jitter)
+
+
+@dataclass
+class _Batch:
+    ids:    list[str]
+    tokens: list[list[int]]
+
+    @property
+    def n_tokens(self) -> int:
+        return sum(len(t) for t in self.tokens)
+
+
+# ---------------------------------------------------------------------------
+# Tokenize + pack
+# ---------------------------------------------------------------------------
+
+def tokenize(texts: dict[str, str], model: str = DEFAULT_MODEL) -> tuple[dict[str, list[int]], int]:
+    """{id: tokens} truncated to MAX_INPUT_TOKENS + number of truncated texts."""
+    import tiktoken
+    enc = tiktoken.encoding_for_model(model)
+
+    ids     = list(texts)
+    encoded = enc.encode_ordinary_batch([texts[i] for i in ids])
+    truncated = sum(1 for t in encoded if len(t) > MAX_INPUT_TOKENS)
+    return {i: t[:MAX_INPUT_TOKENS] for i, t in zip(ids, encoded)}, truncated
+
+
+def pack_batches(tokens: dict[str, list[int]]) -> list[_Batch]:
+    """Greedy packing in input order: close a batch when the next text would overflow it."""
+    batches: list[_Batch] = []
+    current = _Batch([], [])
+    budget  = 0
+    for chunk_id, toks in tokens.items():
+        if current.ids and (budget + len(toks) > MAX_REQUEST_TOKENS or len(current.ids) >= MAX_REQUEST_ITEMS):
+            batches.append(current)
+            current, budget = _Batch([], []), 0
+        current.ids.append(chunk_id)
+        current.tokens.append(toks)
+        budget += len(toks)
+    if current.ids:
+        batches.append(current)
+    return batches
+
+
+# ---------------------------------------------------------------------------
+# Rate limiting
+# ---------------------------------------------------------------------------
+
+class RateLimiter:
+    """Sliding 60 s window over requests and tokens; waiters are served in order."""
+
+    WINDOW = 60.0
+
+    def __init__(self, rpm: int = DEFAULT_RPM, tpm: int = DEFAULT_TPM):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._events: deque[tuple[float, int]] = deque()
+        self._tokens = 0
+        self._lock   = asyncio.Lock()
+
+    def _expire(self, now: float) -> None:
+        while self._events and now - self._events[0][0] >= self.WINDOW:
+            self._tokens -= self._events.popleft()[1]
+
+    async def acquire(self, tokens: int) -> None:
+        tokens = min(tokens, self.tpm)   # an oversized request would otherwise wait forever
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._expire(now)
+                if len(self._events) < self.rpm and self._tokens + tokens <= self.tpm:
+                    self._events.append((now, tokens))
+                    self._tokens += tokens
+                    return
+                await asyncio.sleep(max(0.05, self.WINDOW - (now - self._events[0][0])))
+
+
+# ---------------------------------------------------------------------------
+# Embedding
+# ---------------------------------------------------------------------------
+
+class _Embedder:
+    def __init__(self, client, model: str, store: EmbeddingStore, limiter: RateLimiter, concurrency: int):
+        self.client    = client
+        self.model     = model
+        self.store     = store
+        self.limiter   = limiter
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.done      = 0
+        self.total     = 0
+
+    async def _request(self, batch: _Batch) -> list[list[float]]:
+        async with self.semaphore:
+            await self.limiter.acquire(batch.n_tokens)
+            response = await self.client.embeddings.create(model=self.model, input=batch.tokens)
+        return [d.embedding for d in sorted(response.data, key=lambda d: d.index)]
+
+    async def _with_retry(self, batch: _Batch) -> list[list[float]] | None:
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            try:
+                return await self._request(batch)
+            except Exception as e:
+                if getattr(e, "status_code", None) in (400, 422):   # bad input — retrying won't help
+                    logger.error("Embedding batch of %d rejected: %s", len(batch.ids), e)
+                    return None
+                if attempt == MAX_ATTEMPTS:
+                    logger.error("Embedding batch of %d failed after %d attempts: %s", len(batch.ids), attempt, e)
+                    return None
+                delay = BACKOFF_BASE * 2 ** (attempt - 1) * (1 + random.random())
+                logger.warning("Embedding batch of %d failed (%s) — retry %d in %.1fs", len(batch.ids), e, attempt, delay)
+                await asyncio.sleep(delay)
+
+    async def run_batch(self, batch: _Batch) -> list[str]:
+        """Embed one batch into the store; returns the ids that could not be embedded."""
+        vectors = await self._with_retry(batch)
+
+        if vectors is None and len(batch.ids) > 1:
+            # Isolate the bad input(s): every text gets its own request
+            singles = [_Batch([i], [t]) for i, t in zip(batch.ids, batch.tokens)]
+            results = await asyncio.gather(*(self.run_batch(s) for s in singles))
+            return [i for failed in results for i in failed]
+
+        if vectors is None:
+            return list(batch.ids)
+
+        await asyncio.to_thread(self.store.put_many, batch.ids, vectors)
+        self.done += len(batch.ids)
+        logger.info("Embedded %d / %d", self.done, self.total)
+        return []
+
+
+class EmbeddingSession:
+    """
+    One client, rate limiter and concurrency budget shared by any number of
+    embed() calls — the streaming indexer embeds chunk groups as they arrive
+    from several pipeline workers, all under the same RPM/TPM limits.
+    """
+
+    def __init__(
+        self,
+        store: EmbeddingStore,
+        model: str = DEFAULT_MODEL,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        rpm: int = DEFAULT_RPM,
+        tpm: int = DEFAULT_TPM,
+        api_key: str | None = None,
+    ):
+        self.store       = store
+        self.model       = model
+        self.concurrency = concurrency
+        self.rpm         = rpm
+        self.tpm         = tpm
+        self.api_key     = api_key
+        self.failed: list[str] = []
+        self._client   = None
+        self._embedder: _Embedder | None = None
+
+    async def __aenter__(self) -> "EmbeddingSession":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        if self._client is not None:
+            await self._client.close()
+        if self.failed:
+            logger.error("%d texts could not be embedded (will be retried on the next run)", len(self.failed))
+
+    def _get_embedder(self) -> _Embedder:
+        """Client created on the first text that actually has to be sent."""
+        if self._embedder is None:
+            api_key = self.api_key or os.environ.get("OPENAI_API_KEY")
+            if not api_key:
+                raise EnvironmentError("OPENAI_API_KEY env var not set.")
+            from openai import AsyncOpenAI
+
+            self._client   = AsyncOpenAI(api_key=api_key, max_retries=0)
+            self._embedder = _Embedder(self._client, self.model, self.store, RateLimiter(self.rpm, self.tpm), self.concurrency)
+        return self._embedder
+
+    async def embed(self, texts: dict[str, str]) -> list[str]:
+        """Embed {id: text} (ids already in the store are skipped). Returns ids that failed."""
+        texts = {i: t for i, t in texts.items() if i not in self.store}
+        if not texts:
+            return []
+        embedder = self._get_embedder()
+
+        tokens, truncated = await asyncio.to_thread(tokenize, texts, self.model)
+        if truncated:
+            logger.warning("Truncated %d texts exceeding %d tokens", truncated, MAX_INPUT_TOKENS)
+        batches = pack_batches(tokens)
+        embedder.total += len(texts)
+        logger.debug("Embedding %d texts (%d tokens) in %d requests", len(texts), sum(b.n_tokens for b in batches), len(batches))
+
+        results = await asyncio.gather(*(embedder.run_batch(b) for b in batches))
+        failed  = [i for batch_failed in results for i in batch_failed]
+        self.failed.extend(failed)
+        return failed
@@ -0,0 +1,167 @@
+"""
+Bounded-queue async pipeline for the indexers: load → chunk → embed → upsert
+run as overlapping stages instead of one fully materialized list per step.
+
+    source (sync iterator, pulled in a worker thread)
+      └─ queue(maxsize) ─ stage 1 (N workers, batches of k) ─ queue(maxsize) ─ stage 2 ...
+
+  - the sync source (doc store reader + chunker + dedup) runs in a thread, one
+    item per hop, so CPU-bound chunking overlaps with network-bound stages
+  - every stage has its own worker count and batch size; a worker blocks
+    until its batch is full or the upstream is exhausted, then calls the
+    stage function with the list and forwards whatever it returns
+  - queues are bounded, so a slow stage applies backpressure all the way up
+    to the reader: at most ~(maxsize + workers * batch_size) items per stage
+    are in flight, independent of corpus size
+  - the first exception cancels every stage and is re-raised by run_pipeline()
+
+Usage:
+    async def embed(chunks): ...            # list in → list out (or None)
+    async def upsert(records): ...          # last stage: items written (counted) or None
+
+    stats = await run_pipeline(iter_chunks(docs), [
+        Stage("embed",  embed,  workers=4, batch_size=256),
+        Stage("upsert", upsert, workers=8, batch_size=100),
+    ])
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Iterable
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_SIZE = 1024
+
+_DONE = object()
+
+
+@dataclass
+class Stage:
+    name:       str
+    fn:         Callable[[list], Awaitable[list | None]]
+    workers:    int = 1
+    batch_size: int = 1
+    maxsize:    int = DEFAULT_QUEUE_SIZE   # input queue bound (items)
+
+
+@dataclass
+class StageStats:
+    items_in:   int   = 0
+    items_out:  int   = 0
+    calls:      int   = 0
+    busy:       float = 0.0    # summed over workers
+    peak_queue: int   = 0
+    first_out:  float | None = None   # seconds since pipeline start
+
+
+@dataclass
+class PipelineStats:
+    stages:  dict[str, StageStats] = field(default_factory=dict)
+    source:  int   = 0
+    elapsed: float = 0.0
+
+    def log(self) -> None:
+        logger.info("Pipeline: %d source items in %.1fs", self.source, self.elapsed)
+        for name, s in self.stages.items():
+            first = f"{s.first_out:.1f}s" if s.first_out is not None else "-"
+            logger.info(
+                "  %-8s in=%-6d out=%-6d calls=%-5d busy=%6.1fs peak queue=%-5d first output after %s",
+                name, s.items_in, s.items_out, s.calls, s.busy, s.peak_queue, first,
+            )
+
+
+async def _feed(source: Iterable, queue: asyncio.Queue, n_workers: int, stats: PipelineStats) -> None:
+    iterator = iter(source)
+    while True:
+        item = await asyncio.to_thread(next, iterator, _DONE)
+        if item is _DONE:
+            break
+        stats.source += 1
+        await queue.put(item)
+    for _ in range(n_workers):
+        await queue.put(_DONE)
+
+
+async def _worker(
+    stage: Stage,
+    inbox: asyncio.Queue,
+    outbox: asyncio.Queue | None,
+    stats: StageStats,
+    start: float,
+) -> None:
+    done = False
+    while not done:
+        batch: list[Any] = []
+        while len(batch) < stage.batch_size:
+            stats.peak_queue = max(stats.peak_queue, inbox.qsize())
+            item = await inbox.get()
+            if item is _DONE:
+                done = True
+                break
+            batch.append(item)
+        if not batch:
+            continue
+
+        stats.items_in += len(batch)
+        stats.calls    += 1
+        t0 = time.perf_counter()
+        out = await stage.fn(batch)
+        stats.busy += time.perf_counter() - t0
+
+        if out:
+            if stats.first_out is None:
+                stats.first_out = time.perf_counter() - start
+            stats.items_out += len(out)
+            if outbox is not None:
+                for item in out:
+                    await outbox.put(item)
+
+
+async def _run_stage(
+    stage: Stage,
+    inbox: asyncio.Queue,
+    outbox: asyncio.Queue | None,
+    next_workers: int,
+    stats: StageStats,
+    start: float,
+) -> None:
+    async with asyncio.TaskGroup() as group:
+        for _ in range(stage.workers):
+            group.create_task(_worker(stage, inbox, outbox, stats, start))
+    if outbox is not None:
+        for _ in range(next_workers):
+            await outbox.put(_DONE)
+
+
+async def run_pipeline(source: Iterable, stages: list[Stage]) -> PipelineStats:
+    """Push every item of source through the stages; returns per-stage stats."""
+    stats  = PipelineStats(stages={s.name: StageStats() for s in stages})
+    queues = [asyncio.Queue(maxsize=s.maxsize) for s in stages]
+    start  = time.perf_counter()
+
+    try:
+        async with asyncio.TaskGroup() as group:
+            group.create_task(_feed(source, queues[0], stages[0].workers, stats))
+            for i, stage in enumerate(stages):
+                last = i == len(stages) - 1
+                group.create_task(_run_stage(
+                    stage,
+                    queues[i],
+                    None if last else queues[i + 1],
+                    0 if last else stages[i + 1].workers,
+                    stats.stages[stage.name],
+                    start,
+                ))
+    except BaseExceptionGroup as group_error:
+        # Nested task groups wrap the error twice — surface the original one
+        error: BaseException = group_error
+        while isinstance(error, BaseExceptionGroup):
+            error = error.exceptions[0]
+        raise error from None
+
+    stats.elapsed = time.perf_counter() - start
+    stats.log()
+    return stats
@@ -1,6 +1,4 @@
 import os
-from langchain_openai import ChatOpenAI
-from langchain_anthropic import ChatAnthropic
 
 from dotenv import load_dotenv
 
@@ -11,8 +9,21 @@ GPT_MODEL = os.getenv("GPT_MODEL", "gpt-4.1-nano")
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
 ANTHROPIC_MODEL = os.getenv("ANTHROPIC_MODEL")
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
+# "pinecone" (OpenAI embeddings + Pinecone) albo "local" (indeks NumPy, offline)
+RAG_BACKEND = os.getenv("RAG_BACKEND", "pinecone")
+# "torch" | "onnx" | "onnx-int8" — runtime embeddera bge i rerankera na CPU
+RAG_INFERENCE_BACKEND = os.getenv("RAG_INFERENCE_BACKEND", "torch")
+# budżet jednego przebiegu w USD (puste = tylko liczenie kosztu) + opcjonalny cennik JSON
+LLM_BUDGET_USD = float(os.getenv("LLM_BUDGET_USD")) if os.getenv("LLM_BUDGET_USD") else None
+LLM_PRICING_FILE = os.getenv("LLM_PRICING_FILE")
+# adres rozgrzanego workera (main_worker.py); gdy ustawiony, UI wysyła do niego zadania
+WORKER_URL = os.getenv("WORKER_URL")
 
+# langchain_openai / langchain_anthropic importowane w funkcjach — sam import
+# config (np. ścieżka tylko z filtrem regex) nie ciągnie SDK providerów
 def get_openai():
+    from langchain_openai import ChatOpenAI
     return ChatOpenAI(model=GPT_MODEL, api_key=OPENAI_API_KEY)
 def get_anthropic():
+    from langchain_anthropic import ChatAnthropic
     return ChatAnthropic(model=ANTHROPIC_MODEL, api_key=ANTHROPIC_API_KEY)
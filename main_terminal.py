@@ -1,31 +1,152 @@
+import argparse
 import asyncio
+import sys
 
-from app.regex_check import process_messages
-from utils.process_graphs import process_candidates_with_batching
+SOURCE_FILE = "treść1.txt"
+
+
+async def main(
+    source_file: str = SOURCE_FILE,
+    resume: bool = False,
+    deadline: float | None = None,
+    budget: float | None = None,
+):
+    from app.regex_check import process_messages
 
-async def main():
     print("Start...")
     try:
-        with open("treść1.txt", "r", encoding="utf-8") as f:
+        with open(source_file, "r", encoding="utf-8") as f:
             text = f.read()
             candidates, all_messages = process_messages(text)
+            if not candidates:
+                print("ℹ️ Brak kandydatów po filtrze regex — pomijam graf.")
+                return []
+
+            # Graf (langgraph, klienci LLM) importowany dopiero, gdy są kandydaci
+            from utils.process_graphs import process_candidates_with_batching
+            from utils.cost_tracker import CostTracker, load_pricing
+            from config import LLM_PRICING_FILE
+
+            tracker = CostTracker(budget_usd=budget, pricing=load_pricing(LLM_PRICING_FILE)) if budget else None
+
             results = await process_candidates_with_batching(
                 candidates,
-                max_concurrent=15,  
-                batch_size=20
+                max_concurrent=15,
+                batch_size=20,
+                resume=resume,
+                deadline=deadline,
+                cost_tracker=tracker,
             )
-            
+
             # Podsumowanie
             successful = [r for r in results if r["status"] == "success"]
             failed = [r for r in results if r["status"] == "error"]
-            
+            resumed = [r for r in successful if r.get("resumed")]
+
             print(f"\n📈 Podsumowanie:")
-            print(f"   ✅ Sukces: {len(successful)}")
+            print(f"   🔍 Kandydaci: {len(candidates)}")
+            print(f"   ✅ Sukces: {len(successful)}" + (f" (w tym z checkpointu: {len(resumed)})" if resumed else ""))
             print(f"   ❌ Błędy: {len(failed)}")
-            
+
     except FileNotFoundError:
-        print("❌ Nie znaleziono pliku 'treść1.txt'")
+        print(f"❌ Nie znaleziono pliku '{source_file}'")
         return []
 
+
+def run_on_worker(source_file: str, worker_url: str, resume: bool = False, deadline: float | None = None) -> None:
+    """Wyślij eksport do rozgrzanego workera (main_worker.py) i poczekaj na wynik."""
+    import os
+    from utils.worker_client import WorkerError, run_job
+
+    if not os.path.exists(source_file):
+        print(f"❌ Nie znaleziono pliku '{source_file}'")
+        return
+    try:
+        job = run_job(
+            worker_url,
+            {"path": os.path.abspath(source_file), "resume": resume, "deadline": deadline},
+            on_update=lambda j: print(f"🛰️ Zadanie {j['job_id']}: {j['status']}"),
+        )
+    except WorkerError as e:
+        print(f"❌ {e}")
+        return
+
+    if job["status"] == "error":
+        print(f"❌ Błąd workera: {job['error']}")
+        return
+    print(f"\n📈 Podsumowanie:")
+    print(f"   🔍 Kandydaci: {job['candidates']}")
+    print(f"   ✅ Sukces: {job['success']}" + (f" (w tym z checkpointu: {job['resumed']})" if job.get("resumed") else ""))
+    print(f"   ❌ Błędy: {job['errors']}")
+    for f in job["files"]:
+        print(f"   📁 {f}")
+
+
+def profile_startup(source_file: str, rag: bool = True) -> None:
+    """Zmierz import i inicjalizację kolejnych etapów bez wywoływania LLM."""
+    from utils.startup_profiler import StartupProfiler, heavy_modules_loaded
+
+    profiler = StartupProfiler().install()
+
+    with profiler.section("regex pre-filter: import"):
+        from app.regex_check import process_messages
+
+    with profiler.section("regex pre-filter: parse + filter") as s:
+        with open(source_file, "r", encoding="utf-8") as f:
+            candidates, _ = process_messages(f.read())
+        s["name"] += f" ({len(candidates)} kandydatów)"
+
+    loaded = heavy_modules_loaded()
+    print(f"Ciężkie pakiety po etapie regex: {', '.join(loaded) if loaded else 'brak'}")
+
+    with profiler.section("graph: import + compile"):
+        import utils.process_graphs  # noqa: F401
+
+    with profiler.section("LLM clients"):
+        from app.graph.graph import warmup
+        warmup(rag=False)
+
+    if rag:
+        with profiler.section("RAG retriever (embeddings + reranker)"):
+            from app.graph.nodes.process_rag.process_rag import get_retriever
+            get_retriever()
+
+    profiler.uninstall()
+    profiler.report()
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Analiza eksportu wiadomości z Discorda.")
+    parser.add_argument("source_file", nargs="?", default=SOURCE_FILE, help=f"Plik .txt z eksportem (domyślnie: {SOURCE_FILE})")
+    parser.add_argument("--profile-startup", action="store_true", help="Zmierz czas importów i inicjalizacji, bez wywołań LLM")
+    parser.add_argument("--worker", action="store_true",
+                        help="Przetwórz na rozgrzanym workerze (main_worker.py) zamiast w tym procesie")
+    parser.add_argument("--worker-url", default="http://127.0.0.1:8765", metavar="URL",
+                        help="Adres workera dla --worker (domyślnie: http://127.0.0.1:8765)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Pomiń kandydatów ukończonych w poprzednim (przerwanym) przebiegu")
+    parser.add_argument("--deadline", type=float, default=None, metavar="MIN",
+                        help="Po tylu minutach nie uruchamiaj nowych kandydatów (najlepsze leady idą pierwsze)")
+    parser.add_argument("--budget", type=float, default=None, metavar="USD",
+                        help="Budżet przebiegu (nadpisuje LLM_BUDGET_USD); po nim tylko kandydaci z wysokim needs_help_score")
+    parser.add_argument("--metrics-port", type=int, default=None, metavar="PORT",
+                        help="Wystaw metryki Prometheusa na http://127.0.0.1:PORT/metrics w trakcie przebiegu")
+    parser.add_argument("--no-rag", action="store_true", help="Z --profile-startup: pomiń ładowanie retrievera")
+    args = parser.parse_args()
+
+    deadline = args.deadline * 60 if args.deadline else None
+
+    if args.profile_startup:
+        profile_startup(args.source_file, rag=not args.no_rag)
+        sys.exit(0)
+
+    if args.metrics_port:
+        from utils.metrics import start_metrics_server
+        start_metrics_server(args.metrics_port)
+        print(f"📊 Metryki: http://127.0.0.1:{args.metrics_port}/metrics")
+
+    if args.worker:
+        run_on_worker(args.source_file, args.worker_url, resume=args.resume, deadline=deadline)
+        sys.exit(0)
+
+    asyncio.run(main(args.source_file, resume=args.resume, deadline=deadline, budget=args.budget))
@@ -6,8 +6,8 @@ import sys
 import queue
 import threading
 
-from not_used.message_filter import process_messages
-from utils.process_graphs import process_candidates_with_batching
+from app.regex_check import process_messages
+from config import WORKER_URL
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
@@ -35,10 +35,45 @@ class QueueWriter:
             self.buf = ""
 
 
+def run_on_worker(uploaded_file, q: queue.Queue):
+    """Zamiast liczyć w procesie UI, wysyła plik do rozgrzanego workera (WORKER_URL)."""
+    from utils.worker_client import run_job
+
+    print(f"🛰️ Wysyłam plik do workera: {WORKER_URL}")
+    with open(uploaded_file, "r", encoding="utf-8") as f:
+        text = f.read()
+    print(f"📄 Wczytano plik ({len(text):,} znaków).")
+
+    job = run_job(
+        WORKER_URL,
+        {"text": text},
+        on_update=lambda j: print(f"⏳ Zadanie {j['job_id']}: {j['status']}"),
+    )
+    if job["status"] == "error":
+        print(f"❌ Błąd workera: {job['error']}")
+        return
+
+    print("\n" + "=" * 60)
+    print("📈 Podsumowanie")
+    print("=" * 60)
+    print(f"   🔍 Kandydaci: {job['candidates']}")
+    print(f"   ✅ Sukces : {job['success']}")
+    print(f"   ❌ Błędy  : {job['errors']}")
+
+    # worker zapisuje pliki u siebie — do pobrania tylko te widoczne lokalnie
+    files = [f for f in job["files"] if os.path.exists(f)]
+    for f in files:
+        print(f"   📁 {os.path.basename(f)} — gotowy do pobrania ⬇️")
+    if files:
+        q.put(("__files__", files))
+
+
 def run_pipeline_thread(uploaded_file, q: queue.Queue):
     """Uruchamia pipeline w osobnym wątku; wyniki trafiają do kolejki q."""
 
     async def _run():
+        from utils.process_graphs import process_candidates_with_batching
+
         print("🚀 Start przetwarzania...")
 
         with open(uploaded_file, "r", encoding="utf-8") as f:
@@ -77,7 +112,10 @@ def run_pipeline_thread(uploaded_file, q: queue.Queue):
     old_stdout = sys.stdout
     sys.stdout = QueueWriter(q)
     try:
-        asyncio.run(_run())
+        if WORKER_URL:
+            run_on_worker(uploaded_file, q)
+        else:
+            asyncio.run(_run())
     except Exception as exc:
         print(f"❌ Błąd: {exc}")
     finally:
@@ -149,4 +187,10 @@ with gr.Blocks(
     )
 
 if __name__ == "__main__":
+    # Modele i klienci LLM ładują się w tle — UI startuje od razu,
+    # a pierwsze kliknięcie zwykle trafia już na rozgrzany pipeline
+    if not WORKER_URL:
+        from app.graph.graph import warmup
+        threading.Thread(target=warmup, daemon=True).start()
+
     demo.queue().launch()   # .queue() jest wymagane dla generatorów
\ No newline at end of file
@@ -0,0 +1,270 @@
+"""
+Długo żyjący worker: graf skompilowany raz, klienci LLM i retriever rozgrzani.
+
+Kolejne uruchomienia (main_terminal.py --worker, UI z WORKER_URL) wysyłają
+eksport przez lokalne HTTP zamiast za każdym razem ładować modele od zera.
+Zadania wykonywane są po kolei — pliki wynikowe lead_/no_lead_/errors_{data}.json
+są wspólne dla dnia, więc dwa równoległe zadania nadpisywałyby sobie wyniki.
+
+API (JSON):
+    POST /jobs          {"path": "export.txt"} | {"text": "..."} | {"candidates": [...]}
+                        opcjonalnie "max_concurrent", "batch_size", "resume", "deadline" (sekundy)
+                        → 202 {"job_id": ..., "status": "queued", "position": n}
+    GET  /jobs/{id}     → status zadania, liczniki, zapisane pliki
+    GET  /jobs          → ostatnie zadania
+    GET  /health        → {"status": "ok", "warm": true/false, "queued": n}
+    GET  /metrics       → metryki node'ów / RAG bieżącego (ostatniego) zadania, format tekstowy Prometheusa
+
+Usage:
+    python main_worker.py                       # 127.0.0.1:8765
+    python main_worker.py --port 9000 --no-rag  # bez rozgrzewania retrievera
+"""
+
+import argparse
+import asyncio
+import glob
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+from app.graph.graph import warmup as warmup_graph
+from app.regex_check import process_messages
+from utils.metrics import METRICS
+from utils.process_graphs import DateTimeEncoder, process_candidates_with_batching
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_FINISHED_JOBS = 100
+MAX_BODY_BYTES = 64 * 1024 * 1024
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_REASONS = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found",
+            405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class Worker:
+    """Kolejka zadań + stan rozgrzania; jeden konsument przetwarza zadania po kolei."""
+
+    def __init__(self, rag: bool = True):
+        self.rag = rag
+        self.warm = False
+        self.warmup_error = None
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.jobs: "OrderedDict[str, dict]" = OrderedDict()
+
+    # ------------------------------------------------------------------
+    # Zadania
+    # ------------------------------------------------------------------
+
+    def submit(self, payload: dict) -> dict:
+        if not any(k in payload for k in ("path", "text", "candidates")):
+            raise ValueError("Payload needs one of: 'path', 'text', 'candidates'.")
+        if "path" in payload and not os.path.exists(payload["path"]):
+            raise ValueError(f"File not found: {payload['path']}")
+
+        job_id = uuid.uuid4().hex[:12]
+        job = {
+            "job_id":       job_id,
+            "status":       "queued",
+            "submitted_at": datetime.now().isoformat(timespec="seconds"),
+            "started_at":   None,
+            "finished_at":  None,
+            "candidates":   None,
+            "success":      None,
+            "errors":       None,
+            "resumed":      None,
+            "files":        [],
+            "error":        None,
+        }
+        self.jobs[job_id] = job
+        self.queue.put_nowait((job_id, payload))
+        self._trim()
+        return {"job_id": job_id, "status": "queued", "position": self.queue.qsize()}
+
+    def _trim(self) -> None:
+        finished = [j for j, job in self.jobs.items() if job["status"] in ("done", "error")]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job_id]
+
+    async def consume(self) -> None:
+        while True:
+            job_id, payload = await self.queue.get()
+            job = self.jobs.get(job_id)
+            if job is None:
+                continue
+            job["status"] = "running"
+            job["started_at"] = datetime.now().isoformat(timespec="seconds")
+            # metryki per zadanie — inaczej /metrics i podsumowanie mieszają przebiegi
+            METRICS.reset()
+            try:
+                await self._run(job, payload)
+                job["status"] = "done"
+            except Exception as e:
+                job["status"] = "error"
+                job["error"] = f"{type(e).__name__}: {e}"
+                print(f"❌ Zadanie {job_id}: {job['error']}")
+            finally:
+                job["finished_at"] = datetime.now().isoformat(timespec="seconds")
+                self.queue.task_done()
+                self._trim()
+
+    async def _run(self, job: dict, payload: dict) -> None:
+        if "candidates" in payload:
+            candidates = payload["candidates"]
+        else:
+            text = payload.get("text")
+            if text is None:
+                with open(payload["path"], "r", encoding="utf-8") as f:
+                    text = f.read()
+            candidates, _ = process_messages(text)
+        job["candidates"] = len(candidates)
+        print(f"🚀 Zadanie {job['job_id']}: {len(candidates)} kandydatów")
+
+        if not candidates:
+            job["success"], job["errors"], job["resumed"] = 0, 0, 0
+            return
+
+        snapshot = {f: os.path.getmtime(f) for f in glob.glob(os.path.join(BASE_DIR, "*.json"))}
+        results = await process_candidates_with_batching(
+            candidates,
+            max_concurrent=int(payload.get("max_concurrent", 15)),
+            batch_size=int(payload.get("batch_size", 20)),
+            resume=bool(payload.get("resume", False)),
+            deadline=float(payload["deadline"]) if payload.get("deadline") else None,
+        )
+        job["success"] = sum(1 for r in results if r["status"] == "success")
+        job["errors"]  = sum(1 for r in results if r["status"] == "error")
+        job["resumed"] = sum(1 for r in results if r.get("resumed"))
+        job["files"] = sorted(
+            f for f in glob.glob(os.path.join(BASE_DIR, "*.json"))
+            if f not in snapshot or os.path.getmtime(f) > snapshot[f]
+        )
+
+    # ------------------------------------------------------------------
+    # Rozgrzewanie
+    # ------------------------------------------------------------------
+
+    async def warmup(self) -> None:
+        start = time.perf_counter()
+        try:
+            await asyncio.to_thread(warmup_graph, self.rag)
+            self.warm = True
+            print(f"🔥 Worker rozgrzany w {time.perf_counter() - start:.1f}s")
+        except Exception as e:
+            # klienci/retriever i tak załadują się leniwie przy pierwszym zadaniu
+            self.warmup_error = f"{type(e).__name__}: {e}"
+            print(f"⚠️ Rozgrzewanie nieudane: {self.warmup_error}")
+
+    def health(self) -> dict:
+        return {
+            "status":       "ok",
+            "warm":         self.warm,
+            "warmup_error": self.warmup_error,
+            "queued":       self.queue.qsize(),
+            "running":      sum(1 for j in self.jobs.values() if j["status"] == "running"),
+        }
+
+    # ------------------------------------------------------------------
+    # HTTP
+    # ------------------------------------------------------------------
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            status, body = await self._dispatch(reader)
+        except Exception as e:
+            status, body = 500, {"error": f"{type(e).__name__}: {e}"}
+
+        if isinstance(body, str):
+            data, content_type = body.encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            data = json.dumps(body, ensure_ascii=False, cls=DateTimeEncoder).encode("utf-8")
+            content_type = "application/json; charset=utf-8"
+        writer.write(
+            f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: close\r\n\r\n".encode("latin-1") + data
+        )
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def _dispatch(self, reader: asyncio.StreamReader) -> tuple[int, dict | str]:
+        request_line = (await reader.readline()).decode("latin-1").strip()
+        if not request_line:
+            return 400, {"error": "Empty request"}
+        method, target, _ = request_line.split(" ", 2)
+
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        path = target.split("?", 1)[0].rstrip("/") or "/"
+
+        if path == "/health" and method == "GET":
+            return 200, self.health()
+
+        if path == "/metrics" and method == "GET":
+            return 200, METRICS.prometheus()
+
+        if path == "/jobs" and method == "GET":
+            return 200, {"jobs": list(self.jobs.values())}
+
+        if path == "/jobs" and method == "POST":
+            length = int(headers.get("content-length", 0))
+            if length > MAX_BODY_BYTES:
+                return 413, {"error": f"Body larger than {MAX_BODY_BYTES} bytes"}
+            raw = await reader.readexactly(length) if length else b"{}"
+            try:
+                return 202, self.submit(json.loads(raw))
+            except (ValueError, json.JSONDecodeError) as e:
+                return 400, {"error": str(e)}
+
+        if path.startswith("/jobs/") and method == "GET":
+            job = self.jobs.get(path[len("/jobs/"):])
+            if job is None:
+                return 404, {"error": "Unknown job"}
+            return 200, job
+
+        if path in ("/health", "/jobs") or path.startswith("/jobs/"):
+            return 405, {"error": f"{method} not allowed on {path}"}
+        return 404, {"error": f"No route for {path}"}
+
+
+async def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, rag: bool = True) -> None:
+    worker = Worker(rag=rag)
+    server = await asyncio.start_server(worker.handle, host, port)
+    print(f"🛰️ Worker nasłuchuje na http://{host}:{port}")
+
+    # pliki wynikowe lądują w katalogu projektu, tak jak przy main_terminal.py
+    os.chdir(BASE_DIR)
+    asyncio.create_task(worker.warmup())
+    consumer = asyncio.create_task(worker.consume())
+
+    async with server:
+        try:
+            await server.serve_forever()
+        finally:
+            consumer.cancel()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rozgrzany worker przetwarzający eksporty Discorda.")
+    parser.add_argument("--host",   default=DEFAULT_HOST)
+    parser.add_argument("--port",   type=int, default=DEFAULT_PORT)
+    parser.add_argument("--no-rag", action="store_true", help="Nie rozgrzewaj retrievera przy starcie")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.host, args.port, rag=not args.no_rag))
+    except KeyboardInterrupt:
+        print("👋 Worker zatrzymany")
@@ -0,0 +1,348 @@
+"""
+Benchmark przepustowości pipeline'u bez płatnych wywołań API.
+
+Cały graf z app/graph/graph.py działa na deterministycznych, lokalnych
+atrapach: fake chat modele zwracają poprawne obiekty TechnicalClassification /
+IntentClassification / DomainClassification / LeadJudgeModel / ReplyModel
+z zadanym rozkładem opóźnień (lognormalny) i wstrzykiwanymi błędami,
+a retriever RAG zastępuje FakeRetriever. Wiadomości z sample_responses.json
+są powielane do zadanej liczby i przepuszczane przez
+process_candidates_with_batching (kolejka, sink JSONL) dla kolejnych
+poziomów współbieżności.
+
+Raport: wiadomości/s, p50/p95/p99 całego grafu, czasy node'ów i krzywa
+skalowania względem max_concurrent=1.
+
+Usage:
+    python -m utils.benchmark
+    python -m utils.benchmark --messages 200 --concurrency 1,4,16,64 --time-scale 0.05
+    python -m utils.benchmark --error-rate 0.05 --output bench.json
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import math
+import os
+import random
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+from app.graph.nodes.models import (
+    DomainClassification,
+    IntentClassification,
+    LeadJudgeModel,
+    ReplyModel,
+    TechnicalClassification,
+)
+
+SAMPLE_FILE = "sample_responses.json"
+
+# Moduły node'ów — każdy ma get_llm() opartą o get_openai() / get_anthropic()
+NODE_MODULES = [
+    "app.graph.nodes.techical_classifier.techical_classifier",
+    "app.graph.nodes.intent_classifier.intent_classifier",
+    "app.graph.nodes.domain_classifier.domain_classifier",
+    "app.graph.nodes.lead_judge.lead_judge",
+    "app.graph.nodes.lead_reposnse.generate_response",
+    "app.graph.nodes.process_rag.process_rag",
+    "app.graph.nodes.reputation_response.reputation_response",
+]
+RAG_MODULE = "app.graph.nodes.process_rag.process_rag"
+
+
+class FakeLLMError(RuntimeError):
+    pass
+
+
+# ---------------------------------------------------------------------------
+# Profil opóźnień
+# ---------------------------------------------------------------------------
+
+@dataclass
+class LatencyProfile:
+    """Opóźnienie lognormalne: mediana median_s, rozrzut sigma; error_rate = P(wyjątku)."""
+    median_s:   float = 0.5
+    sigma:      float = 0.4
+    error_rate: float = 0.0
+    time_scale: float = 1.0
+
+    def sample(self, rng: random.Random) -> float:
+        return rng.lognormvariate(math.log(self.median_s), self.sigma) * self.time_scale
+
+
+# ---------------------------------------------------------------------------
+# Fake chat model
+# ---------------------------------------------------------------------------
+
+_INTENTS = [i for i in IntentClassification.model_fields["intent"].annotation.__args__ if i != "out_of_scope"]
+_DOMAINS = [d for d in DomainClassification.model_fields["domain"].annotation.__args__ if d != "out_of_scope"]
+
+
+def _fake_output(schema, rng: random.Random):
+    """Poprawny obiekt schematu; wybory zależą od treści promptu (rng), więc routing jest powtarzalny."""
+    if schema is TechnicalClassification:
+        return TechnicalClassification(category="technical_problem" if rng.random() < 0.8 else "not_technical")
+    if schema is IntentClassification:
+        return IntentClassification(intent=rng.choice(_INTENTS) if rng.random() < 0.9 else "out_of_scope")
+    if schema is DomainClassification:
+        return DomainClassification(domain=rng.choice(_DOMAINS))
+    if schema is LeadJudgeModel:
+        is_lead = rng.random() < 0.4
+        return LeadJudgeModel(
+            is_lead=is_lead,
+            lead_score=round(rng.uniform(0.6, 1.0) if is_lead else rng.uniform(0.0, 0.5), 2),
+            reason="fake judge",
+            devdocs_query=None if is_lead else "supabase row level security",
+            insight="fake insight" if is_lead else None,
+        )
+    if schema is ReplyModel:
+        return ReplyModel(reply="Fake reply for benchmarking.", tone="helpful", cta_type="offer_help")
+    # surowy model bez structured output (process_rag | StrOutputParser)
+    return AIMessage(content="Fake RAG insight for benchmarking.")
+
+
+class FakeChatModel(RunnableLambda):
+    """
+    Udaje ChatOpenAI / ChatAnthropic na tyle, na ile używają go node'y:
+    sam model w łańcuchu (process_rag: prompt | model | StrOutputParser())
+    albo with_structured_output(schema).
+    """
+
+    def __init__(self, profile: LatencyProfile, seed: int = 0):
+        self.profile = profile
+        self.seed = seed
+        self._rng = random.Random(seed)   # opóźnienia i błędy
+        self.calls = 0
+        func, afunc = self._functions(None)
+        super().__init__(func, afunc=afunc, name="fake_chat_model")
+
+    def with_structured_output(self, schema, **kwargs) -> RunnableLambda:
+        func, afunc = self._functions(schema)
+        return RunnableLambda(func, afunc=afunc, name=f"fake_{schema.__name__}")
+
+    def _functions(self, schema):
+        name = schema.__name__ if schema else "raw"
+
+        def _prepare(prompt_value):
+            self.calls += 1
+            delay = self.profile.sample(self._rng)
+            fail = self._rng.random() < self.profile.error_rate
+            content_rng = random.Random(f"{self.seed}:{name}:{prompt_value.to_string()}")
+            return delay, fail, content_rng
+
+        def _invoke(prompt_value):
+            delay, fail, content_rng = _prepare(prompt_value)
+            time.sleep(delay)
+            if fail:
+                raise FakeLLMError(f"Injected error in {name}")
+            return _fake_output(schema, content_rng)
+
+        async def _ainvoke(prompt_value):
+            delay, fail, content_rng = _prepare(prompt_value)
+            await asyncio.sleep(delay)
+            if fail:
+                raise FakeLLMError(f"Injected error in {name}")
+            return _fake_output(schema, content_rng)
+
+        return _invoke, _ainvoke
+
+
+class FakeRetriever:
+    """Zamiennik Retrievera: stała dokumentacja po zadanym czasie (synchronicznie, jak prawdziwy search)."""
+
+    def __init__(self, profile: LatencyProfile, seed: int = 0):
+        self.profile = profile
+        self.rerank_policy = None
+        self._rng = random.Random(seed)
+
+    def search(self, query: str) -> str:
+        time.sleep(self.profile.sample(self._rng))
+        return f"[1] Fake docs for: {query}\nSource: https://docs.lovable.dev/fake"
+
+
+# ---------------------------------------------------------------------------
+# Podmiana klientów
+# ---------------------------------------------------------------------------
+
+@contextmanager
+def fake_backends(
+    openai_profile: LatencyProfile,
+    anthropic_profile: LatencyProfile,
+    retriever_profile: LatencyProfile,
+    seed: int = 0,
+):
+    """Podmień get_openai / get_anthropic w modułach node'ów i retriever; przywróć po wyjściu."""
+    openai_model    = FakeChatModel(openai_profile, seed)
+    anthropic_model = FakeChatModel(anthropic_profile, seed + 1)
+
+    patched = []
+    for name in NODE_MODULES:
+        module = importlib.import_module(name)
+        for attr, model in (("get_openai", openai_model), ("get_anthropic", anthropic_model)):
+            if hasattr(module, attr):
+                patched.append((module, attr, getattr(module, attr)))
+                setattr(module, attr, lambda model=model: model)
+        module.get_llm.cache_clear()
+
+    rag = importlib.import_module(RAG_MODULE)
+    previous_retriever = rag._retriever
+    rag._retriever = FakeRetriever(retriever_profile, seed + 2)
+    try:
+        yield {"openai": openai_model, "anthropic": anthropic_model}
+    finally:
+        for module, attr, original in patched:
+            setattr(module, attr, original)
+        for name in NODE_MODULES:
+            importlib.import_module(name).get_llm.cache_clear()
+        rag._retriever = previous_retriever
+
+
+# ---------------------------------------------------------------------------
+# Benchmark
+# ---------------------------------------------------------------------------
+
+def load_messages(path: str = SAMPLE_FILE, count: int = 100) -> List[Dict]:
+    """Wiadomości z sample_responses.json powielone do count (z unikalnym timestampem)."""
+    with open(path, "r", encoding="utf-8") as f:
+        samples = [r["original_message"] for r in json.load(f) if r.get("original_message")]
+    if not samples:
+        raise ValueError(f"No original_message entries in {path}")
+    messages = []
+    for i in range(count):
+        msg = dict(samples[i % len(samples)])
+        msg["timestamp"] = f"{msg.get('timestamp', '')}#{i}"
+        messages.append(msg)
+    return messages
+
+
+async def _run_level(messages: List[Dict], concurrency: int) -> Dict:
+    from utils.metrics import METRICS
+    from utils.process_graphs import process_candidates_with_batching
+
+    METRICS.reset()
+    start = time.perf_counter()
+    results = await process_candidates_with_batching(
+        messages,
+        max_concurrent=concurrency,
+        batch_size=max(len(messages), 1),
+        checkpoint_path=None,
+        prioritize=False,
+    )
+    elapsed = time.perf_counter() - start
+
+    snap = METRICS.snapshot()["series"]
+    graph = snap.get("graph", {})
+    return {
+        "concurrency":  concurrency,
+        "messages":     len(messages),
+        "errors":       sum(1 for r in results if r["status"] == "error"),
+        "seconds":      round(elapsed, 3),
+        "msgs_per_sec": round(len(messages) / elapsed, 2) if elapsed else 0.0,
+        "p50":          round(graph.get("p50", 0.0), 4),
+        "p95":          round(graph.get("p95", 0.0), 4),
+        "p99":          round(graph.get("p99", 0.0), 4),
+        "nodes": {
+            name: {k: round(v, 4) for k, v in s.items() if k in ("count", "p50", "p95", "p99", "errors")}
+            for name, s in snap.items() if name.startswith(("node.", "rag."))
+        },
+    }
+
+
+def run_benchmark(
+    concurrency_levels: List[int],
+    messages: int = 100,
+    sample_file: str = SAMPLE_FILE,
+    openai_profile: Optional[LatencyProfile] = None,
+    anthropic_profile: Optional[LatencyProfile] = None,
+    retriever_profile: Optional[LatencyProfile] = None,
+    seed: int = 0,
+) -> Dict:
+    openai_profile    = openai_profile    or LatencyProfile(median_s=0.5)
+    anthropic_profile = anthropic_profile or LatencyProfile(median_s=1.5)
+    retriever_profile = retriever_profile or LatencyProfile(median_s=0.15, sigma=0.2)
+
+    batch = load_messages(sample_file, messages)
+    levels = []
+
+    # pliki wynikowe (lead_*.json, JSONL, cost_*.json) lądują w katalogu tymczasowym
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="bench_") as tmp, \
+            fake_backends(openai_profile, anthropic_profile, retriever_profile, seed):
+        os.chdir(tmp)
+        try:
+            for level in concurrency_levels:
+                levels.append(asyncio.run(_run_level(batch, level)))
+        finally:
+            os.chdir(cwd)
+
+    base = levels[0]["msgs_per_sec"] if levels else 0.0
+    for level in levels:
+        level["speedup"] = round(level["msgs_per_sec"] / base, 2) if base else 0.0
+        level["efficiency"] = round(level["speedup"] / (level["concurrency"] / levels[0]["concurrency"]), 2)
+
+    return {
+        "profiles": {
+            "openai":    asdict(openai_profile),
+            "anthropic": asdict(anthropic_profile),
+            "retriever": asdict(retriever_profile),
+        },
+        "levels": levels,
+    }
+
+
+def print_report(report: Dict) -> None:
+    print(f"\n{'=' * 80}")
+    print("🏁 Benchmark (fake LLM + fake retriever)")
+    print(f"{'=' * 80}")
+    print(f"{'conc':>5} {'msgs':>6} {'err':>5} {'msg/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'speedup':>8} {'eff':>5}")
+    for l in report["levels"]:
+        print(
+            f"{l['concurrency']:>5} {l['messages']:>6} {l['errors']:>5} {l['msgs_per_sec']:>8.2f} "
+            f"{l['p50']:>7.3f}s {l['p95']:>7.3f}s {l['p99']:>7.3f}s {l['speedup']:>7.2f}x {l['efficiency']:>5.2f}"
+        )
+
+    if report["levels"]:
+        last = report["levels"][-1]
+        print(f"\nNode'y przy concurrency={last['concurrency']}:")
+        for name, s in sorted(last["nodes"].items(), key=lambda x: x[1].get("p50", 0), reverse=True):
+            print(f"   {name:<28} n={s.get('count', 0):<5} p50={s.get('p50', 0):.3f}s p95={s.get('p95', 0):.3f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmark grafu na fake LLM i fake retrieverze.")
+    parser.add_argument("--messages",          type=int,   default=60)
+    parser.add_argument("--concurrency",       default="1,4,16,32", help="Poziomy max_concurrent, np. 1,4,16")
+    parser.add_argument("--sample-file",       default=SAMPLE_FILE)
+    parser.add_argument("--openai-latency",    type=float, default=0.5, help="Mediana opóźnienia modelu OpenAI [s]")
+    parser.add_argument("--anthropic-latency", type=float, default=1.5, help="Mediana opóźnienia lead_judge [s]")
+    parser.add_argument("--retriever-latency", type=float, default=0.15, help="Mediana czasu retrievera [s]")
+    parser.add_argument("--sigma",             type=float, default=0.4, help="Rozrzut lognormalny opóźnień LLM")
+    parser.add_argument("--error-rate",        type=float, default=0.0, help="P(wyjątku) na wywołanie LLM")
+    parser.add_argument("--time-scale",        type=float, default=0.1, help="Mnożnik wszystkich opóźnień (krótszy benchmark)")
+    parser.add_argument("--seed",              type=int,   default=0)
+    parser.add_argument("--output",            default=None, help="Zapisz raport JSON")
+    args = parser.parse_args()
+
+    report = run_benchmark(
+        concurrency_levels=[int(c) for c in args.concurrency.split(",") if c.strip()],
+        messages=args.messages,
+        sample_file=args.sample_file,
+        openai_profile=LatencyProfile(args.openai_latency, args.sigma, args.error_rate, args.time_scale),
+        anthropic_profile=LatencyProfile(args.anthropic_latency, args.sigma, args.error_rate, args.time_scale),
+        retriever_profile=LatencyProfile(args.retriever_latency, 0.2, 0.0, args.time_scale),
+        seed=args.seed,
+    )
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n📁 Raport zapisany: {args.output}")
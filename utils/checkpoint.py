@@ -0,0 +1,104 @@
+"""
+Trwały zapis ukończonych kandydatów (SQLite) — podstawa dla --resume.
+
+Każdy kandydat identyfikowany jest odciskiem sha1(username|timestamp|message).
+Po przerwanym przebiegu kolejne uruchomienie z resume=True pomija kandydatów
+ze statusem "success" (ich zapisane wpisy trafiają prosto do wyników),
+a ponownie przetwarza tylko błędy i brakujących.
+
+Usage:
+    store = CheckpointStore("checkpoints.sqlite3")
+    done = store.finished([CheckpointStore.fingerprint(c) for c in candidates])
+    store.record(fp, "success", "lead", entry)
+    store.commit()
+"""
+
+import hashlib
+import json
+import sqlite3
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+DEFAULT_CHECKPOINT_PATH = "checkpoints.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS candidates (
+    fingerprint TEXT PRIMARY KEY,
+    status      TEXT NOT NULL,
+    grp         TEXT,
+    entry       TEXT,
+    error       TEXT,
+    updated_at  TEXT NOT NULL
+)
+"""
+
+
+class CheckpointStore:
+    """Rekord na kandydata: status, grupa wyniku (lead / no_lead / error) i wpis JSON."""
+
+    def __init__(self, path: str = DEFAULT_CHECKPOINT_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(_SCHEMA)
+        self.conn.commit()
+
+    @staticmethod
+    def fingerprint(candidate: Dict) -> str:
+        key = "|".join([
+            str(candidate.get("username", "")),
+            str(candidate.get("timestamp", "")),
+            str(candidate.get("message", "")),
+        ])
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+    def record(
+        self,
+        fingerprint: str,
+        status: str,
+        group: Optional[str] = None,
+        entry: Optional[str] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        """entry to wpis już zserializowany do JSON (tak jak w pliku JSONL)."""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO candidates (fingerprint, status, grp, entry, error, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (fingerprint, status, group, entry, error, datetime.now().isoformat(timespec="seconds")),
+        )
+
+    def finished(self, fingerprints: Iterable[str]) -> Dict[str, Dict]:
+        """Odciski zakończone sukcesem → {"group", "entry"} (entry może być None)."""
+        fingerprints = list(fingerprints)
+        found = {}
+        for i in range(0, len(fingerprints), 500):   # limit parametrów SQLite
+            chunk = fingerprints[i:i + 500]
+            rows = self.conn.execute(
+                f"SELECT fingerprint, grp, entry FROM candidates "
+                f"WHERE status = 'success' AND fingerprint IN ({','.join('?' * len(chunk))})",
+                chunk,
+            )
+            for fp, group, entry in rows:
+                found[fp] = {"group": group, "entry": json.loads(entry) if entry else None}
+        return found
+
+    def get_finished(self, fingerprint: str) -> Optional[Dict]:
+        """Jak finished(), dla pojedynczego kandydata (wejście strumieniowe)."""
+        row = self.conn.execute(
+            "SELECT grp, entry FROM candidates WHERE status = 'success' AND fingerprint = ?",
+            (fingerprint,),
+        ).fetchone()
+        if row is None:
+            return None
+        return {"group": row[0], "entry": json.loads(row[1]) if row[1] else None}
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self.conn.execute("SELECT status, COUNT(*) FROM candidates GROUP BY status").fetchall())
+
+    def commit(self) -> None:
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.commit()
+        self.conn.close()
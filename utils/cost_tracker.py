@@ -0,0 +1,215 @@
+"""
+Liczenie tokenów i kosztu wywołań LLM w jednym przebiegu + budżet.
+
+CostTracker to callback LangChain przekazywany do graph.ainvoke(config={"callbacks": [...]}).
+Node rozpoznawany jest po metadanej "langgraph_node", model po "ls_model_name"
+albo response_metadata, tokeny po usage_metadata odpowiedzi.
+
+Po przekroczeniu budżetu nowi kandydaci wpuszczani są tylko wtedy, gdy ich
+needs_help_score przekracza próg rosnący z nadwyżką wydatków:
+
+    próg = BUDGET_START_THRESHOLD + (wydane - budżet) / budżet * BUDGET_THRESHOLD_SLOPE
+
+Przy domyślnych wartościach (0.6, 4.0) przy ~10% nadwyżki próg dochodzi do 1.0
+i żaden nowy kandydat nie jest już uruchamiany.
+
+Cennik (USD za 1M tokenów) można nadpisać plikiem JSON (LLM_PRICING_FILE):
+    {"gpt-4.1-nano": {"input": 0.10, "output": 0.40}, ...}
+"""
+
+import json
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# Klucz = prefiks nazwy modelu; wygrywa najdłuższy pasujący
+DEFAULT_PRICING: Dict[str, Dict[str, float]] = {
+    "gpt-4.1-nano":      {"input": 0.10, "output": 0.40},
+    "gpt-4.1-mini":      {"input": 0.40, "output": 1.60},
+    "gpt-4.1":           {"input": 2.00, "output": 8.00},
+    "gpt-4o-mini":       {"input": 0.15, "output": 0.60},
+    "gpt-4o":            {"input": 2.50, "output": 10.00},
+    "claude-haiku-4":    {"input": 1.00, "output": 5.00},
+    "claude-sonnet-4":   {"input": 3.00, "output": 15.00},
+    "claude-3-5-haiku":  {"input": 0.80, "output": 4.00},
+    "claude-3-7-sonnet": {"input": 3.00, "output": 15.00},
+}
+
+BUDGET_START_THRESHOLD = 0.6
+BUDGET_THRESHOLD_SLOPE = 4.0
+
+
+def load_pricing(path: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+    pricing = dict(DEFAULT_PRICING)
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            pricing.update(json.load(f))
+    return pricing
+
+
+class CostTracker(BaseCallbackHandler):
+    """
+    Tokeny i koszt per node i per model dla jednego przebiegu.
+
+    Parameters
+    ----------
+    budget_usd      : twardy budżet przebiegu; None = tylko liczenie
+    pricing         : cennik {prefiks modelu: {"input", "output"}} w USD / 1M tokenów
+    start_threshold : minimalny needs_help_score wpuszczany zaraz po przekroczeniu budżetu
+    threshold_slope : o ile rośnie próg na każde 100% nadwyżki budżetu
+    """
+
+    def __init__(
+        self,
+        budget_usd:      Optional[float] = None,
+        pricing:         Optional[Dict[str, Dict[str, float]]] = None,
+        start_threshold: float = BUDGET_START_THRESHOLD,
+        threshold_slope: float = BUDGET_THRESHOLD_SLOPE,
+    ):
+        self.budget_usd      = budget_usd
+        self.pricing         = pricing or dict(DEFAULT_PRICING)
+        self.start_threshold = start_threshold
+        self.threshold_slope = threshold_slope
+
+        self._lock     = threading.Lock()
+        self._runs: Dict[UUID, Dict[str, Optional[str]]] = {}
+        self.by_node:  Dict[str, Dict[str, float]] = defaultdict(_empty_usage)
+        self.by_model: Dict[str, Dict[str, float]] = defaultdict(_empty_usage)
+        self.unpriced_models: set = set()
+        self.spent_usd = 0.0
+        self.admitted  = 0
+        self.refused   = 0
+
+    # ------------------------------------------------------------------
+    # Callbacki LangChain
+    # ------------------------------------------------------------------
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, metadata=None, **kwargs: Any) -> None:
+        self._remember(run_id, metadata)
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, metadata=None, **kwargs: Any) -> None:
+        self._remember(run_id, metadata)
+
+    def _remember(self, run_id: UUID, metadata: Optional[Dict]) -> None:
+        metadata = metadata or {}
+        with self._lock:
+            self._runs[run_id] = {
+                "node":  metadata.get("langgraph_node"),
+                "model": metadata.get("ls_model_name"),
+            }
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            run = self._runs.pop(run_id, {})
+
+        input_tokens, output_tokens, model = _usage(response)
+        model = model or run.get("model") or "unknown"
+        node  = run.get("node") or "unknown"
+        cost  = self.price(model, input_tokens, output_tokens)
+
+        with self._lock:
+            for usage in (self.by_node[node], self.by_model[model]):
+                usage["calls"]         += 1
+                usage["input_tokens"]  += input_tokens
+                usage["output_tokens"] += output_tokens
+                usage["cost_usd"]      += cost
+            self.spent_usd += cost
+
+    def on_llm_error(self, error, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            self._runs.pop(run_id, None)
+
+    # ------------------------------------------------------------------
+    # Koszt i budżet
+    # ------------------------------------------------------------------
+
+    def price(self, model: str, input_tokens: int, output_tokens: int) -> float:
+        matches = [p for p in self.pricing if model.startswith(p)]
+        if not matches:
+            self.unpriced_models.add(model)
+            return 0.0
+        rate = self.pricing[max(matches, key=len)]
+        return (input_tokens * rate["input"] + output_tokens * rate["output"]) / 1_000_000
+
+    def admission_threshold(self) -> float:
+        """Minimalny needs_help_score dla nowych kandydatów (0.0 = bez ograniczeń)."""
+        if not self.budget_usd or self.spent_usd < self.budget_usd:
+            return 0.0
+        overrun = (self.spent_usd - self.budget_usd) / self.budget_usd
+        return min(1.0, self.start_threshold + overrun * self.threshold_slope)
+
+    def admit(self, candidate: Dict) -> bool:
+        """Hook admit dla process_candidates_with_batching."""
+        threshold = self.admission_threshold()
+        ok = threshold == 0.0 or float(candidate.get("needs_help_score") or 0.0) > threshold
+        with self._lock:
+            if ok:
+                self.admitted += 1
+            else:
+                self.refused += 1
+        return ok
+
+    # ------------------------------------------------------------------
+    # Raport
+    # ------------------------------------------------------------------
+
+    def report(self) -> Dict:
+        def _rounded(table):
+            return {
+                k: {**v, "cost_usd": round(v["cost_usd"], 6)}
+                for k, v in sorted(table.items(), key=lambda x: x[1]["cost_usd"], reverse=True)
+            }
+
+        return {
+            "generated_at":     datetime.now().isoformat(timespec="seconds"),
+            "budget_usd":       self.budget_usd,
+            "spent_usd":        round(self.spent_usd, 6),
+            "admitted":         self.admitted,
+            "refused":          self.refused,
+            "final_threshold":  round(self.admission_threshold(), 3),
+            "input_tokens":     sum(v["input_tokens"] for v in self.by_model.values()),
+            "output_tokens":    sum(v["output_tokens"] for v in self.by_model.values()),
+            "by_node":          _rounded(self.by_node),
+            "by_model":         _rounded(self.by_model),
+            "unpriced_models":  sorted(self.unpriced_models),
+        }
+
+    def save_report(self, path: Optional[str] = None) -> str:
+        path = path or f"cost_{datetime.now():%Y-%m-%d}.json"
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2)
+        return path
+
+
+def _empty_usage() -> Dict[str, float]:
+    return {"calls": 0, "input_tokens": 0, "output_tokens": 0, "cost_usd": 0.0}
+
+
+def _usage(response) -> tuple[int, int, Optional[str]]:
+    """(input_tokens, output_tokens, model) z LLMResult — usage_metadata albo llm_output."""
+    input_tokens = output_tokens = 0
+    model = None
+
+    for generations in response.generations:
+        for gen in generations:
+            message = getattr(gen, "message", None)
+            if message is None:
+                continue
+            usage = getattr(message, "usage_metadata", None) or {}
+            input_tokens  += usage.get("input_tokens", 0)
+            output_tokens += usage.get("output_tokens", 0)
+            meta = getattr(message, "response_metadata", None) or {}
+            model = model or meta.get("model_name") or meta.get("model")
+
+    llm_output = response.llm_output or {}
+    if not (input_tokens or output_tokens):
+        usage = llm_output.get("token_usage") or llm_output.get("usage") or {}
+        input_tokens  = usage.get("prompt_tokens",     usage.get("input_tokens", 0)) or 0
+        output_tokens = usage.get("completion_tokens", usage.get("output_tokens", 0)) or 0
+    model = model or llm_output.get("model_name") or llm_output.get("model")
+
+    return int(input_tokens), int(output_tokens), model
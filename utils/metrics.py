@@ -0,0 +1,233 @@
+"""
+Lekka instrumentacja: opóźnienia per node grafu i per etap retrievera.
+
+Dla każdej serii trzymane są: liczba wywołań, suma czasu, błędy, bieżąca liczba
+wywołań w toku i okno ostatnich MAX_SAMPLES pomiarów (z niego p50/p95/p99).
+Eksport w formacie tekstowym Prometheusa (summary + gauge + counter)
+i tabela podsumowania na koniec przebiegu.
+
+Usage:
+    from utils.metrics import METRICS, instrument_node, timed
+
+    flow.add_node("lead_judge", instrument_node("lead_judge", lead_judge))
+
+    with timed("rag.rerank"):
+        scores = reranker.predict(pairs)
+
+    start_metrics_server(9464)      # GET http://127.0.0.1:9464/metrics
+    print(METRICS.summary_table())
+"""
+
+import functools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+MAX_SAMPLES = 10_000
+QUANTILES = (0.5, 0.95, 0.99)
+METRIC_PREFIX = "discord_rg"
+
+
+class _Series:
+    __slots__ = ("count", "total", "errors", "in_flight", "samples")
+
+    def __init__(self):
+        self.count     = 0
+        self.total     = 0.0
+        self.errors    = 0
+        self.in_flight = 0
+        self.samples: deque = deque(maxlen=MAX_SAMPLES)
+
+
+def _quantile(sorted_samples: List[float], q: float) -> float:
+    if not sorted_samples:
+        return 0.0
+    idx = min(len(sorted_samples) - 1, max(0, int(round(q * (len(sorted_samples) - 1)))))
+    return sorted_samples[idx]
+
+
+class MetricsRegistry:
+    """Serie opóźnień (sekundy) + proste liczniki; bezpieczne dla wątków."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series: Dict[str, _Series] = {}
+        self._counters: Dict[str, int] = {}
+        self.started = time.time()
+
+    def _get(self, name: str) -> _Series:
+        series = self._series.get(name)
+        if series is None:
+            series = self._series.setdefault(name, _Series())
+        return series
+
+    # ------------------------------------------------------------------
+    # Zapis
+    # ------------------------------------------------------------------
+
+    def begin(self, name: str) -> None:
+        with self._lock:
+            self._get(name).in_flight += 1
+
+    def end(self, name: str, seconds: float, error: bool = False) -> None:
+        with self._lock:
+            series = self._get(name)
+            series.in_flight -= 1
+            series.count += 1
+            series.total += seconds
+            series.samples.append(seconds)
+            if error:
+                series.errors += 1
+
+    def observe(self, name: str, seconds: float) -> None:
+        """Pomiar bez śledzenia in-flight (np. czas oczekiwania w kolejce)."""
+        with self._lock:
+            series = self._get(name)
+            series.count += 1
+            series.total += seconds
+            series.samples.append(seconds)
+
+    def incr(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+            self._counters.clear()
+            self.started = time.time()
+
+    # ------------------------------------------------------------------
+    # Odczyt
+    # ------------------------------------------------------------------
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            series = {
+                name: (s.count, s.total, s.errors, s.in_flight, sorted(s.samples))
+                for name, s in self._series.items()
+            }
+            counters = dict(self._counters)
+
+        result = {}
+        for name, (count, total, errors, in_flight, samples) in series.items():
+            result[name] = {
+                "count":      count,
+                "errors":     errors,
+                "error_rate": errors / count if count else 0.0,
+                "in_flight":  in_flight,
+                "mean":       total / count if count else 0.0,
+                "total":      total,
+                **{f"p{int(q * 100)}": _quantile(samples, q) for q in QUANTILES},
+            }
+        return {"series": result, "counters": counters}
+
+    def prometheus(self) -> str:
+        snap = self.snapshot()
+        lines = [
+            f"# HELP {METRIC_PREFIX}_latency_seconds Latency of graph nodes and retriever stages",
+            f"# TYPE {METRIC_PREFIX}_latency_seconds summary",
+        ]
+        for name, s in sorted(snap["series"].items()):
+            label = f'name="{name}"'
+            for q in QUANTILES:
+                lines.append(f'{METRIC_PREFIX}_latency_seconds{{{label},quantile="{q}"}} {s[f"p{int(q * 100)}"]:.6f}')
+            lines.append(f"{METRIC_PREFIX}_latency_seconds_sum{{{label}}} {s['total']:.6f}")
+            lines.append(f"{METRIC_PREFIX}_latency_seconds_count{{{label}}} {s['count']}")
+
+        lines += [f"# TYPE {METRIC_PREFIX}_in_flight gauge"]
+        lines += [f'{METRIC_PREFIX}_in_flight{{name="{n}"}} {s["in_flight"]}' for n, s in sorted(snap["series"].items())]
+        lines += [f"# TYPE {METRIC_PREFIX}_errors_total counter"]
+        lines += [f'{METRIC_PREFIX}_errors_total{{name="{n}"}} {s["errors"]}' for n, s in sorted(snap["series"].items())]
+        lines += [f"# TYPE {METRIC_PREFIX}_events_total counter"]
+        lines += [f'{METRIC_PREFIX}_events_total{{name="{n}"}} {v}' for n, v in sorted(snap["counters"].items())]
+        return "\n".join(lines) + "\n"
+
+    def summary_table(self) -> str:
+        snap = self.snapshot()
+        if not snap["series"]:
+            return "ℹ️ Brak pomiarów."
+
+        elapsed = max(time.time() - self.started, 1e-9)
+        header = f"{'seria':<28} {'n':>6} {'err%':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'suma':>9} {'/s':>7}"
+        rows = [header, "-" * len(header)]
+        for name, s in sorted(snap["series"].items(), key=lambda x: x[1]["total"], reverse=True):
+            rows.append(
+                f"{name:<28} {s['count']:>6} {s['error_rate'] * 100:>5.1f}% "
+                f"{s['p50']:>7.3f}s {s['p95']:>7.3f}s {s['p99']:>7.3f}s {s['total']:>8.1f}s "
+                f"{s['count'] / elapsed:>7.2f}"
+            )
+        if snap["counters"]:
+            rows.append("")
+            rows += [f"{name:<28} {value:>6}" for name, value in sorted(snap["counters"].items())]
+        return "\n".join(rows)
+
+
+METRICS = MetricsRegistry()
+
+
+# ---------------------------------------------------------------------------
+# Instrumentacja
+# ---------------------------------------------------------------------------
+
+@contextmanager
+def timed(name: str, registry: Optional[MetricsRegistry] = None):
+    registry = registry or METRICS
+    registry.begin(name)
+    start = time.perf_counter()
+    error = False
+    try:
+        yield
+    except BaseException:
+        error = True
+        raise
+    finally:
+        registry.end(name, time.perf_counter() - start, error=error)
+
+
+def instrument_node(name: str, fn, registry: Optional[MetricsRegistry] = None):
+    """Owiń async node grafu; functools.wraps zachowuje sygnaturę, z której LangGraph czyta State."""
+    registry = registry or METRICS
+    series = f"node.{name}"
+
+    @functools.wraps(fn)
+    async def wrapper(state, *args, **kwargs):
+        with timed(series, registry):
+            return await fn(state, *args, **kwargs)
+
+    return wrapper
+
+
+# ---------------------------------------------------------------------------
+# Endpoint Prometheusa
+# ---------------------------------------------------------------------------
+
+def start_metrics_server(
+    port: int,
+    host: str = "127.0.0.1",
+    registry: Optional[MetricsRegistry] = None,
+) -> ThreadingHTTPServer:
+    """Uruchom GET /metrics w wątku w tle; zwraca serwer (server.shutdown() zatrzymuje)."""
+    registry = registry or METRICS
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -1,10 +1,18 @@
 import asyncio
 import json
-from typing import List, Dict, Any
+import os
+import time
+from pathlib import Path
+from typing import List, Dict, Any, Callable, Iterable, Optional, Tuple
 from datetime import datetime
 
 from app.graph.state import State
 from app.graph.graph import graph
+from app.graph.nodes.process_rag.process_rag import rerank_stats
+from config import LLM_BUDGET_USD, LLM_PRICING_FILE
+from utils.checkpoint import DEFAULT_CHECKPOINT_PATH, CheckpointStore
+from utils.cost_tracker import CostTracker, load_pricing
+from utils.metrics import METRICS, timed
 
 class DateTimeEncoder(json.JSONEncoder):
     """Custom encoder który radzi sobie z datetime i innymi typami"""
@@ -16,61 +24,307 @@ class DateTimeEncoder(json.JSONEncoder):
         return super().default(obj)
 
 
+# Klucze grup w JSONL → klucze używane przy zapisie plików finalnych
+_GROUPS = {"lead": True, "no_lead": False, "error": "error"}
+
+
+def _result_to_entry(r: Dict) -> Optional[Tuple[str, Dict]]:
+    """
+    Zamień wynik grafu na (grupa, wpis) do zapisu; None gdy wyniku się nie zapisuje
+    (np. wiadomość odrzucona przed lead_judge).
+    """
+    if r.get("status") == "error":
+        return "error", {
+            "message": r.get("candidate"),
+            "error": r.get("error"),
+        }
+
+    if r.get("status") != "success":
+        return None
+
+    result = r.get("result", {})
+    lead_judge = result.get("lead_judge")
+    if lead_judge is None:
+        return None
+
+    entry = {
+        "original_message": result.get("message"),
+        "message": result["message"].get("message"),
+        "user": result["message"].get("user"),
+        "is_lead": result["lead_judge"].is_lead,
+        "rag_insight": result.get('rag_insight', None),
+        "reply": result["reply"].reply if result.get("reply") else None,
+    }
+    return ("lead" if lead_judge.is_lead else "no_lead"), entry
+
+
+class JsonlResultSink:
+    """
+    Append-only zapis wyników: każdy wynik trafia do pliku JSONL raz, w chwili
+    zakończenia. fsync co fsync_every wyników — koszt checkpointu O(1) na wynik
+    zamiast przepisywania całej listy co batch.
+
+    Na końcu compact() składa JSONL w lead_/no_lead_/errors_{data}.json
+    i usuwa plik częściowy. Po awarii plik .partial.jsonl zostaje na dysku
+    i można go złożyć ręcznie: compact_results(path).
+    """
+
+    def __init__(self, path: Optional[str] = None, fsync_every: int = 20):
+        started = datetime.now()
+        self.path = Path(path or f"results_{started:%Y-%m-%d_%H%M%S}.partial.jsonl")
+        self.fsync_every = max(1, fsync_every)
+        self.written = 0
+        self._pending = 0
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def write(self, result: Dict) -> Optional[Tuple[str, str]]:
+        """Zapisz wynik grafu; zwraca (grupa, wpis jako JSON) albo None, gdy nie ma czego zapisać."""
+        grouped = _result_to_entry(result)
+        if grouped is None:
+            return None
+        group, entry = grouped
+        entry_json = json.dumps(entry, ensure_ascii=False, cls=DateTimeEncoder)
+        self.write_entry(group, entry_json)
+        return group, entry_json
+
+    def write_entry(self, group: str, entry_json: str) -> None:
+        """Zapisz gotowy wpis (np. odtworzony z checkpointu przy --resume)."""
+        self._file.write(f'{{"group": {json.dumps(group)}, "entry": {entry_json}}}\n')
+        self.written += 1
+        self._pending += 1
+        if self._pending >= self.fsync_every:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._file.closed:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def compact(self) -> Dict[Any, str]:
+        self.close()
+        return compact_results(self.path)
+
+    def __enter__(self) -> "JsonlResultSink":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def compact_results(jsonl_path, remove: bool = True) -> Dict[Any, str]:
+    """Złóż plik JSONL z JsonlResultSink w finalne pliki JSON (lead / no_lead / errors)."""
+    grouped: dict = {True: [], False: [], "error": []}
+    with open(jsonl_path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # ucięta ostatnia linia po awarii
+            grouped[_GROUPS[record["group"]]].append(record["entry"])
+
+    written = _write_grouped(grouped, _final_files())
+    if remove:
+        os.remove(jsonl_path)
+    return written
+
+
+def _priority(candidate: Dict) -> float:
+    """Klucz kolejki: wyższy needs_help_score = wcześniej."""
+    return -float(candidate.get("needs_help_score") or 0.0)
+
+
 async def process_candidates_with_batching(
-    candidates: List[Dict],
+    candidates: Iterable[Dict],
     max_concurrent: int = 15,
-    batch_size: int = 20
+    batch_size: int = 20,
+    checkpoint_path: Optional[str] = DEFAULT_CHECKPOINT_PATH,
+    resume: bool = False,
+    keep_results: bool = True,
+    queue_size: Optional[int] = None,
+    prioritize: bool = True,
+    deadline: Optional[float] = None,
+    admit: Optional[Callable[[Dict], bool]] = None,
+    cost_tracker: Optional[CostTracker] = None,
 ) -> List[Dict[str, Any]]:
     """
-    Przetwarza kandydatów z kontrolą współbieżności i batchingiem.
+    Przetwarza kandydatów pulą max_concurrent workerów czytających z ograniczonej kolejki.
+
+    Kandydaci pobierani są z iterable leniwie — producent czeka, gdy kolejka jest
+    pełna, więc w pamięci jest naraz najwyżej queue_size + max_concurrent
+    kandydatów, a pierwsze wyniki zapisują się od razu.
+
+    Przy prioritize kolejka oddaje najpierw kandydatów z najwyższym needs_help_score
+    (lista jest dodatkowo sortowana w całości), więc przy przerwaniu przebiegu
+    (deadline, admit) najlepsze leady są już przetworzone. Pominięci nie trafiają
+    do checkpointu — --resume przetworzy ich w kolejnym przebiegu.
     
     Args:
-        candidates: Lista kandydatów do przetworzenia
-        max_concurrent: Maksymalna liczba równoległych grafów
-        batch_size: Rozmiar batcha dla zapisu wyników
+        candidates: Lista albo generator kandydatów do przetworzenia
+        max_concurrent: Maksymalna liczba równoległych grafów (liczba workerów)
+        batch_size: Co ile wyników fsync pliku JSONL i log postępu
+        checkpoint_path: Baza SQLite z ukończonymi kandydatami (None = bez checkpointu)
+        resume: Pomiń kandydatów ukończonych sukcesem we wcześniejszym przebiegu;
+            ich zapisane wyniki trafiają do plików i do zwracanej listy z "resumed": True
+        keep_results: Zwróć listę wyników; False = pamięć stała, wyniki tylko na dysku
+        queue_size: Pojemność kolejki (domyślnie 2 * max_concurrent)
+        prioritize: Kolejność malejąco po needs_help_score zamiast kolejności wejścia
+        deadline: Po tylu sekundach od startu nie uruchamiaj nowych kandydatów
+        admit: Wywoływane tuż przed uruchomieniem grafu; False = kandydat pominięty
+        cost_tracker: Liczenie tokenów / kosztu i budżet (domyślnie z LLM_BUDGET_USD);
+            po przekroczeniu budżetu wpuszcza tylko kandydatów powyżej rosnącego progu
     """
-    semaphore = asyncio.Semaphore(max_concurrent)
     results = []
-    
-    async def process_with_semaphore(candidate: Dict, index: int) -> Dict[str, Any]:
-        """Wrapper który kontroluje współbieżność"""
-        async with semaphore:
-            try:
-                result: State = await graph.ainvoke({"message": candidate})
-                return {
-                    "index": index,
-                    "candidate": candidate,
-                    "result": result,
-                    "status": "success",
-                    "timestamp": datetime.now().isoformat()
-                }
-            except Exception as e:
-                print(f"❌ Błąd dla kandydata {index + 1}: {str(e)}")
-                return {
-                    "index": index,
-                    "candidate": candidate,
-                    "error": str(e),
-                    "status": "error",
-                    "timestamp": datetime.now().isoformat()
-                }
-    
-    tasks = [
-        process_with_semaphore(candidate, i) 
-        for i, candidate in enumerate(candidates)
-    ]
-    
-    for i, coro in enumerate(asyncio.as_completed(tasks)):
-        result = await coro
-        results.append(result)
-        
-        # Zapis częściowy co batch_size elementów (do pliku partial, nie finalnego)
-        if (i + 1) % batch_size == 0:
-            save_results_to_json(results, partial=True, partial_index=i + 1)
-            print(f"Zakończono analizę {i + 1} postów")
-    
-    # Zapis finalny po przetworzeniu wszystkich kandydatów
-    save_results_to_json(results, partial=False)
-    print(f"✅ Zapisano finalny wynik dla wszystkich {len(results)} kandydatów")
+    counts = {"processed": 0, "resumed": 0, "deferred": 0, "cut_off": False}
+    deadline_at = time.monotonic() + deadline if deadline is not None else None
+
+    tracker = cost_tracker or CostTracker(budget_usd=LLM_BUDGET_USD, pricing=load_pricing(LLM_PRICING_FILE))
+    graph_config = {"callbacks": [tracker]}
+    if tracker.budget_usd:
+        user_admit = admit
+        admit = lambda c: (user_admit is None or user_admit(c)) and tracker.admit(c)
+
+    if prioritize and isinstance(candidates, list):
+        candidates = sorted(candidates, key=_priority)
+
+    store = CheckpointStore(checkpoint_path) if checkpoint_path else None
+    sink = JsonlResultSink(fsync_every=batch_size)
+    # (priorytet, kolejność wejścia, ...) — przy prioritize=False priorytet jest stały,
+    # więc kolejka zachowuje się jak FIFO; sentinel (inf) zawsze na końcu
+    queue: asyncio.PriorityQueue = asyncio.PriorityQueue(maxsize=queue_size or 2 * max_concurrent)
+
+    def past_deadline() -> bool:
+        return deadline_at is not None and time.monotonic() >= deadline_at
+
+    async def run_graph(candidate: Dict, index: int) -> Dict[str, Any]:
+        try:
+            with timed("graph"):
+                result: State = await graph.ainvoke({"message": candidate}, config=graph_config)
+            return {
+                "index": index,
+                "candidate": candidate,
+                "result": result,
+                "status": "success",
+                "timestamp": datetime.now().isoformat()
+            }
+        except Exception as e:
+            print(f"❌ Błąd dla kandydata {index + 1}: {str(e)}")
+            return {
+                "index": index,
+                "candidate": candidate,
+                "error": str(e),
+                "status": "error",
+                "timestamp": datetime.now().isoformat()
+            }
+
+    def handle_result(result: Dict[str, Any], fingerprint: str) -> None:
+        if keep_results:
+            results.append(result)
+        written = sink.write(result)
+
+        if store:
+            group, entry_json = written if written else (None, None)
+            store.record(fingerprint, result["status"], group, entry_json, result.get("error"))
+
+        counts["processed"] += 1
+        if counts["processed"] % batch_size == 0:
+            if store:
+                store.commit()
+            print(f"Zakończono analizę {counts['processed']} postów")
+
+    async def producer() -> None:
+        try:
+            for index, candidate in enumerate(candidates):
+                if past_deadline():
+                    counts["cut_off"] = True
+                    break
+                fingerprint = CheckpointStore.fingerprint(candidate)
+                if store and resume:
+                    record = store.get_finished(fingerprint)
+                    if record is not None:
+                        # wynik z poprzedniego przebiegu idzie prosto do plików finalnych
+                        if record["entry"] is not None:
+                            sink.write_entry(record["group"], json.dumps(record["entry"], ensure_ascii=False))
+                        if keep_results:
+                            # w wynikach też, żeby podsumowanie obejmowało cały eksport
+                            results.append({
+                                "index": index,
+                                "candidate": candidate,
+                                "entry": record["entry"],
+                                "status": "success",
+                                "resumed": True,
+                                "timestamp": datetime.now().isoformat()
+                            })
+                        counts["resumed"] += 1
+                        continue
+                priority = _priority(candidate) if prioritize else 0.0
+                await queue.put((priority, index, candidate, fingerprint, time.monotonic()))
+        finally:
+            for _ in range(max_concurrent):
+                await queue.put((float("inf"), -1, None, None, 0.0))
+
+    async def worker() -> None:
+        while True:
+            _, index, candidate, fingerprint, enqueued_at = await queue.get()
+            if candidate is None:
+                return
+            if past_deadline() or (admit is not None and not admit(candidate)):
+                counts["deferred"] += 1
+                continue
+            METRICS.observe("queue_wait", time.monotonic() - enqueued_at)
+            handle_result(await run_graph(candidate, index), fingerprint)
+
+    tasks = [asyncio.create_task(producer())]
+    tasks += [asyncio.create_task(worker()) for _ in range(max_concurrent)]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+    finally:
+        sink.close()
+        if store:
+            store.close()
+
+    if counts["resumed"]:
+        print(f"⏭️ Pominięto {counts['resumed']} kandydatów ukończonych wcześniej")
+    if counts["deferred"] or counts["cut_off"]:
+        print(
+            f"⏸️ Przebieg przerwany (deadline / limit): odłożono {counts['deferred']} kandydatów "
+            f"z kolejki; nieprzetworzonych można dokończyć z --resume"
+        )
+
+    # Zapis finalny: złożenie JSONL w pliki lead / no_lead / errors
+    sink.compact()
+    print(f"✅ Zapisano finalny wynik dla wszystkich {counts['processed'] + counts['resumed']} kandydatów")
+
+    cost = tracker.report()
+    print(
+        f"💰 Koszt LLM: ${cost['spent_usd']:.4f} "
+        f"({cost['input_tokens']:,} tokenów wejścia / {cost['output_tokens']:,} wyjścia)"
+        + (f", budżet ${tracker.budget_usd:.2f}, odrzuconych przez budżet: {cost['refused']}" if tracker.budget_usd else "")
+    )
+    print(f"📁 Raport kosztów: {tracker.save_report()}")
+
+    print("\n⏱️ Czasy node'ów i etapów RAG:")
+    print(METRICS.summary_table())
+
+    stats = rerank_stats()
+    if stats:
+        print(
+            f"🔁 Rerank: pominięty {stats['skipped']}/{stats['calls']} razy, "
+            f"częściowy {stats['partial']}, uniknięte pary CrossEncodera: {stats['pairs_avoided']}"
+        )
 
     return results
 
@@ -91,7 +345,7 @@ def save_results_to_json(
     i nigdy nie nadpisują plików finalnych.
     """
     today = datetime.now().strftime("%Y-%m-%d")
-    
+
     if partial:
         files = {
             True:    f"lead_{today}_partial_{partial_index}.json",
@@ -99,44 +353,36 @@ def save_results_to_json(
             "error": f"errors_{today}_partial_{partial_index}.json",
         }
     else:
-        files = {
-            True:    f"lead_{today}.json",
-            False:   f"no_lead_{today}.json",
-            "error": f"errors_{today}.json",
-        }
-    
+        files = _final_files()
+
     grouped: dict = {True: [], False: [], "error": []}
-    
     for r in results:
-        if r.get("status") == "error":
-            grouped["error"].append({
-                "message": r.get("candidate"),
-                "error": r.get("error"),
-            })
+        converted = _result_to_entry(r)
+        if converted is None:
             continue
-        
-        if r.get("status") != "success":
-            continue
-        
-        result = r.get("result", {})
-        lead_judge = result.get("lead_judge")
-        if lead_judge is None:
-            continue
-        
-        entry = {
-            "original_message": result.get("message"),
-            "message": result["message"].get("message"),
-            "user": result["message"].get("user"),
-            "is_lead": result["lead_judge"].is_lead,
-            "rag_insight": result.get('rag_insight', None),
-            "reply": result["reply"].reply,
-        }
-        grouped[lead_judge.is_lead].append(entry)
+        group, entry = converted
+        grouped[_GROUPS[group]].append(entry)
+
+    _write_grouped(grouped, files)
+
+
+def _final_files() -> Dict[Any, str]:
+    today = datetime.now().strftime("%Y-%m-%d")
+    return {
+        True:    f"lead_{today}.json",
+        False:   f"no_lead_{today}.json",
+        "error": f"errors_{today}.json",
+    }
+
 
+def _write_grouped(grouped: Dict[Any, List[Dict]], files: Dict[Any, str]) -> Dict[Any, str]:
+    written = {}
     for key, entries in grouped.items():
         if not entries:
             print(f"ℹ️ Brak wyników dla '{key}'. Pomijam zapis.")
             continue
         with open(files[key], "w", encoding="utf-8") as f:
             json.dump(entries, f, ensure_ascii=False, indent=2, cls=DateTimeEncoder)
-        print(f"📁 Zapisano {len(entries)} wyników do {files[key]}")
\ No newline at end of file
+        print(f"📁 Zapisano {len(entries)} wyników do {files[key]}")
+        written[key] = files[key]
+    return written
@@ -0,0 +1,158 @@
+"""
+Profiler startu: czas importu każdego modułu + czas inicjalizacji modeli / klientów.
+
+Działa podobnie do `python -X importtime`, ale z poziomu programu — można go
+włączyć flagą (main_terminal.py --profile-startup) i połączyć z pomiarem
+sekcji, które nie są importami (kompilacja grafu, klienci LLM, retriever).
+
+Usage:
+    from utils.startup_profiler import StartupProfiler
+
+    profiler = StartupProfiler().install()
+    with profiler.section("regex pre-filter"):
+        from app.regex_check import process_messages
+    profiler.uninstall()
+    profiler.report()
+"""
+
+import sys
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+
+class StartupProfiler:
+    """
+    Finder w sys.meta_path, który mierzy exec_module każdego importowanego modułu.
+
+    Dla każdego modułu zapisywany jest czas łączny (z importami zagnieżdżonymi)
+    i własny (bez nich) — suma czasów własnych daje realny koszt pakietu.
+    """
+
+    def __init__(self):
+        self.imports: Dict[str, Dict[str, float]] = {}
+        self.sections: List[Dict] = []
+        self._stack: List[list] = []      # [nazwa, start, czas dzieci]
+        self._finding = set()
+        self._started = None
+
+    # ------------------------------------------------------------------
+    # Instalacja
+    # ------------------------------------------------------------------
+
+    def install(self) -> "StartupProfiler":
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+        self._started = time.perf_counter()
+        return self
+
+    def uninstall(self) -> None:
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    # ------------------------------------------------------------------
+    # Protokół MetaPathFinder
+    # ------------------------------------------------------------------
+
+    def find_spec(self, fullname, path=None, target=None):
+        if fullname in self._finding:
+            return None
+        self._finding.add(fullname)
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._finding.discard(fullname)
+
+        loader = spec.loader
+        # BuiltinImporter / FrozenImporter to klasy współdzielone przez wszystkie
+        # moduły — nie podmieniamy ich metod (i tak ładują się w mikrosekundach)
+        if loader is not None and not isinstance(loader, type) and hasattr(loader, "exec_module"):
+            loader.exec_module = self._timed(fullname, loader.exec_module)
+        return spec
+
+    def _timed(self, fullname: str, exec_module):
+        def wrapper(module):
+            frame = [fullname, time.perf_counter(), 0.0]
+            self._stack.append(frame)
+            try:
+                exec_module(module)
+            finally:
+                self._stack.pop()
+                total = time.perf_counter() - frame[1]
+                self.imports[fullname] = {"total": total, "self": total - frame[2]}
+                if self._stack:
+                    self._stack[-1][2] += total
+        return wrapper
+
+    # ------------------------------------------------------------------
+    # Sekcje inicjalizacji
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def section(self, name: str):
+        """Zmierz blok kodu (import, tworzenie klienta, ładowanie modelu)."""
+        entry = {"name": name, "seconds": 0.0, "error": None}
+        start = time.perf_counter()
+        try:
+            yield entry
+        except Exception as e:
+            entry["error"] = f"{type(e).__name__}: {e}"
+        finally:
+            entry["seconds"] = time.perf_counter() - start
+            self.sections.append(entry)
+
+    # ------------------------------------------------------------------
+    # Raport
+    # ------------------------------------------------------------------
+
+    def by_package(self) -> Dict[str, float]:
+        """Suma czasów własnych per pakiet najwyższego poziomu (torch, langchain_core, ...)."""
+        totals: Dict[str, float] = defaultdict(float)
+        for name, t in self.imports.items():
+            totals[name.split(".")[0]] += t["self"]
+        return dict(sorted(totals.items(), key=lambda x: x[1], reverse=True))
+
+    def report(self, top: int = 25, file=None) -> None:
+        file = file or sys.stdout
+        elapsed = time.perf_counter() - self._started if self._started else 0.0
+
+        print(f"\n⏱️  Profil startu (łącznie {elapsed:.2f}s, zaimportowano {len(self.imports)} modułów)", file=file)
+
+        if self.sections:
+            print("\nSekcje:", file=file)
+            for s in self.sections:
+                status = f"  ❌ {s['error']}" if s["error"] else ""
+                print(f"   {s['seconds']:8.3f}s  {s['name']}{status}", file=file)
+
+        print(f"\nPakiety (czas własny, top {top}):", file=file)
+        for name, seconds in list(self.by_package().items())[:top]:
+            print(f"   {seconds:8.3f}s  {name}", file=file)
+
+        print(f"\nModuły (czas łączny, top {top}):", file=file)
+        slowest = sorted(self.imports.items(), key=lambda x: x[1]["total"], reverse=True)[:top]
+        for name, t in slowest:
+            print(f"   {t['total']:8.3f}s  (własny {t['self']:.3f}s)  {name}", file=file)
+
+    def to_dict(self) -> Dict:
+        return {
+            "sections": self.sections,
+            "packages": self.by_package(),
+            "imports":  self.imports,
+        }
+
+
+def heavy_modules_loaded(prefixes: Optional[List[str]] = None) -> List[str]:
+    """Które z ciężkich pakietów są już w sys.modules (kontrola ścieżki regex-only)."""
+    prefixes = prefixes or [
+        "torch", "sentence_transformers", "transformers", "langchain_openai",
+        "langchain_anthropic", "langchain_pinecone", "langgraph",
+    ]
+    return [p for p in prefixes if p in sys.modules]
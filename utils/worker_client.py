@@ -0,0 +1,72 @@
+"""
+Klient HTTP rozgrzanego workera (main_worker.py) — tylko biblioteka standardowa,
+żeby klient nie ładował grafu ani modeli.
+
+Usage:
+    from utils.worker_client import run_job
+
+    job = run_job("http://127.0.0.1:8765", {"path": "export.txt"})
+    print(job["success"], job["files"])
+"""
+
+import json
+import time
+import urllib.error
+import urllib.request
+from typing import Callable, Dict, Optional
+
+DEFAULT_WORKER_URL = "http://127.0.0.1:8765"
+
+
+class WorkerError(RuntimeError):
+    pass
+
+
+def _request(url: str, method: str = "GET", payload: Optional[Dict] = None, timeout: float = 30) -> Dict:
+    data = json.dumps(payload, ensure_ascii=False).encode("utf-8") if payload is not None else None
+    req = urllib.request.Request(url, data=data, method=method, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            return json.loads(resp.read().decode("utf-8"))
+    except urllib.error.HTTPError as e:
+        try:
+            detail = json.loads(e.read().decode("utf-8")).get("error", e.reason)
+        except ValueError:
+            detail = e.reason
+        raise WorkerError(f"Worker returned {e.code}: {detail}") from e
+    except urllib.error.URLError as e:
+        raise WorkerError(f"Worker unreachable at {url}: {e.reason}") from e
+
+
+def health(base_url: str = DEFAULT_WORKER_URL) -> Dict:
+    return _request(f"{base_url.rstrip('/')}/health", timeout=5)
+
+
+def submit_job(base_url: str, payload: Dict) -> str:
+    return _request(f"{base_url.rstrip('/')}/jobs", method="POST", payload=payload)["job_id"]
+
+
+def get_job(base_url: str, job_id: str) -> Dict:
+    return _request(f"{base_url.rstrip('/')}/jobs/{job_id}")
+
+
+def wait_for_job(
+    base_url: str,
+    job_id: str,
+    poll_interval: float = 2.0,
+    on_update: Optional[Callable[[Dict], None]] = None,
+) -> Dict:
+    """Odpytuj worker aż zadanie skończy się (done / error); on_update dostaje każdą zmianę statusu."""
+    last_status = None
+    while True:
+        job = get_job(base_url, job_id)
+        if on_update and job["status"] != last_status:
+            on_update(job)
+            last_status = job["status"]
+        if job["status"] in ("done", "error"):
+            return job
+        time.sleep(poll_interval)
+
+
+def run_job(base_url: str, payload: Dict, **kwargs) -> Dict:
+    return wait_for_job(base_url, submit_job(base_url, payload), **kwargs)